@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""Benchmark for dlna.library.MediaLibrary on a large flat directory.
+
+Creates empty media files in a temporary directory and measures:
+  - refresh: first index (every file probed), no changes, 1% changed
+  - listing: one page and the whole directory from the index, against
+    listdir + stat + sort (what a plain directory listing does)
+  - ContentDirectory Browse: one page of DIDL-Lite, at the start and end
+
+Usage:
+    uv run python benchmarks/library.py [--files 20000] [--page 100]
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+
+from dlna.contentdir import MediaServerDevice  # noqa: E402
+from dlna.library import MediaLibrary  # noqa: E402
+from dlna.probe import has_ffprobe  # noqa: E402
+
+
+def _time(fn, runs: int = 1) -> float:
+    """Median seconds per call."""
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return statistics.median(times)
+
+
+def _walk_listing(directory: Path) -> list:
+    entries = [(name, os.stat(directory / name)) for name in os.listdir(directory)]
+    return sorted(entries, key=lambda entry: entry[0].lower())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--files", type=int, default=20000, help="Number of files")
+    parser.add_argument("--page", type=int, default=100, help="Entries per listing page")
+    parser.add_argument("--runs", type=int, default=20, help="Runs per listing measurement")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        media = Path(tmp) / "media"
+        media.mkdir()
+        for n in range(args.files):
+            (media / f"track {n:06d}.mp3").touch()
+
+        with MediaLibrary(media, db_path=Path(tmp) / "media.db") as library:
+            rows = [
+                ("refresh: first index", _time(library.refresh)),
+                ("refresh: unchanged", _time(library.refresh)),
+            ]
+            for n in range(0, args.files, 100):
+                os.utime(media / f"track {n:06d}.mp3", ns=(0, 0))
+            rows.append(("refresh: 1% changed", _time(library.refresh)))
+
+            device = MediaServerDevice(library)
+            base_url = "http://127.0.0.1:8200"
+
+            rows += [
+                (f"index: page of {args.page}", _time(lambda: library.children("", 0, args.page), args.runs)),
+                (
+                    f"index: page of {args.page} at the end",
+                    _time(lambda: library.children("", args.files - args.page, args.page), args.runs),
+                ),
+                ("index: whole directory", _time(lambda: library.children(""), args.runs)),
+                (
+                    f"Browse: page of {args.page}",
+                    _time(lambda: device.browse("0", "BrowseDirectChildren", 0, args.page, base_url), args.runs),
+                ),
+                (
+                    f"Browse: page of {args.page} at the end",
+                    _time(
+                        lambda: device.browse("0", "BrowseDirectChildren", args.files - args.page, args.page, base_url),
+                        args.runs,
+                    ),
+                ),
+                ("listdir + stat + sort", _time(lambda: _walk_listing(media), args.runs)),
+            ]
+
+    print(f"{args.files} files (ffprobe {'on' if has_ffprobe() else 'not installed'})")
+    for label, seconds in rows:
+        print(f"  {label:<32} {seconds * 1000:10.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""Throughput benchmark for dlna.server.MediaServer.
+
+Serves a temporary file and downloads it from several concurrent local
+clients, whole and as random byte ranges (the way renderers seek), with
+os.sendfile on and off. Then polls a small file (like a renderer
+re-fetching subtitles or artwork) over one keep-alive connection: from
+disk, from the small file cache, and as conditional GETs (304).
+
+Usage:
+    uv run python benchmarks/media_server.py [--size-mb 256] [--clients 4]
+"""
+
+import argparse
+import http.client
+import random
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+
+from dlna.server import MediaServer, QuietHTTPRequestHandler  # noqa: E402
+
+READ_SIZE = 1024 * 1024
+
+
+def _download(port: int, size: int, ranges: int) -> int:
+    """Fetch the file whole (ranges=0) or as random ranges over one connection."""
+    conn = http.client.HTTPConnection("127.0.0.1", port)
+    received = 0
+    requests = [None] if ranges == 0 else range(ranges)
+    for _ in requests:
+        headers = {}
+        if ranges:
+            start = random.randrange(size)
+            headers["Range"] = f"bytes={start}-{min(start + 8 * READ_SIZE, size) - 1}"
+        conn.request("GET", "/media.bin", headers=headers)
+        response = conn.getresponse()
+        while chunk := response.read(READ_SIZE):
+            received += len(chunk)
+    conn.close()
+    return received
+
+
+def _bench(port: int, size: int, clients: int, ranges: int) -> float:
+    """Run the clients concurrently. Returns MB/s."""
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=clients) as pool:
+        total = sum(pool.map(lambda _: _download(port, size, ranges), range(clients)))
+    return total / (time.perf_counter() - start) / 1e6
+
+
+def _poll(port: int, requests: int, conditional: bool) -> float:
+    """Fetch the small file repeatedly over one connection. Returns requests/s."""
+    conn = http.client.HTTPConnection("127.0.0.1", port)
+    conn.request("GET", "/subtitles.srt")
+    response = conn.getresponse()
+    response.read()
+    headers = {"If-None-Match": response.getheader("ETag")} if conditional else {}
+
+    start = time.perf_counter()
+    for _ in range(requests):
+        conn.request("GET", "/subtitles.srt", headers=headers)
+        conn.getresponse().read()
+    elapsed = time.perf_counter() - start
+    conn.close()
+    return requests / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--size-mb", type=int, default=256, help="Size of the served file")
+    parser.add_argument("--clients", type=int, default=4, help="Concurrent clients")
+    parser.add_argument("--ranges", type=int, default=32, help="Range requests per client")
+    parser.add_argument("--polls", type=int, default=2000, help="Requests for the small file")
+    args = parser.parse_args()
+
+    size = args.size_mb * 1024 * 1024
+    with tempfile.TemporaryDirectory() as tmp:
+        with open(Path(tmp) / "media.bin", "wb") as f:
+            f.truncate(size)
+
+        server = MediaServer(Path(tmp))
+        port = server.start()
+        try:
+            for use_sendfile in (True, False):
+                QuietHTTPRequestHandler.use_sendfile = use_sendfile
+                label = "sendfile" if use_sendfile else "copy"
+                whole = _bench(port, size, args.clients, 0)
+                ranged = _bench(port, size, args.clients, args.ranges)
+                print(
+                    f"{label:<9} {args.clients} clients: "
+                    f"whole file {whole:8.1f} MB/s, ranged {ranged:8.1f} MB/s"
+                )
+        finally:
+            server.stop()
+
+        (Path(tmp) / "subtitles.srt").write_bytes(b"x" * 64 * 1024)
+        for label, cache_bytes, conditional in (
+            ("small file, no cache", 0, False),
+            ("small file, cached", 16 * 1024 * 1024, False),
+            ("small file, 304", 16 * 1024 * 1024, True),
+        ):
+            server = MediaServer(Path(tmp), cache_bytes=cache_bytes)
+            port = server.start()
+            try:
+                print(f"{label:<21} {_poll(port, args.polls, conditional):8.0f} requests/s")
+            finally:
+                server.stop()
+
+
+if __name__ == "__main__":
+    main()
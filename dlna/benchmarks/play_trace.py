@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""Span-level timing benchmark for play_url against a local fake renderer.
+
+Runs play_url repeatedly with tracing on, cold (no cached descriptions)
+and warm (descriptions cached), and reports the median time per span
+name: description fetch and build, get_av_transport and each action.
+With --baseline, exits with status 1 if a span got slower than the saved
+baseline by more than the tolerance.
+
+Usage:
+    uv run python benchmarks/play_trace.py [--runs 20] [--latency-ms 5]
+    uv run python benchmarks/play_trace.py --save baseline.json
+    uv run python benchmarks/play_trace.py --baseline baseline.json
+"""
+
+import argparse
+import asyncio
+import json
+import statistics
+import sys
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+
+import dlna.config  # noqa: E402
+from dlna import trace  # noqa: E402
+from dlna.player import DLNAClient, play_url  # noqa: E402
+from dlna.testing import FakeRenderer  # noqa: E402
+
+URL = "http://127.0.0.1:9/media.mp4"
+
+
+def _span_key(s: trace.Span) -> str:
+    """Group actions by action name, everything else by span name."""
+    if s.name == "action":
+        return f"action:{s.attrs.get('action')}"
+    return s.name
+
+
+async def _run(renderer: FakeRenderer, cold: bool) -> dict[str, float]:
+    """Run play_url once. Returns seconds per span key (summed within the run)."""
+    tracer = trace.start_tracing()
+    try:
+        async with DLNAClient() as client:
+            if cold:
+                client.invalidate(renderer.device)
+            with trace.span("play_url"):
+                await play_url(renderer.device, URL, client=client)
+    finally:
+        trace.stop_tracing()
+
+    totals: dict[str, float] = {}
+    for s in tracer.spans:
+        key = _span_key(s)
+        totals[key] = totals.get(key, 0.0) + s.duration
+    return totals
+
+
+async def _bench(runs: int, latency: float) -> dict[str, dict[str, float]]:
+    """Median milliseconds per span key, for cold and warm runs."""
+    results = {}
+    async with FakeRenderer(latency=latency) as renderer:
+        for mode in ("cold", "warm"):
+            samples: dict[str, list[float]] = {}
+            for _ in range(runs):
+                for key, seconds in (await _run(renderer, cold=mode == "cold")).items():
+                    samples.setdefault(key, []).append(seconds * 1000)
+            results[mode] = {key: statistics.median(values) for key, values in sorted(samples.items())}
+    return results
+
+
+def _regressions(results, baseline, tolerance: float, slack_ms: float) -> list[str]:
+    """Spans slower than baseline * (1 + tolerance) + slack."""
+    slower = []
+    for mode, spans in results.items():
+        for key, ms in spans.items():
+            reference = baseline.get(mode, {}).get(key)
+            if reference is not None and ms > reference * (1 + tolerance) + slack_ms:
+                slower.append(f"{mode} {key}: {ms:.1f} ms (baseline {reference:.1f} ms)")
+    return slower
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=20, help="Runs per mode")
+    parser.add_argument("--latency-ms", type=float, default=5.0, help="Fake renderer response latency")
+    parser.add_argument("--save", type=Path, help="Write the results as a baseline")
+    parser.add_argument("--baseline", type=Path, help="Compare against a saved baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed relative slowdown")
+    parser.add_argument("--slack-ms", type=float, default=2.0, help="Allowed absolute slowdown")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as state_dir:
+        # Keep the description cache of the fake renderer out of the skill directory
+        dlna.config._get_skill_dir = lambda: Path(state_dir)
+        results = asyncio.run(_bench(args.runs, args.latency_ms / 1000))
+
+    for mode, spans in results.items():
+        print(f"{mode} (median of {args.runs} runs, latency {args.latency_ms:g} ms)")
+        for key, ms in spans.items():
+            print(f"  {key:<30} {ms:8.2f} ms")
+
+    if args.save:
+        args.save.write_text(json.dumps(results, indent=2))
+        print(f"Baseline written to {args.save}")
+
+    if args.baseline:
+        slower = _regressions(results, json.loads(args.baseline.read_text()), args.tolerance, args.slack_ms)
+        for line in slower:
+            print(f"REGRESSION {line}")
+        if slower:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
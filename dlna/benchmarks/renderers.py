@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""Control benchmarks against simulated renderers (no real devices needed).
+
+Starts fake MediaRenderers from dlna.testing on localhost and measures:
+  - discovery: time until the first and until all renderers are confirmed
+  - play_url: cold (nothing cached), cached (descriptions on disk, new
+    client) and warm (same client)
+  - multi-device: one group play_url vs. one play_url per device
+
+Usage:
+    uv run python benchmarks/renderers.py [--renderers 8] [--runs 10] [--latency-ms 10]
+"""
+
+import argparse
+import asyncio
+import statistics
+import sys
+import tempfile
+import time
+from contextlib import AsyncExitStack, contextmanager, redirect_stdout
+from io import StringIO
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+
+import dlna.config  # noqa: E402
+from dlna.player import DLNAClient, iter_devices, play_url  # noqa: E402
+from dlna.testing import FakeRenderer, SsdpResponder  # noqa: E402
+
+URL = "http://127.0.0.1:9/media.mp4"
+
+
+@contextmanager
+def _quiet():
+    """Hide the progress lines printed by the player."""
+    with redirect_stdout(StringIO()):
+        yield
+
+
+# Section title -> [(label, seconds per run)]
+Results = dict[str, list[tuple[str, list[float]]]]
+
+
+def _report(results: Results) -> None:
+    for title, rows in results.items():
+        print(title)
+        for label, times in rows:
+            print(
+                f"  {label:<28} median {statistics.median(times) * 1000:8.1f} ms"
+                f"  min {min(times) * 1000:8.1f} ms"
+            )
+
+
+async def _discovery(renderers, ssdp, runs: int, results: Results) -> None:
+    first, complete = [], []
+    for _ in range(runs):
+        async with DLNAClient() as client:
+            for renderer in renderers:
+                client.invalidate(renderer.device)
+            start = time.perf_counter()
+            found = 0
+            async for _device in iter_devices(timeout=5, client=client, target=ssdp.address):
+                found += 1
+                if found == 1:
+                    first.append(time.perf_counter() - start)
+                if found == len(renderers):
+                    complete.append(time.perf_counter() - start)
+                    break
+    results[f"discovery ({len(renderers)} renderers)"] = [
+        ("first renderer", first),
+        ("all renderers", complete),
+    ]
+
+
+async def _play(renderer, runs: int, results: Results) -> None:
+    device = renderer.device
+    cold, cached, warm = [], [], []
+
+    for _ in range(runs):
+        async with DLNAClient() as client:
+            client.invalidate(device)
+            start = time.perf_counter()
+            await play_url(device, URL, client=client)
+            cold.append(time.perf_counter() - start)
+
+        async with DLNAClient() as client:
+            start = time.perf_counter()
+            await play_url(device, URL, client=client)
+            cached.append(time.perf_counter() - start)
+
+            start = time.perf_counter()
+            await play_url(device, URL, client=client)
+            warm.append(time.perf_counter() - start)
+
+    results["play_url (one renderer)"] = [
+        ("cold (fetch descriptions)", cold),
+        ("cached (from disk)", cached),
+        ("warm (same client)", warm),
+    ]
+
+
+async def _multi(renderers, runs: int, results: Results) -> None:
+    devices = [renderer.device for renderer in renderers]
+    grouped, sequential = [], []
+    skews = []
+
+    async with DLNAClient() as client:
+        await play_url(devices, URL, client=client)
+        for _ in range(runs):
+            start = time.perf_counter()
+            outcome = await play_url(devices, URL, client=client)
+            grouped.append(time.perf_counter() - start)
+            skews.append(max(result.offset for result in outcome))
+
+            start = time.perf_counter()
+            for device in devices:
+                await play_url(device, URL, client=client)
+            sequential.append(time.perf_counter() - start)
+
+    results[f"multi-device ({len(renderers)} renderers, warm client)"] = [
+        ("group play_url", grouped),
+        ("sequential play_url", sequential),
+        ("group start skew (estimated)", skews),
+    ]
+
+
+async def _main(count: int, runs: int, latency: float) -> Results:
+    results: Results = {}
+    async with AsyncExitStack() as stack:
+        renderers = [
+            await stack.enter_async_context(FakeRenderer(f"Renderer {n}", latency=latency))
+            for n in range(count)
+        ]
+        ssdp = await stack.enter_async_context(SsdpResponder(renderers, delay=latency))
+
+        with _quiet():
+            await _discovery(renderers, ssdp, runs, results)
+            await _play(renderers[0], runs, results)
+            await _multi(renderers, runs, results)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--renderers", type=int, default=8, help="Number of fake renderers")
+    parser.add_argument("--runs", type=int, default=10, help="Runs per measurement")
+    parser.add_argument("--latency-ms", type=float, default=10.0, help="Latency of every renderer response")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as state_dir:
+        # Keep cached descriptions and the device cache out of the skill directory
+        dlna.config._get_skill_dir = lambda: Path(state_dir)
+        results = asyncio.run(_main(args.renderers, args.runs, args.latency_ms / 1000))
+    _report(results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""Startup-time benchmark for the dlna CLI.
+
+Runs `dlna --help` and `dlna config --show` in fresh interpreters and
+reports wall-clock times, plus whether the network stack got imported.
+
+Usage:
+    uv run python benchmarks/startup.py [--runs 20]
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+SRC_DIR = Path(__file__).resolve().parent.parent / "src"
+
+COMMANDS = {
+    "dlna --help": ["--help"],
+    "dlna config --show": ["config", "--show"],
+}
+
+# Runs the CLI, then reports whether aiohttp was loaded along the way
+RUNNER = """
+import sys
+from dlna.cli import cli
+try:
+    cli.main(args=sys.argv[1:], standalone_mode=False)
+finally:
+    sys.stderr.write("aiohttp=%s\\n" % ("aiohttp" in sys.modules))
+"""
+
+
+def _run(args: list[str]) -> tuple[float, bool]:
+    """Run the CLI once. Returns (seconds, aiohttp imported)."""
+    env = dict(os.environ, PYTHONPATH=str(SRC_DIR))
+    start = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-c", RUNNER, *args],
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+        text=True,
+        check=True,
+    )
+    elapsed = time.perf_counter() - start
+    return elapsed, "aiohttp=True" in result.stderr
+
+
+def _baseline() -> float:
+    """Bare interpreter startup, for reference."""
+    start = time.perf_counter()
+    subprocess.run([sys.executable, "-c", "pass"], check=True)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=20, help="Runs per command")
+    args = parser.parse_args()
+
+    baseline = statistics.median(_baseline() for _ in range(args.runs))
+    print(f"{'python -c pass':<22} median {baseline * 1000:7.1f} ms")
+
+    for label, cli_args in COMMANDS.items():
+        times = []
+        loaded = False
+        for _ in range(args.runs):
+            elapsed, aiohttp_loaded = _run(cli_args)
+            times.append(elapsed)
+            loaded = loaded or aiohttp_loaded
+        print(
+            f"{label:<22} median {statistics.median(times) * 1000:7.1f} ms"
+            f"  min {min(times) * 1000:7.1f} ms"
+            f"  aiohttp imported: {'yes' if loaded else 'no'}"
+        )
+
+
+if __name__ == "__main__":
+    main()
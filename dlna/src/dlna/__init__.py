@@ -1,13 +1,13 @@
-"""DLNA Media Renderer control library."""
-
-from .player import (
-    DLNADevice,
-    discover_devices,
-    play_url,
-    stop,
-    get_status,
-)
-from .discover import find_device
+"""DLNA Media Renderer control library.
+
+Configuration helpers are imported eagerly; everything that needs the
+network stack (async_upnp_client, aiohttp) is imported on first use, so
+config-only commands start quickly.
+"""
+
+import importlib
+from typing import TYPE_CHECKING
+
 from .config import (
     DLNAConfig,
     get_default_device,
@@ -16,16 +16,64 @@ from .config import (
     show_config,
 )
 
+if TYPE_CHECKING:
+    from .player import (
+        DLNAClient,
+        DLNADevice,
+        discover_devices,
+        iter_devices,
+        play_url,
+        stop,
+        get_status,
+        get_sink_protocols,
+    )
+    from .discover import find_device, find_devices
+    from .cache import DeviceCache
+
+# Public name -> submodule that defines it
+_LAZY_EXPORTS = {
+    "DLNAClient": "player",
+    "DLNADevice": "player",
+    "discover_devices": "player",
+    "iter_devices": "player",
+    "play_url": "player",
+    "stop": "player",
+    "get_status": "player",
+    "get_sink_protocols": "player",
+    "find_device": "discover",
+    "find_devices": "discover",
+    "DeviceCache": "cache",
+}
+
 __all__ = [
+    "DLNAClient",
     "DLNADevice",
     "discover_devices",
+    "iter_devices",
     "find_device",
+    "find_devices",
     "play_url",
     "stop",
     "get_status",
+    "get_sink_protocols",
     "DLNAConfig",
     "get_default_device",
     "set_default_device",
     "clear_default_device",
     "show_config",
+    "DeviceCache",
 ]
+
+
+def __getattr__(name: str):
+    module_name = _LAZY_EXPORTS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+    value = getattr(importlib.import_module(f".{module_name}", __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
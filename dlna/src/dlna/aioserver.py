@@ -0,0 +1,171 @@
+"""Asyncio HTTP file server for DLNA media streaming.
+
+AsyncMediaServer runs in the same event loop as the player code, so one
+process can serve files and control renderers without a thread per
+request. Files are streamed in chunks; each write waits for the socket to
+drain, so a slow renderer applies backpressure instead of filling memory.
+Disk access runs in the default executor, so a slow disk or NAS does not
+stall the event loop and with it every other connection.
+"""
+
+import asyncio
+import mimetypes
+import os
+import time
+from dataclasses import dataclass, field
+from email.utils import formatdate
+from pathlib import Path
+from typing import Optional
+
+from aiohttp import web
+
+from .server import RangeNotSatisfiable, _get_local_ip, local_ip_for, parse_range
+
+# Bytes read from disk and written to the socket per step
+CHUNK_SIZE = 256 * 1024
+
+
+@dataclass
+class ConnectionStats:
+    """Traffic counters for one client, over all its connections."""
+
+    peer: str  # IP address
+    requests: int = 0
+    bytes_sent: int = 0
+    opened_at: float = field(default_factory=time.time)  # first request
+    last_path: str = ""
+
+
+class AsyncMediaServer:
+    """Asyncio HTTP server for serving media files to DLNA devices.
+
+    Supports HEAD and byte ranges (206 Partial Content) and keeps per-
+    client byte counters in `connections`, keyed by IP address so that
+    renderers reconnecting for every request do not grow it.
+
+    Usage:
+        async with AsyncMediaServer(Path("~/Videos")) as server:
+            await play_url(device, f"{server.url_for(device.location)}/movie.mp4", client=client)
+    """
+
+    def __init__(self, directory: Path, port: int = 0, chunk_size: int = CHUNK_SIZE):
+        self.directory = Path(directory).resolve()
+        self.port = port
+        self.chunk_size = chunk_size
+        self.connections: dict[str, ConnectionStats] = {}
+        self._runner: Optional[web.AppRunner] = None
+        self._actual_port: int = 0
+
+    async def __aenter__(self) -> "AsyncMediaServer":
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.stop()
+
+    async def start(self) -> int:
+        """Start the HTTP server. Returns the actual port."""
+        app = web.Application()
+        app.router.add_route("GET", "/{path:.*}", self._handle)
+        app.router.add_route("HEAD", "/{path:.*}", self._handle)
+
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, "0.0.0.0", self.port)
+        await site.start()
+        self._actual_port = self._runner.addresses[0][1]
+        return self._actual_port
+
+    async def stop(self) -> None:
+        """Stop the HTTP server."""
+        if self._runner:
+            await self._runner.cleanup()
+            self._runner = None
+
+    @property
+    def url(self) -> str:
+        """Get the base URL for the server (prefer url_for when the renderer is known)."""
+        local_ip = _get_local_ip()
+        return f"http://{local_ip}:{self._actual_port}"
+
+    def url_for(self, location: str) -> str:
+        """Get the base URL as reachable from a renderer.
+
+        Args:
+            location: Renderer LOCATION URL (DLNADevice.location)
+        """
+        return f"http://{local_ip_for(location)}:{self._actual_port}"
+
+    @property
+    def bytes_sent(self) -> int:
+        """Total bytes sent to all clients."""
+        return sum(stats.bytes_sent for stats in self.connections.values())
+
+    def _resolve(self, path: str) -> Optional[tuple[Path, os.stat_result]]:
+        """Map a request path to a file inside the served directory (blocking)."""
+        file_path = (self.directory / path).resolve()
+        if not file_path.is_relative_to(self.directory) or not file_path.is_file():
+            return None
+        return file_path, file_path.stat()
+
+    def _stats_for(self, request: web.Request) -> ConnectionStats:
+        peername = request.transport.get_extra_info("peername") if request.transport else None
+        peer = peername[0] if peername else "unknown"
+        stats = self.connections.get(peer)
+        if stats is None:
+            stats = self.connections[peer] = ConnectionStats(peer=peer)
+        return stats
+
+    async def _handle(self, request: web.Request) -> web.StreamResponse:
+        stats = self._stats_for(request)
+        stats.requests += 1
+        stats.last_path = request.path
+
+        loop = asyncio.get_running_loop()
+        resolved = await loop.run_in_executor(None, self._resolve, request.match_info["path"])
+        if resolved is None:
+            raise web.HTTPNotFound()
+
+        file_path, fs = resolved
+        size = fs.st_size
+        try:
+            byte_range = parse_range(request.headers["Range"], size) if "Range" in request.headers else None
+        except RangeNotSatisfiable:
+            raise web.HTTPRequestRangeNotSatisfiable(headers={"Content-Range": f"bytes */{size}"})
+
+        if byte_range:
+            start, end = byte_range
+            response = web.StreamResponse(status=206)
+            response.headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+        else:
+            start, end = 0, size - 1
+            response = web.StreamResponse(status=200)
+
+        content_type, _ = mimetypes.guess_type(file_path.name)
+        response.content_type = content_type or "application/octet-stream"
+        response.content_length = end - start + 1
+        response.headers["Accept-Ranges"] = "bytes"
+        response.headers["Last-Modified"] = formatdate(fs.st_mtime, usegmt=True)
+        await response.prepare(request)
+
+        if request.method == "HEAD":
+            return response
+
+        offset, remaining = start, end - start + 1
+        fd = await loop.run_in_executor(None, os.open, file_path, os.O_RDONLY)
+        try:
+            while remaining > 0:
+                chunk = await loop.run_in_executor(None, os.pread, fd, min(self.chunk_size, remaining), offset)
+                if not chunk:
+                    break
+                # write() waits for the transport to drain: backpressure
+                await response.write(chunk)
+                offset += len(chunk)
+                remaining -= len(chunk)
+                stats.bytes_sent += len(chunk)
+        finally:
+            os.close(fd)
+
+        await response.write_eof()
+        return response
+
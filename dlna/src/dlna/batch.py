@@ -0,0 +1,117 @@
+"""Batch mode: many operations over one discovery and one session.
+
+Operations are JSON objects such as
+    {"action": "status", "device": "Kitchen"}
+    {"action": "play", "device": "Living Room TV", "url": "http://..."}
+    {"action": "stop"}            (no device: the default device)
+
+All devices are resolved together (at most one SSDP scan, see
+find_devices) and the operations run concurrently over one DLNAClient.
+Operations on the same device run in input order.
+"""
+
+import asyncio
+import json
+
+from .discover import find_devices
+from .player import DLNAClient, DLNADevice, get_status, play_url, stop
+
+ACTIONS = ("play", "stop", "status")
+
+
+def parse_operations(text: str) -> list[dict]:
+    """Parse operations from a JSON array or JSON lines.
+
+    Raises:
+        ValueError: If the text is not valid JSON or an entry is not an object
+    """
+    text = text.strip()
+    if not text:
+        return []
+
+    if text.startswith("["):
+        operations = json.loads(text)
+    else:
+        operations = [json.loads(line) for line in text.splitlines() if line.strip()]
+
+    for operation in operations:
+        if not isinstance(operation, dict):
+            raise ValueError(f"Operation must be an object: {operation!r}")
+    return operations
+
+
+def _check(operation: dict) -> str | None:
+    """Return an error message for an invalid operation, or None."""
+    action = operation.get("action")
+    if action not in ACTIONS:
+        return f"Unknown action: {action!r} (expected one of {', '.join(ACTIONS)})"
+    if action == "play" and not operation.get("url"):
+        return "play needs a url"
+    return None
+
+
+async def _execute(operation: dict, device: DLNADevice, client: DLNAClient) -> dict:
+    """Run one operation. Returns its result fields."""
+    action = operation["action"]
+    if action == "play":
+        await play_url(device, operation["url"], client=client)
+        return {}
+    if action == "stop":
+        await stop(device, client=client)
+        return {}
+
+    state = (await get_status(device, client=client)).state
+    if state.startswith("ERROR"):
+        raise RuntimeError(state.removeprefix("ERROR: "))
+    return {"state": state}
+
+
+async def run_batch(operations: list[dict], client: DLNAClient, timeout: int = 5) -> list[dict]:
+    """Run operations concurrently.
+
+    Args:
+        operations: Parsed operations (see parse_operations)
+        client: Shared client for discovery and all actions
+        timeout: Scan timeout in seconds, if a scan is needed
+
+    Returns:
+        One result per operation, in input order: the operation's action and
+        device plus "ok" and either "error" or the action's output
+    """
+    results = [
+        {"action": operation.get("action"), "device": operation.get("device"), "ok": False}
+        for operation in operations
+    ]
+
+    valid = []
+    for index, operation in enumerate(operations):
+        error = _check(operation)
+        if error:
+            results[index]["error"] = error
+        else:
+            valid.append(index)
+
+    names = list(dict.fromkeys(operations[index].get("device") for index in valid))
+    devices = await find_devices(names, timeout=timeout, client=client) if names else {}
+
+    # Operations per device, in input order
+    queues: dict[str, list[int]] = {}
+    for index in valid:
+        device = devices.get(operations[index].get("device"))
+        if device is None:
+            results[index]["error"] = "Device not found"
+            continue
+        results[index]["device"] = device.name
+        queues.setdefault(device.udn or device.location, []).append(index)
+
+    async def run_queue(indices: list[int]) -> None:
+        for index in indices:
+            name = operations[index].get("device")
+            try:
+                results[index].update(await _execute(operations[index], devices[name], client))
+                results[index]["ok"] = True
+            except Exception as e:
+                results[index]["error"] = str(e) or type(e).__name__
+
+    await asyncio.gather(*(run_queue(indices) for indices in queues.values()))
+    return results
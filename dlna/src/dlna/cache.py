@@ -0,0 +1,120 @@
+"""Persistent device registry for dlna skill.
+
+Devices are stored in the skill directory under .dlna/devices.json, keyed by UDN.
+"""
+
+import json
+import time
+from dataclasses import dataclass, asdict, field
+from pathlib import Path
+from typing import Iterable, Optional
+
+from .config import _get_config_dir, _write_json
+
+
+def _get_cache_file() -> Path:
+    """Get the device cache file path."""
+    return _get_config_dir() / "devices.json"
+
+
+@dataclass
+class CachedDevice:
+    """A device remembered from a previous discovery."""
+
+    udn: str
+    name: str
+    model_name: str
+    location: str
+    last_seen: float = 0.0
+    failures: int = 0  # consecutive failed actions, see policy.CircuitBreaker
+    open_until: float = 0.0  # skip the device until this time
+    sink_protocols: list[str] = field(default_factory=list)  # ConnectionManager GetProtocolInfo Sink
+    protocols_fetched: float = 0.0
+
+
+@dataclass
+class DeviceCache:
+    """Registry of known DLNA devices, keyed by UDN."""
+
+    devices: dict[str, CachedDevice] = field(default_factory=dict)
+
+    def save(self) -> None:
+        """Save cache to file."""
+        data = {udn: asdict(entry) for udn, entry in self.devices.items()}
+        _write_json(_get_cache_file(), data, indent=2)
+
+    @classmethod
+    def load(cls) -> "DeviceCache":
+        """Load cache from file."""
+        cache_file = _get_cache_file()
+        if not cache_file.exists():
+            return cls()
+
+        try:
+            with open(cache_file, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            return cls(devices={udn: CachedDevice(**entry) for udn, entry in data.items()})
+        except (json.JSONDecodeError, TypeError, AttributeError):
+            return cls()
+
+    def update(self, device) -> None:
+        """Record a device (anything with name, model_name, location and udn).
+
+        The failure count of a known device is kept: answering SSDP or a
+        description fetch does not mean its SOAP actions work. So is its
+        sink protocol list, which only changes with its firmware.
+        """
+        if not device.udn:
+            return
+        previous = self.devices.get(device.udn)
+        self.devices[device.udn] = CachedDevice(
+            udn=device.udn,
+            name=device.name,
+            model_name=device.model_name,
+            location=device.location,
+            last_seen=time.time(),
+            failures=previous.failures if previous else 0,
+            open_until=previous.open_until if previous else 0.0,
+            sink_protocols=previous.sink_protocols if previous else [],
+            protocols_fetched=previous.protocols_fetched if previous else 0.0,
+        )
+
+    def remove(self, udn: str) -> None:
+        """Forget a device."""
+        self.devices.pop(udn, None)
+
+    def find(self, name: str) -> Optional[CachedDevice]:
+        """Find a cached device by name (case-insensitive, exact then partial)."""
+        return match_device(self.devices.values(), name)
+
+
+def match_device(devices: Iterable, name: str):
+    """Pick a device by name: exact match first, then partial match.
+
+    Args:
+        devices: Objects with a ``name`` attribute
+        name: Device name to search for (case-insensitive)
+
+    Returns:
+        The matching device, or None
+    """
+    devices = list(devices)
+    name_lower = name.lower()
+
+    for device in devices:
+        if device.name.lower() == name_lower:
+            return device
+
+    for device in devices:
+        if name_lower in device.name.lower():
+            return device
+
+    return None
+
+
+def remember_devices(devices: Iterable) -> None:
+    """Add freshly discovered devices to the persistent cache."""
+    cache = DeviceCache.load()
+    for device in devices:
+        cache.update(device)
+    cache.save()
@@ -1,68 +1,433 @@
-"""DLNA CLI - Control DLNA MediaRenderer devices."""
+"""DLNA CLI - Control DLNA MediaRenderer devices.
 
-import asyncio
+The network stack is imported inside the commands that need it, so
+`dlna --help` and `dlna config` start without loading aiohttp.
+"""
+
+import os
 
 import click
 
-from . import (
-    discover_devices,
-    find_device,
-    play_url,
-    stop,
-    get_status,
+from .config import (
     set_default_device,
     clear_default_device,
     show_config,
 )
 
 
+def _run(coro, quiet: bool = False):
+    """Run a coroutine to completion (asyncio is only imported when needed).
+
+    With quiet=True, progress printed by the library goes to stderr, keeping
+    stdout clean for JSON output.
+    """
+    import asyncio
+
+    if not quiet:
+        return asyncio.run(coro)
+
+    import contextlib
+    import sys
+
+    with contextlib.redirect_stdout(sys.stderr):
+        return asyncio.run(coro)
+
+
+def _echo_json(data) -> None:
+    """Print data as JSON."""
+    import json
+
+    click.echo(json.dumps(data, ensure_ascii=False))
+
+
 @click.group()
-def cli():
+@click.option("--no-daemon", is_flag=True, help="Do not forward commands to a running serve-control daemon")
+@click.option("--trace", "trace_enabled", is_flag=True, help="Print timing spans as JSON to stderr (or set DLNA_TRACE=1)")
+@click.option("--trace-file", type=click.Path(dir_okay=False), help="Write timing spans as JSON to a file (or set DLNA_TRACE_FILE)")
+@click.pass_context
+def cli(ctx, no_daemon: bool, trace_enabled: bool, trace_file: str | None):
     """DLNA Media Renderer control tool."""
-    pass
+    ctx.obj = {"use_daemon": not no_daemon}
+
+    from . import trace
+
+    if trace_enabled or trace_file or trace.tracing_from_env():
+        _enable_tracing(ctx, trace_file or os.environ.get(trace.TRACE_FILE_ENV))
+
+
+def _enable_tracing(ctx, trace_file: str | None):
+    """Collect spans for this command and output them when it ends."""
+    from . import trace
+
+    trace.start_tracing()
+
+    def finish():
+        tracer = trace.stop_tracing()
+        if tracer is None:
+            return
+        if trace_file:
+            with open(trace_file, "w", encoding="utf-8") as f:
+                f.write(tracer.to_json())
+        else:
+            click.echo(tracer.to_json(), err=True)
+
+    ctx.call_on_close(finish)
+
+
+def _forward(message: dict) -> dict | None:
+    """Forward a command to a running serve-control daemon.
+
+    Returns:
+        The daemon's response, or None to run the command in this process
+    """
+    ctx = click.get_current_context()
+    if not (ctx.obj or {}).get("use_daemon", True):
+        return None
+
+    from .ipc import forward
+    from .trace import span
+
+    with span("daemon.forward", op=message.get("op")):
+        response = _run(forward(message))
+    if response is not None and not response.get("ok"):
+        click.echo(response.get("error", "Unknown error"), err=True)
+    return response
 
 
 @cli.command()
 @click.option("--timeout", "-t", default=5, help="Scan timeout in seconds")
-def discover(timeout: int):
+@click.option("--all", "search_all", is_flag=True, help="Search with ssdp:all (for devices that ignore targeted searches)")
+@click.option("--json", "as_json", is_flag=True, help="Print the devices as JSON")
+def discover(timeout: int, search_all: bool, as_json: bool):
     """Discover DLNA devices on the network."""
+    from dataclasses import asdict
+
+    from .cache import remember_devices
+    from .player import DLNAClient, discover_devices
+
     async def _discover():
-        devices = await discover_devices(timeout=timeout)
+        async with DLNAClient() as client:
+            return await discover_devices(timeout=timeout, client=client, search_all=search_all)
 
-        if not devices:
-            click.echo("No DLNA devices found.")
-            return
+    devices = _run(_discover(), quiet=as_json)
+    if devices:
+        remember_devices(devices)
 
-        click.echo(f"\nFound {len(devices)} device(s):\n")
-        for i, device in enumerate(devices, 1):
-            click.echo(f"  {i}. {device.name}")
-            click.echo(f"     Model: {device.model_name}")
-            click.echo(f"     Address: {device.location}")
-            click.echo()
+    if as_json:
+        _echo_json([asdict(device) for device in devices])
+        return
 
-    asyncio.run(_discover())
+    if not devices:
+        click.echo("No DLNA devices found.")
+        return
+
+    click.echo(f"\nFound {len(devices)} device(s):\n")
+    for i, device in enumerate(devices, 1):
+        click.echo(f"  {i}. {device.name}")
+        click.echo(f"     Model: {device.model_name}")
+        click.echo(f"     Address: {device.location}")
+        click.echo()
 
 
 @cli.command()
 @click.argument("url")
-@click.argument("device_name", required=False)
-def play(url: str, device_name: str | None):
-    """Play a media URL on a DLNA device.
+@click.argument("device_names", nargs=-1)
+def play(url: str, device_names: tuple[str, ...]):
+    """Play a media URL or a local file on one or more DLNA devices.
 
-    URL: Media URL to play (http://...)
-    DEVICE_NAME: Name of the DLNA device (optional, uses default if not provided)
+    URL: Media URL to play (http://...) or path of a local file
+    DEVICE_NAMES: Names of the DLNA devices (optional, uses default if not provided)
+
+    Several devices start playback together (multi-room). Local files are
+    served by a built-in HTTP server until playback stops.
     """
-    async def _play():
-        device = await find_device(device_name)
-        if not device:
-            if device_name:
-                click.echo(f"Device '{device_name}' not found", err=True)
+    from pathlib import Path
+
+    names = list(device_names) or [None]
+
+    path = Path(url).expanduser()
+    if "://" not in url and path.is_file():
+        _play_file(path, names)
+        return
+
+    if len(names) == 1:
+        response = _forward({"op": "play", "url": url, "device": names[0]})
+        if response is not None:
+            if response.get("ok"):
+                click.echo(f"Found: {response['device']}")
+                click.echo(f"Playback started: {url}")
             return
 
-        click.echo(f"Found: {device.name}")
-        await play_url(device, url)
+    from .player import DLNAClient, play_url
+
+    async def _play():
+        async with DLNAClient() as client:
+            devices = await _find_devices(names, client)
+            if not devices:
+                return
+
+            results = await play_url(devices, url, client=client)
+            _report_playback(results)
+
+    _run(_play())
+
+
+async def _find_devices(names: list[str | None], client) -> list:
+    """Find devices by name (one scan at most), reporting the ones that are missing."""
+    from .discover import find_devices
+
+    devices = []
+    for device_name, device in (await find_devices(names, client=client)).items():
+        if device:
+            click.echo(f"Found: {device.name}")
+            devices.append(device)
+        elif device_name:
+            click.echo(f"Device '{device_name}' not found", err=True)
+    return devices
+
+
+def _report_playback(results: list):
+    """Print per-device latency and skew of a group playback."""
+    failed = [result for result in results if not result.ok]
+    for result in failed:
+        click.echo(f"{result.device.name}: {result.error}", err=True)
+
+    started = [result for result in results if result.ok]
+    if len(results) < 2 or not started:
+        return
+    for result in started:
+        click.echo(
+            f"  {result.device.name}: latency {result.latency * 1000:.0f} ms, "
+            f"offset {result.offset * 1000:.0f} ms"
+        )
+    skew = max(result.offset for result in started)
+    click.echo(f"Started {len(started)}/{len(results)} device(s), skew {skew * 1000:.0f} ms")
+
+
+def _play_file(path, names: list[str | None]):
+    """Serve a local file, cast it, and keep serving until playback stops."""
+    import asyncio
 
-    asyncio.run(_play())
+    from .didl import build_metadata
+    from .player import DLNAClient, get_sink_protocols, play_url, stop, wait_until_stopped
+    from .probe import probe
+    from .server import MediaServer
+    from .transcode import StreamPlan, plan_stream, stream_features, stream_info
+
+    path = path.resolve()
+    info = probe(path)
+
+    async def _play():
+        async with DLNAClient() as client:
+            devices = await _find_devices(names, client)
+            if not devices:
+                return
+
+            # What each renderer plays (cached per device); unknown means try as is
+            sinks = await asyncio.gather(
+                *(get_sink_protocols(device, client=client) for device in devices),
+                return_exceptions=True,
+            )
+
+            # Only the file itself is shared, not the directory it is in
+            server = MediaServer()
+            server.start()
+            try:
+                # Renderers on different interfaces need different URLs, and
+                # renderers that cannot play the file need a converted stream
+                file_path = server.add_file(path)
+                streams: dict[tuple, str] = {}
+                plans: dict[str, StreamPlan] = {}
+                groups: dict[tuple[str, str], list] = {}
+                for device, sink in zip(devices, sinks):
+                    plan = plan_stream(info, [] if isinstance(sink, BaseException) else sink)
+                    if plan.direct:
+                        url_path = file_path
+                        if plan.reason:
+                            click.echo(f"{device.name}: playing as is ({plan.reason})", err=True)
+                    else:
+                        key = (plan.mode, plan.mime_type, tuple(plan.args))
+                        if key not in streams:
+                            streams[key] = server.add_stream(path, plan)
+                        url_path = streams[key]
+                        click.echo(f"{device.name}: {plan.mode} to {plan.mime_type} ({plan.reason})")
+                    plans.setdefault(url_path, plan)
+                    groups.setdefault((server.url_for(device.location), url_path), []).append(device)
+
+                async def play_group(base_url: str, url_path: str, group: list) -> list:
+                    plan = plans[url_path]
+                    url = base_url + url_path
+                    metadata = build_metadata(
+                        path.stem, url, stream_info(info, plan), features=stream_features(plan)
+                    )
+                    return await play_url(group, url, client=client, metadata=metadata)
+
+                outcomes = await asyncio.gather(
+                    *(play_group(base_url, url_path, group) for (base_url, url_path), group in groups.items()),
+                    return_exceptions=True,
+                )
+                results = []
+                for outcome in outcomes:
+                    if isinstance(outcome, BaseException):
+                        click.echo(f"Playback failed: {outcome}", err=True)
+                    else:
+                        results.extend(outcome)
+                _report_playback(results)
+
+                playing = [result.device for result in results if result.ok]
+                if not playing:
+                    return
+
+                click.echo("Serving until playback stops (Ctrl+C to stop)...")
+                try:
+                    await asyncio.gather(
+                        *(wait_until_stopped(device, client=client) for device in playing)
+                    )
+                except asyncio.CancelledError:
+                    # Ctrl+C: the renderers would otherwise stall on a dead URL
+                    await asyncio.gather(
+                        *(stop(device, client=client) for device in playing),
+                        return_exceptions=True,
+                    )
+                    raise
+            finally:
+                server.stop()
+
+    try:
+        _run(_play())
+    except KeyboardInterrupt:
+        pass
+
+
+@cli.command()
+@click.argument("items", nargs=-1, required=True)
+@click.option("--device", "-d", "device_name", help="Device to play on (uses default if not provided)")
+def queue(items: tuple[str, ...], device_name: str | None):
+    """Play media URLs and/or local files one after another.
+
+    ITEMS: Media URLs or paths of local files, in playing order
+
+    Renderers that support SetNextAVTransportURI get the next item
+    preloaded and advance without a gap.
+    """
+    import asyncio
+    from pathlib import Path
+
+    from .didl import build_metadata
+    from .player import DLNAClient, stop
+    from .playlist import PlaybackQueue, QueueItem
+    from .probe import probe
+    from .server import MediaServer
+
+    files = {item: Path(item).expanduser().resolve() for item in items if "://" not in item}
+    missing = [item for item, path in files.items() if not path.is_file()]
+    if missing:
+        click.echo(f"File not found: {', '.join(missing)}", err=True)
+        return
+
+    async def _queue():
+        async with DLNAClient() as client:
+            devices = await _find_devices([device_name], client)
+            if not devices:
+                return
+            device = devices[0]
+
+            server = None
+            if files:
+                # Only the queued files are shared, never a directory around them
+                server = MediaServer()
+                server.start()
+
+            try:
+                entries = []
+                for item in items:
+                    path = files.get(item)
+                    if path is None:
+                        entries.append(QueueItem(url=item, title=item))
+                        continue
+                    url = server.url_for(device.location) + server.add_file(path)
+                    metadata = build_metadata(path.stem, url, probe(path))
+                    entries.append(QueueItem(url=url, title=path.name, metadata=metadata))
+
+                def on_track(index: int):
+                    click.echo(f"[{index + 1}/{len(entries)}] {entries[index].title}")
+
+                playlist = PlaybackQueue(device, entries, client, on_track=on_track)
+                try:
+                    await playlist.run()
+                except asyncio.CancelledError:
+                    if server:
+                        # Ctrl+C: the renderer would otherwise stall on a dead URL
+                        await stop(device, client=client)
+                    raise
+            finally:
+                if server:
+                    server.stop()
+
+    try:
+        _run(_queue())
+    except KeyboardInterrupt:
+        pass
+
+
+@cli.command()
+@click.argument("directory", type=click.Path(exists=True, file_okay=False))
+def index(directory: str):
+    """Index a media directory for serving (only new or changed files are probed).
+
+    DIRECTORY: Media directory; the index is stored in .dlna/media.db
+    """
+    from pathlib import Path
+
+    from .library import MediaLibrary
+
+    with MediaLibrary(Path(directory)) as library:
+        stats = library.refresh()
+    click.echo(
+        f"Indexed {stats.probed + stats.unchanged} file(s): {stats.added} added, "
+        f"{stats.updated} updated, {stats.removed} removed"
+    )
+
+
+@cli.command()
+@click.argument("directory", type=click.Path(exists=True, file_okay=False))
+@click.option("--name", "-n", default="", help="Friendly name shown on TVs (default: dlna (hostname))")
+@click.option("--port", "-p", default=0, help="HTTP port (default: any free port)")
+def serve(directory: str, name: str, port: int):
+    """Share a media directory as a UPnP MediaServer until Ctrl+C.
+
+    DIRECTORY: Media directory; indexed first (see `dlna index`), then
+    browsable and searchable from TVs and control points
+    """
+    import threading
+    from pathlib import Path
+
+    from .contentdir import SsdpAdvertiser
+    from .library import MediaLibrary
+    from .server import MediaServer
+    from .thumbs import ThumbnailCache
+
+    with MediaLibrary(Path(directory)) as library:
+        stats = library.refresh()
+        click.echo(f"Indexed {stats.probed + stats.unchanged} file(s) ({stats.probed} probed)")
+
+        server = MediaServer(Path(directory), port=port, library=library, name=name, thumbnails=ThumbnailCache())
+        advertiser = SsdpAdvertiser(server.device, server.start())
+        try:
+            advertiser.start()
+        except OSError as e:
+            click.echo(f"SSDP unavailable ({e}); add the server by its description URL", err=True)
+            advertiser = None
+
+        click.echo(f"Serving '{server.device.name}' at {server.description_url} (Ctrl+C to stop)")
+        try:
+            threading.Event().wait()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            if advertiser:
+                advertiser.stop()
+            server.stop()
 
 
 @cli.command()
@@ -72,36 +437,181 @@ def stop_cmd(device_name: str | None):
 
     DEVICE_NAME: Name of the DLNA device (optional, uses default if not provided)
     """
+    response = _forward({"op": "stop", "device": device_name})
+    if response is not None:
+        if response.get("ok"):
+            click.echo("Playback stopped")
+        return
+
+    from .discover import find_device
+    from .player import DLNAClient, stop
+
     async def _stop():
-        device = await find_device(device_name)
-        if not device:
-            if device_name:
-                click.echo(f"Device '{device_name}' not found", err=True)
-            return
+        async with DLNAClient() as client:
+            device = await find_device(device_name, client=client)
+            if not device:
+                if device_name:
+                    click.echo(f"Device '{device_name}' not found", err=True)
+                return
 
-        await stop(device)
+            await stop(device, client=client)
 
-    asyncio.run(_stop())
+    _run(_stop())
 
 
 @cli.command()
-@click.argument("device_name", required=False)
-def status(device_name: str | None):
-    """Get playback status of a DLNA device.
+@click.argument("device_names", nargs=-1)
+@click.option("--follow", "-f", is_flag=True, help="Subscribe to state changes and print them as they arrive")
+@click.option("--json", "as_json", is_flag=True, help="Print JSON (one line per event with --follow)")
+def status(device_names: tuple[str, ...], follow: bool, as_json: bool):
+    """Get playback status of one or more DLNA devices.
 
-    DEVICE_NAME: Name of the DLNA device (optional, uses default if not provided)
+    DEVICE_NAMES: Names of the DLNA devices (optional, uses default if not provided)
     """
+    names = list(device_names) or [None]
+
+    if follow:
+        _follow_status(names, as_json)
+        return
+
+    if len(names) == 1:
+        response = _forward({"op": "status", "device": names[0]})
+        if response is not None:
+            if response.get("ok"):
+                if as_json:
+                    _echo_json([{"device": response["device"], "ok": True, "state": response["state"]}])
+                else:
+                    click.echo(f"State: {response['state']}")
+            return
+
+    from .batch import run_batch
+    from .player import DLNAClient
+
     async def _status():
-        device = await find_device(device_name)
-        if not device:
-            if device_name:
-                click.echo(f"Device '{device_name}' not found", err=True)
+        async with DLNAClient() as client:
+            operations = [{"action": "status", "device": name} for name in names]
+            return await run_batch(operations, client)
+
+    results = _run(_status(), quiet=as_json)
+    if as_json:
+        _echo_json(results)
+        return
+
+    for name, result in zip(names, results):
+        if not result["ok"] and result["error"] == "Device not found":
+            if name:
+                click.echo(f"Device '{name}' not found", err=True)
+            continue
+        state = result.get("state") or f"ERROR: {result.get('error')}"
+        if len(names) == 1:
+            click.echo(f"State: {state}")
+        else:
+            click.echo(f"{result['device']}: {state}")
+
+
+def _follow_status(names: list[str | None], as_json: bool = False):
+    """Print AVTransport state transitions of devices until interrupted."""
+    import time
+
+    from .events import follow_status
+    from .player import DLNAClient
+
+    last_states: dict[str, str] = {}
+
+    def on_event(event):
+        if last_states.get(event.device.udn) == event.state:
             return
+        last_states[event.device.udn] = event.state
+        if as_json:
+            _echo_json(
+                {
+                    "time": time.time(),
+                    "device": event.device.name,
+                    "udn": event.device.udn,
+                    "state": event.state,
+                    "changes": event.changes,
+                }
+            )
+        else:
+            click.echo(f"[{time.strftime('%H:%M:%S')}] {event.device.name}: {event.state}")
+
+    async def _follow():
+        async with DLNAClient() as client:
+            devices = await _find_devices(names, client)
+            if not devices:
+                return
+
+            if not as_json:
+                click.echo(f"Following {len(devices)} device(s) (Ctrl+C to stop)...")
+            await follow_status(devices, on_event, client=client)
+
+    try:
+        _run(_follow())
+    except KeyboardInterrupt:
+        pass
+
+
+@cli.command()
+@click.argument("file", type=click.File("r"), default="-")
+@click.option("--timeout", "-t", default=5, help="Scan timeout in seconds, if a scan is needed")
+def batch(file, timeout: int):
+    """Run many play/stop/status operations concurrently.
+
+    FILE: JSON array or JSON lines of operations ("-" or omitted: stdin), e.g.
+    {"action": "status", "device": "Kitchen"} or
+    {"action": "play", "device": "TV", "url": "http://..."}
 
-        result = await get_status(device)
-        click.echo(f"State: {result.state}")
+    All devices are found with at most one scan and share one session.
+    Prints one JSON result per operation, in input order.
+    """
+    from .batch import parse_operations, run_batch
+    from .player import DLNAClient
+
+    try:
+        operations = parse_operations(file.read())
+    except ValueError as e:
+        raise click.BadParameter(str(e), param_hint="FILE")
+
+    async def _batch():
+        async with DLNAClient() as client:
+            return await run_batch(operations, client, timeout=timeout)
+
+    for result in _run(_batch(), quiet=True):
+        _echo_json(result)
+
+
+@cli.command()
+def watch():
+    """Track renderers from SSDP announcements and serve them to other commands.
+
+    While this runs, play/stop/status find devices instantly.
+    """
+    from .watch import run_watcher
+
+    def on_change(event: str, device):
+        click.echo(f"[{event}] {device.name} ({device.location})")
+
+    click.echo("Watching for DLNA renderers (Ctrl+C to stop)...")
+    try:
+        _run(run_watcher(on_change=on_change))
+    except KeyboardInterrupt:
+        pass
+
+
+@cli.command("serve-control")
+def serve_control():
+    """Run a control daemon that keeps devices and sessions warm.
+
+    While this runs, play/stop/status are forwarded to it over a local
+    socket and cost one SOAP request each.
+    """
+    from .daemon import run_daemon
 
-    asyncio.run(_status())
+    click.echo("DLNA control daemon running (Ctrl+C to stop)...")
+    try:
+        _run(run_daemon())
+    except KeyboardInterrupt:
+        pass
 
 
 @cli.command()
@@ -5,6 +5,7 @@ Config is stored in the skill directory under .dlna/config.json
 
 import json
 import os
+import tempfile
 from pathlib import Path
 from dataclasses import dataclass, asdict
 from typing import Optional
@@ -28,6 +29,28 @@ def _get_config_file() -> Path:
     return _get_config_dir() / "config.json"
 
 
+def _write_json(path: Path, data, **kwargs) -> None:
+    """Write JSON to a file atomically.
+
+    The data goes to a temporary file in the same directory, which then
+    replaces the file; the watcher, the daemon and CLI commands write the
+    same files, and a reader must never see one half written.
+
+    Args:
+        path: File to write
+        data: JSON-serializable data
+        **kwargs: Extra json.dump arguments (e.g. indent)
+    """
+    fd, partial = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, **kwargs)
+        os.replace(partial, path)
+    except BaseException:
+        Path(partial).unlink(missing_ok=True)
+        raise
+
+
 @dataclass
 class DLNAConfig:
     """DLNA skill configuration."""
@@ -36,9 +59,7 @@ class DLNAConfig:
 
     def save(self) -> None:
         """Save config to file."""
-        config_file = _get_config_file()
-        with open(config_file, "w", encoding="utf-8") as f:
-            json.dump(asdict(self), f, indent=2, ensure_ascii=False)
+        _write_json(_get_config_file(), asdict(self), indent=2)
 
     @classmethod
     def load(cls) -> "DLNAConfig":
@@ -0,0 +1,527 @@
+"""UPnP MediaServer device on top of the media index.
+
+MediaServerDevice implements ContentDirectory:1 (Browse, Search) and a
+minimal ConnectionManager:1 for a MediaLibrary, so control points and TVs
+can browse the served directory. Every page is one LIMIT/OFFSET query on
+the index, so large folders answer as fast as small ones. MediaServer
+serves it under UPNP_PREFIX; SsdpAdvertiser announces it on the network.
+
+Object IDs are library paths, with "0" for the root.
+"""
+
+import re
+import socket
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from typing import Optional
+from urllib.parse import quote
+from xml.sax.saxutils import escape
+
+from .didl import DIDL_FOOTER, DIDL_HEADER, container_xml, item_xml
+from .library import LibraryEntry, MediaLibrary
+from .server import THUMBS_PREFIX, _get_local_ip, local_ip_for
+from .soap import ActionError, parse_soap, scpd_xml, soap_fault, soap_response
+
+MEDIA_SERVER_DEVICE_TYPE = "urn:schemas-upnp-org:device:MediaServer:1"
+CONTENT_DIRECTORY_SERVICE_TYPE = "urn:schemas-upnp-org:service:ContentDirectory:1"
+CONNECTION_MANAGER_SERVICE_TYPE = "urn:schemas-upnp-org:service:ConnectionManager:1"
+
+# Description, SCPDs and control URLs live here; dot paths are never indexed
+UPNP_PREFIX = "/.upnp"
+DESCRIPTION_PATH = f"{UPNP_PREFIX}/description.xml"
+
+ROOT_ID = "0"
+
+# Page size when a control point asks for everything (RequestedCount=0)
+MAX_PAGE = 500
+
+SSDP_GROUP = ("239.255.255.250", 1900)
+
+# Seconds an announcement stays valid; re-announced at half of it
+SSDP_MAX_AGE = 1800
+
+# Service type -> (service id, SCPD path, control path)
+SERVICES = {
+    CONTENT_DIRECTORY_SERVICE_TYPE: (
+        "urn:upnp-org:serviceId:ContentDirectory",
+        f"{UPNP_PREFIX}/ContentDirectory.xml",
+        f"{UPNP_PREFIX}/ContentDirectory/control",
+    ),
+    CONNECTION_MANAGER_SERVICE_TYPE: (
+        "urn:upnp-org:serviceId:ConnectionManager",
+        f"{UPNP_PREFIX}/ConnectionManager.xml",
+        f"{UPNP_PREFIX}/ConnectionManager/control",
+    ),
+}
+
+# Service type -> {action: (in arguments, out arguments)}; each argument is (name, state variable)
+ACTIONS = {
+    CONTENT_DIRECTORY_SERVICE_TYPE: {
+        "Browse": (
+            [
+                ("ObjectID", "A_ARG_TYPE_ObjectID"),
+                ("BrowseFlag", "A_ARG_TYPE_BrowseFlag"),
+                ("Filter", "A_ARG_TYPE_Filter"),
+                ("StartingIndex", "A_ARG_TYPE_Index"),
+                ("RequestedCount", "A_ARG_TYPE_Count"),
+                ("SortCriteria", "A_ARG_TYPE_SortCriteria"),
+            ],
+            [
+                ("Result", "A_ARG_TYPE_Result"),
+                ("NumberReturned", "A_ARG_TYPE_Count"),
+                ("TotalMatches", "A_ARG_TYPE_Count"),
+                ("UpdateID", "A_ARG_TYPE_UpdateID"),
+            ],
+        ),
+        "Search": (
+            [
+                ("ContainerID", "A_ARG_TYPE_ObjectID"),
+                ("SearchCriteria", "A_ARG_TYPE_SearchCriteria"),
+                ("Filter", "A_ARG_TYPE_Filter"),
+                ("StartingIndex", "A_ARG_TYPE_Index"),
+                ("RequestedCount", "A_ARG_TYPE_Count"),
+                ("SortCriteria", "A_ARG_TYPE_SortCriteria"),
+            ],
+            [
+                ("Result", "A_ARG_TYPE_Result"),
+                ("NumberReturned", "A_ARG_TYPE_Count"),
+                ("TotalMatches", "A_ARG_TYPE_Count"),
+                ("UpdateID", "A_ARG_TYPE_UpdateID"),
+            ],
+        ),
+        "GetSearchCapabilities": ([], [("SearchCaps", "SearchCapabilities")]),
+        "GetSortCapabilities": ([], [("SortCaps", "SortCapabilities")]),
+        "GetSystemUpdateID": ([], [("Id", "SystemUpdateID")]),
+    },
+    CONNECTION_MANAGER_SERVICE_TYPE: {
+        "GetProtocolInfo": ([], [("Source", "SourceProtocolInfo"), ("Sink", "SinkProtocolInfo")]),
+        "GetCurrentConnectionIDs": ([], [("ConnectionIDs", "CurrentConnectionIDs")]),
+        "GetCurrentConnectionInfo": (
+            [("ConnectionID", "A_ARG_TYPE_ConnectionID")],
+            [
+                ("RcsID", "A_ARG_TYPE_RcsID"),
+                ("AVTransportID", "A_ARG_TYPE_AVTransportID"),
+                ("ProtocolInfo", "A_ARG_TYPE_ProtocolInfo"),
+                ("PeerConnectionManager", "A_ARG_TYPE_ConnectionManager"),
+                ("PeerConnectionID", "A_ARG_TYPE_ConnectionID"),
+                ("Direction", "A_ARG_TYPE_Direction"),
+                ("Status", "A_ARG_TYPE_ConnectionStatus"),
+            ],
+        ),
+    },
+}
+
+# State variable -> UPnP data type
+STATE_VARIABLES = {
+    CONTENT_DIRECTORY_SERVICE_TYPE: {
+        "A_ARG_TYPE_ObjectID": "string",
+        "A_ARG_TYPE_BrowseFlag": "string",
+        "A_ARG_TYPE_Filter": "string",
+        "A_ARG_TYPE_Index": "ui4",
+        "A_ARG_TYPE_Count": "ui4",
+        "A_ARG_TYPE_SortCriteria": "string",
+        "A_ARG_TYPE_SearchCriteria": "string",
+        "A_ARG_TYPE_Result": "string",
+        "A_ARG_TYPE_UpdateID": "ui4",
+        "SearchCapabilities": "string",
+        "SortCapabilities": "string",
+        "SystemUpdateID": "ui4",
+    },
+    CONNECTION_MANAGER_SERVICE_TYPE: {
+        "SourceProtocolInfo": "string",
+        "SinkProtocolInfo": "string",
+        "CurrentConnectionIDs": "string",
+        "A_ARG_TYPE_ConnectionID": "i4",
+        "A_ARG_TYPE_RcsID": "i4",
+        "A_ARG_TYPE_AVTransportID": "i4",
+        "A_ARG_TYPE_ProtocolInfo": "string",
+        "A_ARG_TYPE_ConnectionManager": "string",
+        "A_ARG_TYPE_Direction": "string",
+        "A_ARG_TYPE_ConnectionStatus": "string",
+    },
+}
+
+# upnp:class prefix -> top-level MIME type of matching files
+_CLASS_MEDIA_TYPES = {
+    "object.item.videoitem": "video",
+    "object.item.audioitem": "audio",
+    "object.item.imageitem": "image",
+}
+
+_CRITERION_RE = re.compile(
+    r'\s*([\w:@]+)\s+(derivedfrom|contains|exists|=)\s+("(?:[^"\\]|\\.)*"|true|false)\s*',
+    re.IGNORECASE,
+)
+
+
+def object_id(path: str) -> str:
+    """Object ID of a library path."""
+    return path or ROOT_ID
+
+
+def object_path(object_id: str) -> str:
+    """Library path of an object ID."""
+    return "" if object_id in (ROOT_ID, "") else object_id.strip("/")
+
+
+@dataclass
+class SearchQuery:
+    """The subset of UPnP search criteria the index can answer."""
+
+    media_type: Optional[str] = None  # e.g. "audio"; None: any item
+    title: Optional[str] = None
+    match_nothing: bool = False  # asks for containers or unindexed properties
+
+
+def parse_search_criteria(criteria: str) -> SearchQuery:
+    """Parse SearchCriteria made of "and"-ed upnp:class and dc:title terms.
+
+    Raises:
+        ActionError: 708 if the criteria are not understood
+    """
+    query = SearchQuery()
+    text = criteria.strip().replace("(", " ").replace(")", " ").strip()
+    if text in ("", "*"):
+        return query
+
+    position = 0
+    while True:
+        match = _CRITERION_RE.match(text, position)
+        if not match:
+            raise ActionError(708, "Unsupported or invalid search criteria")
+        prop, op, value = match.group(1).lower(), match.group(2).lower(), match.group(3)
+        value = value[1:-1].replace('\\"', '"') if value.startswith('"') else value
+
+        if op == "exists":
+            pass
+        elif prop == "upnp:class":
+            upnp_class = value.lower()
+            if upnp_class.startswith("object.container"):
+                query.match_nothing = True
+            elif upnp_class not in ("object", "object.item"):
+                media_type = next(
+                    (t for prefix, t in _CLASS_MEDIA_TYPES.items() if upnp_class.startswith(prefix)), None
+                )
+                if media_type is None:
+                    query.match_nothing = True
+                query.media_type = media_type
+        elif prop == "dc:title" and op in ("contains", "="):
+            query.title = value
+        else:
+            query.match_nothing = True
+
+        position = match.end()
+        if position == len(text):
+            return query
+        connector = re.match(r"and\s", text[position:], re.IGNORECASE)
+        if not connector:
+            raise ActionError(708, "Unsupported or invalid search criteria")
+        position += connector.end()
+
+
+def _int_arg(args: dict[str, str], name: str) -> int:
+    try:
+        value = int(args.get(name) or 0)
+    except ValueError:
+        raise ActionError(402, f"Invalid {name}")
+    if value < 0:
+        raise ActionError(402, f"Invalid {name}")
+    return value
+
+
+class MediaServerDevice:
+    """A UPnP MediaServer for one MediaLibrary.
+
+    Args:
+        library: Index of the served directory
+        name: Friendly name shown by control points
+        album_art: Whether items link to thumbnails under THUMBS_PREFIX
+    """
+
+    def __init__(self, library: MediaLibrary, name: str = "", album_art: bool = False):
+        self.library = library
+        self.name = name or f"dlna ({socket.gethostname()})"
+        self.album_art = album_art
+        # Stable across restarts, so control points keep their bookmarks
+        self.udn = f"uuid:{uuid.uuid5(uuid.NAMESPACE_URL, f'dlna:{socket.gethostname()}:{library.root}')}"
+        self._scpds = {
+            SERVICES[t][1]: scpd_xml(ACTIONS[t], STATE_VARIABLES[t], evented=("SystemUpdateID",)) for t in SERVICES
+        }
+        self._controls = {SERVICES[t][2]: t for t in SERVICES}
+
+    def description_xml(self) -> str:
+        """Device description document."""
+        services = "".join(
+            "<service>"
+            f"<serviceType>{service_type}</serviceType>"
+            f"<serviceId>{service_id}</serviceId>"
+            f"<SCPDURL>{scpd_path}</SCPDURL>"
+            f"<controlURL>{control_path}</controlURL>"
+            "<eventSubURL></eventSubURL>"
+            "</service>"
+            for service_type, (service_id, scpd_path, control_path) in SERVICES.items()
+        )
+        return (
+            '<?xml version="1.0" encoding="utf-8"?>'
+            '<root xmlns="urn:schemas-upnp-org:device-1-0" xmlns:dlna="urn:schemas-dlna-org:device-1-0">'
+            "<specVersion><major>1</major><minor>0</minor></specVersion>"
+            "<device>"
+            f"<deviceType>{MEDIA_SERVER_DEVICE_TYPE}</deviceType>"
+            f"<friendlyName>{escape(self.name)}</friendlyName>"
+            "<manufacturer>dlna</manufacturer>"
+            "<modelName>dlna media server</modelName>"
+            f"<UDN>{self.udn}</UDN>"
+            "<dlna:X_DLNADOC>DMS-1.50</dlna:X_DLNADOC>"
+            f"<serviceList>{services}</serviceList>"
+            "</device>"
+            "</root>"
+        )
+
+    def document(self, path: str) -> Optional[str]:
+        """Description or SCPD document served at a path, if any."""
+        if path == DESCRIPTION_PATH:
+            return self.description_xml()
+        return self._scpds.get(path)
+
+    def control(self, path: str, body: bytes, base_url: str) -> tuple[int, bytes]:
+        """Handle a SOAP request to a control URL.
+
+        Args:
+            path: Request path
+            body: SOAP envelope
+            base_url: Media server URL as reachable by the caller
+
+        Returns:
+            (HTTP status, SOAP response or fault)
+        """
+        service_type = self._controls.get(path)
+        try:
+            if service_type is None:
+                raise ActionError(401, "Invalid Action")
+            action, args = parse_soap(body)
+            if action not in ACTIONS[service_type]:
+                raise ActionError(401, "Invalid Action")
+            out = self._call(action, args, base_url)
+        except ActionError as e:
+            return 500, soap_fault(e)
+        return 200, soap_response(service_type, action, out)
+
+    def _call(self, action: str, args: dict[str, str], base_url: str) -> dict:
+        if action == "Browse":
+            return self.browse(
+                args.get("ObjectID", ROOT_ID),
+                args.get("BrowseFlag", ""),
+                _int_arg(args, "StartingIndex"),
+                _int_arg(args, "RequestedCount"),
+                base_url,
+            )
+        if action == "Search":
+            return self.search(
+                args.get("ContainerID", ROOT_ID),
+                args.get("SearchCriteria", ""),
+                _int_arg(args, "StartingIndex"),
+                _int_arg(args, "RequestedCount"),
+                base_url,
+            )
+        if action == "GetSearchCapabilities":
+            return {"SearchCaps": "dc:title,upnp:class"}
+        if action == "GetSortCapabilities":
+            return {"SortCaps": ""}
+        if action == "GetSystemUpdateID":
+            return {"Id": self.library.update_id}
+        if action == "GetProtocolInfo":
+            return {"Source": "http-get:*:*:*", "Sink": ""}
+        if action == "GetCurrentConnectionIDs":
+            return {"ConnectionIDs": "0"}
+        # GetCurrentConnectionInfo: only the implicit connection 0 exists
+        if args.get("ConnectionID", "0") != "0":
+            raise ActionError(706, "Invalid connection reference")
+        return {
+            "RcsID": -1,
+            "AVTransportID": -1,
+            "ProtocolInfo": "",
+            "PeerConnectionManager": "",
+            "PeerConnectionID": -1,
+            "Direction": "Output",
+            "Status": "OK",
+        }
+
+    def browse(self, object_id: str, browse_flag: str, start: int, count: int, base_url: str) -> dict:
+        """Browse action: one object, or one page of a folder."""
+        path = object_path(object_id)
+        entry = self.library.get(path)
+        if entry is None:
+            raise ActionError(701, "No such object")
+
+        if browse_flag == "BrowseMetadata":
+            entries, total = [entry], 1
+        elif browse_flag == "BrowseDirectChildren":
+            if not entry.is_dir:
+                raise ActionError(710, "No such container")
+            entries = self.library.children(path, start, count or MAX_PAGE)
+            total = self.library.count(path)
+        else:
+            raise ActionError(402, "Invalid BrowseFlag")
+        return self._result(entries, total, base_url)
+
+    def search(self, container_id: str, criteria: str, start: int, count: int, base_url: str) -> dict:
+        """Search action: one page of the files below a folder matching the criteria."""
+        path = object_path(container_id)
+        entry = self.library.get(path)
+        if entry is None or not entry.is_dir:
+            raise ActionError(710, "No such container")
+
+        query = parse_search_criteria(criteria)
+        if query.match_nothing:
+            return self._result([], 0, base_url)
+        entries, total = self.library.search(path, query.media_type, query.title, start, count or MAX_PAGE)
+        return self._result(entries, total, base_url)
+
+    def _result(self, entries: list[LibraryEntry], total: int, base_url: str) -> dict:
+        parts = [DIDL_HEADER]
+        for entry in entries:
+            parent_id = object_id(entry.parent) if entry.path else "-1"
+            if entry.is_dir:
+                title = entry.name or self.name
+                parts.append(container_xml(object_id(entry.path), parent_id, title, self.library.count(entry.path)))
+            else:
+                url = f"{base_url}/{quote(entry.path)}"
+                art_url = None
+                if self.album_art and entry.mime_type.split("/")[0] in ("audio", "video", "image"):
+                    art_url = f"{base_url}{THUMBS_PREFIX}/{quote(entry.path)}"
+                title = entry.name.rsplit(".", 1)[0]
+                parts.append(item_xml(entry.path, parent_id, title, url, entry.info, album_art_url=art_url))
+        parts.append(DIDL_FOOTER)
+        return {
+            "Result": "".join(parts),
+            "NumberReturned": len(entries),
+            "TotalMatches": total,
+            "UpdateID": self.library.update_id,
+        }
+
+
+class SsdpAdvertiser:
+    """Announces a MediaServerDevice with SSDP and answers M-SEARCH.
+
+    Runs in a background thread, like MediaServer.
+
+    Args:
+        device: The device to announce
+        port: Port of the MediaServer serving it
+    """
+
+    def __init__(self, device: MediaServerDevice, port: int, max_age: int = SSDP_MAX_AGE):
+        self.device = device
+        self.port = port
+        self.max_age = max_age
+        self._socket: Optional[socket.socket] = None
+        self._thread: Optional[threading.Thread] = None
+        self._stopped = threading.Event()
+
+    @property
+    def targets(self) -> list[tuple[str, str]]:
+        """(NT/ST, USN) pairs for the device and its services."""
+        udn = self.device.udn
+        targets = [("upnp:rootdevice", f"{udn}::upnp:rootdevice"), (udn, udn)]
+        for notification_type in (MEDIA_SERVER_DEVICE_TYPE, *SERVICES):
+            targets.append((notification_type, f"{udn}::{notification_type}"))
+        return targets
+
+    def location(self, local_ip: str) -> str:
+        """Description URL on one local address."""
+        return f"http://{local_ip}:{self.port}{DESCRIPTION_PATH}"
+
+    def start(self) -> None:
+        """Join the SSDP group, announce the device and start answering searches."""
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM, socket.IPPROTO_UDP)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        if hasattr(socket, "SO_REUSEPORT"):
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+        sock.bind(("", SSDP_GROUP[1]))
+        membership = socket.inet_aton(SSDP_GROUP[0]) + socket.inet_aton("0.0.0.0")
+        sock.setsockopt(socket.IPPROTO_IP, socket.IP_ADD_MEMBERSHIP, membership)
+        sock.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_TTL, 2)
+        sock.settimeout(1.0)
+        self._socket = sock
+
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._serve, daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Announce ssdp:byebye and stop."""
+        if self._socket is None:
+            return
+        self._stopped.set()
+        if self._thread:
+            self._thread.join()
+        self._notify("ssdp:byebye")
+        self._socket.close()
+        self._socket = None
+
+    def responses(self, search_target: str, local_ip: str) -> list[bytes]:
+        """M-SEARCH responses for a search target."""
+        return [
+            (
+                "HTTP/1.1 200 OK\r\n"
+                f"CACHE-CONTROL: max-age={self.max_age}\r\n"
+                "EXT:\r\n"
+                f"LOCATION: {self.location(local_ip)}\r\n"
+                "SERVER: dlna UPnP/1.0 DLNADOC/1.50\r\n"
+                f"ST: {target}\r\n"
+                f"USN: {usn}\r\n"
+                "\r\n"
+            ).encode()
+            for target, usn in self.targets
+            if search_target in ("ssdp:all", target)
+        ]
+
+    def _notify(self, nts: str) -> None:
+        location = self.location(_get_local_ip())
+        for target, usn in self.targets:
+            lines = [
+                "NOTIFY * HTTP/1.1",
+                f"HOST: {SSDP_GROUP[0]}:{SSDP_GROUP[1]}",
+                f"NT: {target}",
+                f"NTS: {nts}",
+                f"USN: {usn}",
+            ]
+            if nts == "ssdp:alive":
+                lines += [f"CACHE-CONTROL: max-age={self.max_age}", f"LOCATION: {location}", "SERVER: dlna UPnP/1.0"]
+            try:
+                self._socket.sendto(("\r\n".join(lines) + "\r\n\r\n").encode(), SSDP_GROUP)
+            except OSError:
+                pass
+
+    def _serve(self) -> None:
+        next_notify = 0.0
+        while not self._stopped.is_set():
+            if time.monotonic() >= next_notify:
+                self._notify("ssdp:alive")
+                next_notify = time.monotonic() + self.max_age / 2
+            try:
+                data, addr = self._socket.recvfrom(2048)
+            except socket.timeout:
+                continue
+            except OSError:
+                return
+            self._answer(data, addr)
+
+    def _answer(self, data: bytes, addr) -> None:
+        lines = data.decode("utf-8", "replace").split("\r\n")
+        if not lines[0].upper().startswith("M-SEARCH"):
+            return
+        headers = {}
+        for line in lines[1:]:
+            key, _, value = line.partition(":")
+            headers[key.strip().upper()] = value.strip()
+        if headers.get("MAN", "").strip('"') != "ssdp:discover":
+            return
+
+        for response in self.responses(headers.get("ST", ""), local_ip_for(addr[0])):
+            try:
+                self._socket.sendto(response, addr)
+            except OSError:
+                return
@@ -0,0 +1,97 @@
+"""Long-running control daemon.
+
+`dlna serve-control` keeps one DLNAClient (connection pool and parsed
+descriptions) and a live renderer table warm, and executes play/stop/status
+requests received on .dlna/control.sock. The CLI forwards those commands
+to it when it is running, so a command costs one SOAP request.
+"""
+
+import asyncio
+from pathlib import Path
+from typing import Optional
+
+from . import ipc
+from .config import get_default_device
+from .discover import find_device
+from .player import DLNAClient, DLNADevice, get_status, play_url, stop
+from .watch import Watcher
+
+
+class ControlDaemon:
+    """Executes control requests against warm devices and sessions."""
+
+    def __init__(self, client: DLNAClient):
+        self.client = client
+        self.watcher = Watcher(client)
+
+    async def resolve(self, name: Optional[str]) -> DLNADevice:
+        """Find a device by name (or the default device) without scanning if possible."""
+        if name is None:
+            name = get_default_device()
+            if name is None:
+                raise LookupError("No device specified and no default device configured")
+
+        device = self.watcher.table.find(name)
+        if device is None:
+            # The table above is what watch.sock would answer: skip the round trip to ourselves
+            device = await find_device(name, client=self.client, use_watcher=False)
+        if device is None:
+            raise LookupError(f"Device '{name}' not found")
+
+        self.watcher.table.update(device)
+        return device
+
+    async def handle(self, message: dict) -> dict:
+        """Answer a control request."""
+        op = message.get("op")
+        if op in ("devices", "find"):
+            return await self.watcher.handle(message)
+        if op not in ("play", "stop", "status"):
+            return {"ok": False, "error": f"Unknown op: {op}"}
+
+        try:
+            device = await self.resolve(message.get("device"))
+        except LookupError as e:
+            return {"ok": False, "error": str(e)}
+
+        if op == "play":
+            await play_url(device, message["url"], client=self.client)
+            return {"ok": True, "device": device.name}
+        if op == "stop":
+            await stop(device, client=self.client)
+            return {"ok": True, "device": device.name}
+
+        result = await get_status(device, client=self.client)
+        return {"ok": True, "device": device.name, "state": result.state}
+
+
+async def run_daemon() -> None:
+    """Run the control daemon until cancelled.
+
+    The daemon also answers watcher queries on .dlna/watch.sock, so
+    find_device in other processes benefits from its renderer table;
+    if `dlna watch` already serves that socket, it is left to it.
+
+    Raises:
+        RuntimeError: If another control daemon is already running
+    """
+    control_path = ipc._get_control_socket_path()
+    watch_path = ipc._get_watch_socket_path()
+
+    async with DLNAClient() as client:
+        daemon = ControlDaemon(client)
+        # Only sockets this process serves are closed and removed on exit
+        servers: list[tuple[asyncio.AbstractServer, Path]] = []
+        try:
+            servers.append((await ipc.serve(control_path, daemon.handle), control_path))
+            try:
+                servers.append((await ipc.serve(watch_path, daemon.watcher.handle), watch_path))
+            except RuntimeError:
+                pass  # A running `dlna watch` answers watcher queries already
+            await daemon.watcher.start()
+            await asyncio.Event().wait()
+        finally:
+            for server, path in servers:
+                server.close()
+                path.unlink(missing_ok=True)
+            await daemon.watcher.stop()
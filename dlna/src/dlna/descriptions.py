@@ -0,0 +1,203 @@
+"""Cache of UPnP device and service descriptions.
+
+Parsed devices are kept in memory for the life of a DLNAClient; the raw
+device description and SCPD documents are stored under .dlna/descriptions/
+so a new process can rebuild a device without downloading anything.
+
+Entries are keyed by LOCATION and validated against the device UDN and,
+when the device announces them, its BOOTID.UPNP.ORG / CONFIGID.UPNP.ORG
+values, so a rebooted or reconfigured renderer is fetched again.
+"""
+
+import hashlib
+import json
+import time
+from dataclasses import dataclass, asdict, field
+from pathlib import Path
+from typing import Optional
+
+from async_upnp_client.client import UpnpDevice, UpnpRequester
+from async_upnp_client.client_factory import UpnpFactory
+from async_upnp_client.const import HttpRequest, HttpResponse
+
+from . import trace
+from .config import _get_config_dir, _write_json
+
+# Descriptions rarely change; BOOTID/CONFIGID and failures invalidate earlier
+DEFAULT_TTL = 24 * 60 * 60
+
+
+def _get_descriptions_dir() -> Path:
+    """Get the on-disk description cache directory."""
+    descriptions_dir = _get_config_dir() / "descriptions"
+    descriptions_dir.mkdir(parents=True, exist_ok=True)
+    return descriptions_dir
+
+
+@dataclass
+class DescriptionEntry:
+    """Raw description documents of one device."""
+
+    location: str
+    udn: str = ""
+    boot_id: str = ""
+    config_id: str = ""
+    fetched_at: float = 0.0
+    documents: dict[str, str] = field(default_factory=dict)
+
+    def matches(self, udn: str = "", boot_id: str = "", config_id: str = "") -> bool:
+        """Check the entry against identifiers known for the device."""
+        for cached, wanted in (
+            (self.udn, udn),
+            (self.boot_id, boot_id),
+            (self.config_id, config_id),
+        ):
+            if cached and wanted and cached != wanted:
+                return False
+        return True
+
+
+class _ReplayRequester(UpnpRequester):
+    """Requester that answers GETs from stored documents and records the rest."""
+
+    def __init__(self, inner: UpnpRequester, documents: dict[str, str]):
+        self._inner = inner
+        self.documents = dict(documents)
+
+    async def async_http_request(self, http_request: HttpRequest) -> HttpResponse:
+        if http_request.method == "GET" and http_request.url in self.documents:
+            return HttpResponse(200, {}, self.documents[http_request.url])
+
+        if http_request.method != "GET":
+            # SOAP actions of the device built on this requester
+            return await self._inner.async_http_request(http_request)
+
+        with trace.span("http.get", url=http_request.url):
+            response = await self._inner.async_http_request(http_request)
+        if response.status_code == 200 and response.body:
+            self.documents[http_request.url] = response.body
+        return response
+
+
+class DescriptionCache:
+    """In-process and on-disk cache of device descriptions."""
+
+    def __init__(self, ttl: float = DEFAULT_TTL, persist: bool = True):
+        self.ttl = ttl
+        self.persist = persist
+        self._entries: dict[str, DescriptionEntry] = {}
+        self._devices: dict[str, UpnpDevice] = {}
+
+    async def get_device(
+        self,
+        requester: UpnpRequester,
+        location: str,
+        udn: str = "",
+        boot_id: str = "",
+        config_id: str = "",
+        revalidate: bool = False,
+    ) -> UpnpDevice:
+        """Get a parsed device, downloading only what is not cached.
+
+        Args:
+            requester: Requester used for downloads and, later, SOAP actions
+            location: Device description URL
+            udn: Expected device UDN (optional)
+            boot_id: BOOTID.UPNP.ORG announced by the device (optional)
+            config_id: CONFIGID.UPNP.ORG announced by the device (optional)
+            revalidate: Fetch the root description again and reuse the cached
+                        service descriptions only if it is unchanged. This
+                        doubles as a liveness check.
+
+        Returns:
+            UpnpDevice with all of its services
+        """
+        entry = self._lookup(location, udn, boot_id, config_id)
+        documents = dict(entry.documents) if entry else {}
+
+        if revalidate:
+            with trace.span("description.revalidate", location=location):
+                response = await requester.async_http_request(
+                    HttpRequest("GET", location, {}, None)
+                )
+            if response.status_code != 200 or not response.body:
+                self.invalidate(location)
+                raise ConnectionError(f"{location} returned HTTP {response.status_code}")
+            if documents.get(location) != response.body:
+                # Root description changed: service descriptions may have too
+                self._devices.pop(location, None)
+                documents = {location: response.body}
+
+        device = self._devices.get(location) if entry else None
+        if device is not None and location in documents:
+            return device
+
+        # Parse time is this span minus its http.get children
+        with trace.span("description.build", location=location, cached=len(documents)):
+            replay = _ReplayRequester(requester, documents)
+            device = await UpnpFactory(replay).async_create_device(location)
+
+        entry = DescriptionEntry(
+            location=location,
+            udn=device.udn or udn,
+            boot_id=boot_id,
+            config_id=config_id,
+            fetched_at=time.time(),
+            documents=replay.documents,
+        )
+        self._entries[location] = entry
+        self._devices[location] = device
+        if self.persist:
+            self._save(entry)
+        return device
+
+    def invalidate(self, location: str) -> None:
+        """Drop a device from both caches, e.g. after a failed action."""
+        self._entries.pop(location, None)
+        self._devices.pop(location, None)
+        if self.persist:
+            _entry_file(location).unlink(missing_ok=True)
+
+    def _lookup(
+        self, location: str, udn: str, boot_id: str, config_id: str
+    ) -> Optional[DescriptionEntry]:
+        """Find a fresh, matching entry in memory or on disk."""
+        entry = self._entries.get(location)
+        if entry is None and self.persist:
+            entry = _load(location)
+            if entry is not None:
+                self._entries[location] = entry
+
+        if entry is None:
+            return None
+
+        if time.time() - entry.fetched_at > self.ttl or not entry.matches(udn, boot_id, config_id):
+            self.invalidate(location)
+            return None
+
+        return entry
+
+    def _save(self, entry: DescriptionEntry) -> None:
+        """Write an entry to disk."""
+        _write_json(_entry_file(entry.location), asdict(entry))
+
+
+def _entry_file(location: str) -> Path:
+    """Path of the on-disk entry for a description URL."""
+    digest = hashlib.sha1(location.encode("utf-8")).hexdigest()
+    return _get_descriptions_dir() / f"{digest}.json"
+
+
+def _load(location: str) -> Optional[DescriptionEntry]:
+    """Read an entry from disk."""
+    entry_file = _entry_file(location)
+    if not entry_file.exists():
+        return None
+
+    try:
+        with open(entry_file, "r", encoding="utf-8") as f:
+            entry = DescriptionEntry(**json.load(f))
+    except (json.JSONDecodeError, TypeError):
+        return None
+
+    return entry if entry.location == location else None
@@ -0,0 +1,100 @@
+"""DIDL-Lite metadata for media items.
+
+Renderers use CurrentURIMetaData to learn the title, MIME type and
+duration of what they are asked to play. Without it many of them probe
+the stream first, which delays the start of playback.
+"""
+
+from typing import Optional
+from xml.sax.saxutils import escape, quoteattr
+
+from .probe import MediaInfo
+
+# DLNA.ORG_OP=01: byte seeking supported; FLAGS: streaming transfer mode, DLNA 1.5
+DLNA_FEATURES = "DLNA.ORG_OP=01;DLNA.ORG_CI=0;DLNA.ORG_FLAGS=01700000000000000000000000000000"
+
+# For converted streams (ffmpeg pipes): no seeking (OP=00), converted content (CI=1)
+DLNA_STREAM_FEATURES = "DLNA.ORG_OP=00;DLNA.ORG_CI=1;DLNA.ORG_FLAGS=01700000000000000000000000000000"
+
+DIDL_HEADER = (
+    '<DIDL-Lite xmlns="urn:schemas-upnp-org:metadata-1-0/DIDL-Lite/"'
+    ' xmlns:dc="http://purl.org/dc/elements/1.1/"'
+    ' xmlns:upnp="urn:schemas-upnp-org:metadata-1-0/upnp/"'
+    ' xmlns:dlna="urn:schemas-dlna-org:metadata-1-0/">'
+)
+DIDL_FOOTER = "</DIDL-Lite>"
+
+
+def protocol_info(mime_type: str, features: str = DLNA_FEATURES) -> str:
+    """Build a res@protocolInfo value for HTTP streaming."""
+    return f"http-get:*:{mime_type}:{features}"
+
+
+def upnp_class(mime_type: str) -> str:
+    """UPnP object class for a MIME type."""
+    kind = mime_type.split("/")[0]
+    if kind == "video":
+        return "object.item.videoItem"
+    if kind == "audio":
+        return "object.item.audioItem.musicTrack"
+    if kind == "image":
+        return "object.item.imageItem.photo"
+    return "object.item"
+
+
+def format_duration(seconds: float) -> str:
+    """Format seconds as a DIDL-Lite duration, H:MM:SS.mmm."""
+    millis = int(round(seconds * 1000))
+    hours, millis = divmod(millis, 3_600_000)
+    minutes, millis = divmod(millis, 60_000)
+    secs, millis = divmod(millis, 1000)
+    return f"{hours}:{minutes:02d}:{secs:02d}.{millis:03d}"
+
+
+def item_xml(
+    item_id: str,
+    parent_id: str,
+    title: str,
+    url: str,
+    info: MediaInfo,
+    album_art_url: Optional[str] = None,
+    features: str = DLNA_FEATURES,
+) -> str:
+    """Build one DIDL-Lite <item> element."""
+    res_attrs = [f"protocolInfo={quoteattr(protocol_info(info.mime_type, features))}"]
+    if info.size:
+        res_attrs.append(f'size="{info.size}"')
+    if info.duration:
+        res_attrs.append(f'duration="{format_duration(info.duration)}"')
+    if info.resolution:
+        res_attrs.append(f'resolution="{info.resolution}"')
+
+    parts = [
+        f"<item id={quoteattr(item_id)} parentID={quoteattr(parent_id)} restricted=\"1\">",
+        f"<dc:title>{escape(title)}</dc:title>",
+        f"<upnp:class>{upnp_class(info.mime_type)}</upnp:class>",
+    ]
+    if album_art_url:
+        parts.append(
+            f'<upnp:albumArtURI dlna:profileID="JPEG_TN">{escape(album_art_url)}</upnp:albumArtURI>'
+        )
+    parts.append(f"<res {' '.join(res_attrs)}>{escape(url)}</res>")
+    parts.append("</item>")
+    return "".join(parts)
+
+
+def container_xml(container_id: str, parent_id: str, title: str, child_count: Optional[int] = None) -> str:
+    """Build one DIDL-Lite <container> element (a folder)."""
+    count = f' childCount="{child_count}"' if child_count is not None else ""
+    return (
+        f"<container id={quoteattr(container_id)} parentID={quoteattr(parent_id)}"
+        f' restricted="1" searchable="1"{count}>'
+        f"<dc:title>{escape(title)}</dc:title>"
+        "<upnp:class>object.container.storageFolder</upnp:class>"
+        "</container>"
+    )
+
+
+def build_metadata(title: str, url: str, info: MediaInfo, features: str = DLNA_FEATURES) -> str:
+    """Build CurrentURIMetaData for a single media item."""
+    return DIDL_HEADER + item_xml("0", "-1", title, url, info, features=features) + DIDL_FOOTER
@@ -1,18 +1,41 @@
 """Device discovery utilities."""
 
-from .player import discover_devices, DLNADevice
+import asyncio
+import time
+
+from . import trace
+from .player import discover_devices, fetch_device, DLNAClient, DLNADevice
 from .config import get_default_device
+from .cache import DeviceCache, match_device
+from .watch import query_watcher
 
 
-async def find_device(name: str | None = None, timeout: int = 5) -> DLNADevice | None:
+async def find_device(
+    name: str | None = None,
+    timeout: int = 5,
+    use_cache: bool = True,
+    client: DLNAClient | None = None,
+    use_watcher: bool = True,
+) -> DLNADevice | None:
     """Find a specific DLNA device by name.
 
     If name is not provided, uses the default device from config.
 
+    A running `dlna watch` process is asked first. Otherwise a device seen
+    before is looked up in the device cache and contacted
+    directly at its cached LOCATION; SSDP discovery only runs when that
+    fails or the device is unknown, and stops as soon as a renderer with
+    exactly that name answers. Otherwise it scans until the timeout and
+    picks the exact match, else the first partial match.
+
     Args:
         name: Device name to search for (case-insensitive, partial match).
               If None, uses default device from config.
         timeout: Scan timeout in seconds
+        use_cache: Try the watcher and the cached device location before scanning
+        client: Shared client for description fetches (optional)
+        use_watcher: Ask a running watcher first; the control daemon, which
+            answers watcher queries itself, passes False
 
     Returns:
         DLNADevice if found, None otherwise
@@ -26,17 +49,115 @@ async def find_device(name: str | None = None, timeout: int = 5) -> DLNADevice |
             return None
         print(f"Using default device: {name}")
 
-    devices = await discover_devices(timeout=timeout)
-    name_lower = name.lower()
+    cache = DeviceCache.load()
 
-    # Exact match first
-    for device in devices:
-        if device.name.lower() == name_lower:
+    if use_cache:
+        device = await _lookup_known(name, cache, client, use_watcher=use_watcher)
+        if device:
+            cache.save()
             return device
 
-    # Partial match
+    name_lower = name.lower()
+    devices = await discover_devices(
+        timeout=timeout,
+        # A partial match may not be the one meant ("TV" vs "TV Kitchen"): keep scanning
+        match=lambda device: device.name.lower() == name_lower,
+        client=client,
+    )
     for device in devices:
-        if name_lower in device.name.lower():
+        cache.update(device)
+    cache.save()
+
+    return match_device(devices, name)
+
+
+async def _lookup_known(
+    name: str, cache: DeviceCache, client: DLNAClient | None, use_watcher: bool = True
+) -> DLNADevice | None:
+    """Find a device without scanning: ask the watcher, then the cached location.
+
+    The cache is updated in memory (a stale entry is removed); the caller saves it.
+    """
+    if use_watcher:
+        with trace.span("watcher.query", device=name):
+            device = await query_watcher(name)
+        if device:
             return device
 
+    cached = cache.find(name)
+    if cached is None:
+        return None
+
+    if cached.open_until > time.time():
+        # Known to be failing: let the action fail fast instead of timing out here
+        return DLNADevice(
+            name=cached.name,
+            model_name=cached.model_name,
+            location=cached.location,
+            udn=cached.udn,
+        )
+
+    with trace.span("cache.probe", location=cached.location):
+        device = await fetch_device(cached.location, client=client)
+    if device and device.udn == cached.udn:
+        cache.update(device)
+        return device
+
+    # Stale entry: device moved or went away
+    cache.remove(cached.udn)
     return None
+
+
+async def find_devices(
+    names: list[str | None],
+    timeout: int = 5,
+    use_cache: bool = True,
+    client: DLNAClient | None = None,
+) -> dict[str | None, DLNADevice | None]:
+    """Find several devices by name with at most one SSDP scan.
+
+    Each name is looked up like find_device does (None means the default
+    device), but the watcher and cache lookups run concurrently and all
+    names still missing afterwards share a single discovery, which stops
+    early once every name has an exact match.
+
+    Args:
+        names: Device names to search for
+        timeout: Scan timeout in seconds
+        use_cache: Try the watcher and the cached device locations before scanning
+        client: Shared client for description fetches (optional)
+
+    Returns:
+        Mapping of each name to its device, or None if it was not found
+    """
+    resolved = {name: name if name is not None else get_default_device() for name in names}
+    if None in resolved.values():
+        print("No device specified and no default device configured.")
+        print("Use: dlna config --device <device_name>")
+
+    wanted = sorted({name for name in resolved.values() if name is not None})
+    found: dict[str, DLNADevice | None] = dict.fromkeys(wanted)
+    cache = DeviceCache.load()
+
+    if use_cache and wanted:
+        lookups = await asyncio.gather(*(_lookup_known(name, cache, client) for name in wanted))
+        found.update(zip(wanted, lookups))
+
+    missing = [name for name in wanted if found[name] is None]
+    if missing:
+        lowered = [name.lower() for name in missing]
+        remaining = set(lowered)
+
+        def match(device: DLNADevice) -> bool:
+            remaining.discard(device.name.lower())
+            return not remaining
+
+        devices = await discover_devices(timeout=timeout, match=match, client=client)
+        for device in devices:
+            cache.update(device)
+        for name in missing:
+            found[name] = match_device(devices, name)
+
+    cache.save()
+
+    return {name: found.get(resolved[name]) if resolved[name] else None for name in names}
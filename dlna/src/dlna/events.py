@@ -0,0 +1,166 @@
+"""AVTransport event subscriptions (UPnP GENA).
+
+Instead of polling GetTransportInfo, an EventSubscriber subscribes to the
+AVTransport service of each renderer and receives LastChange events on a
+local callback HTTP server. Subscriptions are renewed before they expire.
+"""
+
+import asyncio
+import xml.etree.ElementTree as ET
+from dataclasses import dataclass, field
+from datetime import timedelta
+from typing import Callable, Optional
+
+from async_upnp_client.aiohttp import AiohttpNotifyServer
+
+from .player import DLNAClient, DLNADevice
+from .server import local_ip_for
+
+# Requested subscription lifetime; renewal happens well before it runs out
+SUBSCRIPTION_TIMEOUT = timedelta(seconds=300)
+
+# Delay before retrying a subscription that could not be renewed
+RESUBSCRIBE_RETRY = 10.0
+
+
+@dataclass
+class TransportEvent:
+    """A change of AVTransport state reported by a renderer."""
+
+    device: DLNADevice
+    state: str  # PLAYING, STOPPED, PAUSED_PLAYBACK, TRANSITIONING, ...
+    changes: dict[str, str] = field(default_factory=dict)
+
+
+def parse_last_change(text: str) -> dict[str, str]:
+    """Parse an AVTransport LastChange document for InstanceID 0.
+
+    Returns:
+        Changed state variables, e.g. {"TransportState": "PLAYING"}
+    """
+    try:
+        root = ET.fromstring(text)
+    except ET.ParseError:
+        return {}
+
+    changes = {}
+    for instance in root:
+        if instance.tag.split("}")[-1] != "InstanceID" or instance.get("val") != "0":
+            continue
+        for variable in instance:
+            changes[variable.tag.split("}")[-1]] = variable.get("val", "")
+    return changes
+
+
+class EventSubscriber:
+    """Subscribes to AVTransport events of several renderers.
+
+    on_event is called with a TransportEvent for every LastChange event.
+    One callback server is started per local interface used to reach the
+    renderers.
+    """
+
+    def __init__(
+        self,
+        client: DLNAClient,
+        on_event: Callable[[TransportEvent], None],
+        timeout: timedelta = SUBSCRIPTION_TIMEOUT,
+    ):
+        self.client = client
+        self.on_event = on_event
+        self.timeout = timeout
+        self._servers: dict[str, AiohttpNotifyServer] = {}
+        self._renewals: dict[str, asyncio.Task] = {}
+        self._states: dict[str, str] = {}
+
+    async def __aenter__(self) -> "EventSubscriber":
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.close()
+
+    def state(self, device: DLNADevice) -> Optional[str]:
+        """Last TransportState reported by a device, if any."""
+        return self._states.get(device.udn)
+
+    async def subscribe(self, device: DLNADevice) -> None:
+        """Subscribe to AVTransport events of a device and keep renewing."""
+        av_transport = await self.client.get_av_transport(device)
+        server = await self._server_for(device)
+
+        def on_service_event(service, state_variables) -> None:
+            for state_variable in state_variables:
+                if state_variable.name != "LastChange" or not state_variable.value:
+                    continue
+                changes = parse_last_change(state_variable.value)
+                state = changes.get("TransportState")
+                if state:
+                    self._states[device.udn] = state
+                self.on_event(
+                    TransportEvent(
+                        device=device,
+                        state=self._states.get(device.udn, "UNKNOWN"),
+                        changes=changes,
+                    )
+                )
+
+        av_transport.on_event = on_service_event
+        _, timeout = await server.event_handler.async_subscribe(av_transport, self.timeout)
+        self._renewals[device.udn] = asyncio.create_task(
+            self._renew(server, av_transport, timeout)
+        )
+
+    async def close(self) -> None:
+        """Cancel renewals, unsubscribe and stop the callback servers."""
+        for task in self._renewals.values():
+            task.cancel()
+        self._renewals.clear()
+
+        for server in self._servers.values():
+            try:
+                await server.async_stop_server()
+            except Exception:
+                # Renderers that went away cannot be unsubscribed from
+                pass
+        self._servers.clear()
+
+    async def _server_for(self, device: DLNADevice) -> AiohttpNotifyServer:
+        """Get (or start) the callback server on the interface facing a device."""
+        local_ip = local_ip_for(device.location)
+        server = self._servers.get(local_ip)
+        if server is None:
+            server = AiohttpNotifyServer(self.client.factory.requester, source=(local_ip, 0))
+            await server.async_start_server()
+            self._servers[local_ip] = server
+        return server
+
+    async def _renew(self, server: AiohttpNotifyServer, service, timeout: timedelta) -> None:
+        """Renew a subscription at half its lifetime, for as long as we run."""
+        while True:
+            await asyncio.sleep(max(timeout.total_seconds() / 2, 1.0))
+            try:
+                _, timeout = await server.event_handler.async_resubscribe(service, self.timeout)
+            except Exception:
+                # Renderer offline or subscription lost: subscribe afresh later
+                timeout = timedelta(seconds=RESUBSCRIBE_RETRY * 2)
+                try:
+                    _, timeout = await server.event_handler.async_subscribe(service, self.timeout)
+                except Exception:
+                    pass
+
+
+async def follow_status(
+    devices: list[DLNADevice],
+    on_event: Callable[[TransportEvent], None],
+    client: DLNAClient,
+) -> None:
+    """Subscribe to AVTransport events of devices and report them until cancelled.
+
+    Args:
+        devices: Renderers to follow
+        on_event: Called for each event
+        client: Shared client (its session also carries the subscriptions)
+    """
+    async with EventSubscriber(client, on_event) as subscriber:
+        await asyncio.gather(*(subscriber.subscribe(device) for device in devices))
+        await asyncio.Event().wait()
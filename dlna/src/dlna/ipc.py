@@ -0,0 +1,126 @@
+"""Local Unix socket IPC for long-running dlna processes.
+
+Messages are single-line JSON objects. A connection may send any number of
+requests and receives one response line per request.
+
+This module only depends on the standard library, so thin clients (the CLI
+forwarding a command) stay fast to start.
+"""
+
+import asyncio
+import json
+import os
+from pathlib import Path
+from typing import Awaitable, Callable, Optional
+
+from .config import _get_config_dir
+
+Handler = Callable[[dict], Awaitable[dict]]
+
+# SOAP actions may legitimately take a while (renderers answer Play late)
+CONTROL_TIMEOUT = 35.0
+
+
+def _get_watch_socket_path() -> Path:
+    """Get the renderer watcher socket path."""
+    return _get_config_dir() / "watch.sock"
+
+
+def _get_control_socket_path() -> Path:
+    """Get the control daemon socket path."""
+    return _get_config_dir() / "control.sock"
+
+
+async def serve(path: Path, handler: Handler) -> asyncio.AbstractServer:
+    """Serve JSON requests on a Unix socket.
+
+    Every server answers {"op": "ping"} itself; other messages go to handler.
+
+    Args:
+        path: Socket path
+        handler: Coroutine turning a request into a response
+
+    Returns:
+        The running asyncio server
+
+    Raises:
+        RuntimeError: If another process is already serving on path
+    """
+    if path.exists():
+        if await request(path, {"op": "ping"}) is not None:
+            raise RuntimeError(f"Already running: {path}")
+        # Left behind by a process that did not shut down cleanly
+        path.unlink()
+
+    async def on_connection(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while line := await reader.readline():
+                try:
+                    message = json.loads(line)
+                    if message.get("op") == "ping":
+                        response = {"ok": True}
+                    else:
+                        response = await handler(message)
+                except json.JSONDecodeError:
+                    response = {"ok": False, "error": "Invalid JSON"}
+                except Exception as e:
+                    response = {"ok": False, "error": str(e)}
+
+                writer.write(json.dumps(response, ensure_ascii=False).encode("utf-8") + b"\n")
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    server = await asyncio.start_unix_server(on_connection, path=str(path))
+    os.chmod(path, 0o600)
+    return server
+
+
+async def request(path: Path, message: dict, timeout: float = 1.0) -> Optional[dict]:
+    """Send one request to a local server.
+
+    Args:
+        path: Socket path
+        message: Request
+        timeout: Timeout in seconds for connecting and for the response
+
+    Returns:
+        The response, or None if no server is running or it did not answer
+    """
+    if not path.exists():
+        return None
+
+    try:
+        reader, writer = await asyncio.wait_for(
+            asyncio.open_unix_connection(str(path)), timeout=timeout
+        )
+    except (OSError, asyncio.TimeoutError):
+        return None
+
+    try:
+        writer.write(json.dumps(message, ensure_ascii=False).encode("utf-8") + b"\n")
+        await writer.drain()
+        line = await asyncio.wait_for(reader.readline(), timeout=timeout)
+    except (OSError, asyncio.TimeoutError):
+        return None
+    finally:
+        writer.close()
+
+    if not line:
+        return None
+
+    try:
+        return json.loads(line)
+    except json.JSONDecodeError:
+        return None
+
+
+async def forward(message: dict) -> Optional[dict]:
+    """Send a control request to a running serve-control daemon.
+
+    Returns:
+        The daemon's response, or None if no daemon is running
+    """
+    return await request(_get_control_socket_path(), message, timeout=CONTROL_TIMEOUT)
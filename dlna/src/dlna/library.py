@@ -0,0 +1,374 @@
+"""Incremental index of a media directory.
+
+The index lives in the skill directory under .dlna/media.db (SQLite). Each
+audio, video and image file is stored with its mtime and size and the metadata from probe.probe,
+so a refresh only probes files that are new or changed and the media
+server answers listings and lookups without touching the file tree.
+
+Usage:
+    library = MediaLibrary(Path("~/Videos").expanduser())
+    library.refresh()
+    for entry in library.children(""):
+        print(entry.path, entry.mime_type, entry.duration)
+"""
+
+import os
+import sqlite3
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Optional
+
+from .config import _get_config_dir
+from .probe import MediaInfo, is_media, probe
+
+# Bump when the schema or what is indexed changes; an older index is dropped and rebuilt
+_SCHEMA_VERSION = 3
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    root TEXT NOT NULL,
+    path TEXT NOT NULL,
+    parent TEXT NOT NULL,
+    name TEXT NOT NULL,
+    is_dir INTEGER NOT NULL,
+    size INTEGER NOT NULL DEFAULT 0,
+    mtime REAL NOT NULL DEFAULT 0,
+    mime_type TEXT NOT NULL DEFAULT '',
+    duration REAL,
+    width INTEGER,
+    height INTEGER,
+    container TEXT NOT NULL DEFAULT '',
+    video_codec TEXT NOT NULL DEFAULT '',
+    audio_codec TEXT NOT NULL DEFAULT '',
+    PRIMARY KEY (root, path)
+);
+CREATE INDEX IF NOT EXISTS entries_by_parent ON entries (root, parent, is_dir DESC, name COLLATE NOCASE);
+CREATE TABLE IF NOT EXISTS roots (
+    root TEXT PRIMARY KEY,
+    update_id INTEGER NOT NULL DEFAULT 0
+);
+"""
+
+_COLUMNS = (
+    "path, name, is_dir, size, mtime, mime_type, duration, width, height, "
+    "container, video_codec, audio_codec"
+)
+
+# Directory listings first, then files, each by name
+_ORDER = "ORDER BY is_dir DESC, name COLLATE NOCASE"
+
+
+def _get_library_file() -> Path:
+    """Get the media index database path."""
+    return _get_config_dir() / "media.db"
+
+
+@dataclass
+class LibraryEntry:
+    """An indexed file or directory.
+
+    Paths are relative to the library root, with "/" separators; the root
+    itself is "".
+    """
+
+    path: str
+    name: str
+    is_dir: bool
+    size: int = 0
+    mtime: float = 0.0
+    mime_type: str = ""
+    duration: Optional[float] = None
+    width: Optional[int] = None
+    height: Optional[int] = None
+    container: str = ""
+    video_codec: str = ""
+    audio_codec: str = ""
+
+    @property
+    def parent(self) -> str:
+        """Path of the containing directory."""
+        return self.path.rpartition("/")[0]
+
+    @property
+    def info(self) -> MediaInfo:
+        """Metadata as probe.MediaInfo (for didl.build_metadata)."""
+        return MediaInfo(
+            mime_type=self.mime_type,
+            size=self.size,
+            duration=self.duration,
+            width=self.width,
+            height=self.height,
+            container=self.container,
+            video_codec=self.video_codec,
+            audio_codec=self.audio_codec,
+        )
+
+
+@dataclass
+class RefreshStats:
+    """What a refresh changed."""
+
+    added: int = 0
+    updated: int = 0
+    removed: int = 0
+    unchanged: int = 0
+
+    @property
+    def probed(self) -> int:
+        """Files that had to be probed."""
+        return self.added + self.updated
+
+
+def _row_to_entry(row) -> LibraryEntry:
+    path, name, is_dir, size, mtime, mime_type, duration, width, height, container, video, audio = row
+    return LibraryEntry(
+        path=path,
+        name=name,
+        is_dir=bool(is_dir),
+        size=size,
+        mtime=mtime,
+        mime_type=mime_type,
+        duration=duration,
+        width=width,
+        height=height,
+        container=container,
+        video_codec=video,
+        audio_codec=audio,
+    )
+
+
+class MediaLibrary:
+    """SQLite index of the files under one directory.
+
+    Safe to share between the threads of MediaServer: all queries go
+    through one connection guarded by a lock.
+    """
+
+    def __init__(self, root: Path, db_path: Optional[Path] = None):
+        self.root = Path(root).resolve()
+        self._key = str(self.root)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(str(db_path or _get_library_file()), check_same_thread=False)
+        with self._lock, self._db:
+            (version,) = self._db.execute("PRAGMA user_version").fetchone()
+            if version != _SCHEMA_VERSION:
+                self._db.executescript("DROP TABLE IF EXISTS entries; DROP TABLE IF EXISTS roots;")
+                self._db.execute(f"PRAGMA user_version = {_SCHEMA_VERSION}")
+            self._db.executescript(_SCHEMA)
+
+    def close(self) -> None:
+        """Close the database."""
+        with self._lock:
+            self._db.close()
+
+    def __enter__(self) -> "MediaLibrary":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def refresh(self, probe_file: Callable[[Path], MediaInfo] = probe) -> RefreshStats:
+        """Bring the index in line with the directory.
+
+        Files whose mtime and size match the index are skipped; new and
+        changed files are probed; entries for deleted files are removed.
+        Files that are not audio, video or images (subtitles, .nfo, text)
+        are left out, so the ContentDirectory never offers them.
+
+        Args:
+            probe_file: Function that describes a file (probe.probe)
+
+        Returns:
+            Counts of added, updated, removed and unchanged files
+        """
+        with self._lock:
+            known = {
+                path: (size, mtime)
+                for path, size, mtime in self._db.execute(
+                    "SELECT path, size, mtime FROM entries WHERE root = ? AND is_dir = 0",
+                    (self._key,),
+                )
+            }
+
+        stats = RefreshStats()
+        directories: list[tuple] = []
+        files: list[tuple] = []
+        seen: set[str] = set()
+
+        pending = [("", str(self.root))]
+        while pending:
+            rel_dir, directory = pending.pop()
+            try:
+                with os.scandir(directory) as it:
+                    dir_entries = list(it)
+            except OSError:
+                continue
+
+            for dir_entry in dir_entries:
+                name = dir_entry.name
+                if name.startswith("."):
+                    continue
+                path = f"{rel_dir}/{name}" if rel_dir else name
+                try:
+                    if dir_entry.is_dir(follow_symlinks=False):
+                        directories.append((path, rel_dir, name, 1, 0, 0.0))
+                        pending.append((path, dir_entry.path))
+                        continue
+                    if dir_entry.is_dir():
+                        # Symlinked directories are not followed (they may loop)
+                        continue
+                    st = dir_entry.stat()
+                except OSError:
+                    continue
+
+                previous = known.get(path)
+                if previous == (st.st_size, st.st_mtime):
+                    seen.add(path)
+                    stats.unchanged += 1
+                    continue
+
+                # Probe outside the lock: ffprobe can take a while per file
+                info = probe_file(Path(dir_entry.path))
+                if not is_media(info.mime_type):
+                    continue
+                seen.add(path)
+                if previous is None:
+                    stats.added += 1
+                else:
+                    stats.updated += 1
+                files.append(
+                    (
+                        path, rel_dir, name, 0, st.st_size, st.st_mtime,
+                        info.mime_type, info.duration, info.width, info.height,
+                        info.container, info.video_codec, info.audio_codec,
+                    )
+                )
+
+        removed = [path for path in known if path not in seen]
+        stats.removed = len(removed)
+
+        with self._lock, self._db:
+            # The root is not an entry (so listings need no table lookups to skip it)
+            self._db.execute("INSERT OR IGNORE INTO roots (root) VALUES (?)", (self._key,))
+            if files or removed:
+                # ContentDirectory SystemUpdateID: lets control points drop cached listings
+                self._db.execute("UPDATE roots SET update_id = update_id + 1 WHERE root = ?", (self._key,))
+            self._db.execute("DELETE FROM entries WHERE root = ? AND is_dir = 1", (self._key,))
+            self._db.executemany(
+                "INSERT INTO entries (root, path, parent, name, is_dir, size, mtime) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [(self._key, *row) for row in directories],
+            )
+            self._db.executemany(
+                "DELETE FROM entries WHERE root = ? AND path = ?",
+                [(self._key, path) for path in removed],
+            )
+            self._db.executemany(
+                "INSERT OR REPLACE INTO entries (root, path, parent, name, is_dir, size, mtime, "
+                "mime_type, duration, width, height, container, video_codec, audio_codec) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                [(self._key, *row) for row in files],
+            )
+        return stats
+
+    def get(self, path: str) -> Optional[LibraryEntry]:
+        """Look up a file or directory by its path relative to the root.
+
+        The root itself ("") is found once the library has been refreshed.
+        """
+        path = path.strip("/")
+        if not path:
+            return LibraryEntry(path="", name="", is_dir=True) if self.indexed else None
+
+        with self._lock:
+            row = self._db.execute(
+                f"SELECT {_COLUMNS} FROM entries WHERE root = ? AND path = ?",
+                (self._key, path),
+            ).fetchone()
+        return _row_to_entry(row) if row else None
+
+    def children(self, parent: str, offset: int = 0, limit: Optional[int] = None) -> list[LibraryEntry]:
+        """List a directory, directories first, then by name.
+
+        Args:
+            parent: Directory path relative to the root ("" for the root)
+            offset: Number of entries to skip
+            limit: Maximum number of entries (None: all)
+        """
+        with self._lock:
+            rows = self._db.execute(
+                f"SELECT {_COLUMNS} FROM entries WHERE root = ? AND parent = ? "
+                f"{_ORDER} LIMIT ? OFFSET ?",
+                (self._key, parent.strip("/"), -1 if limit is None else limit, offset),
+            ).fetchall()
+        return [_row_to_entry(row) for row in rows]
+
+    def count(self, parent: str) -> int:
+        """Number of entries in a directory."""
+        with self._lock:
+            (count,) = self._db.execute(
+                "SELECT COUNT(*) FROM entries WHERE root = ? AND parent = ?",
+                (self._key, parent.strip("/")),
+            ).fetchone()
+        return count
+
+    def search(
+        self,
+        parent: str = "",
+        media_type: Optional[str] = None,
+        title: Optional[str] = None,
+        offset: int = 0,
+        limit: Optional[int] = None,
+    ) -> tuple[list[LibraryEntry], int]:
+        """Find files anywhere below a directory.
+
+        Args:
+            parent: Directory to search in ("" for the whole library)
+            media_type: Top-level MIME type to match, e.g. "video"
+            title: Text the file name must contain (case-insensitive)
+            offset: Number of matches to skip
+            limit: Maximum number of matches (None: all)
+
+        Returns:
+            (one page of matches ordered by path, total number of matches)
+        """
+        where = ["root = ?", "is_dir = 0"]
+        params: list = [self._key]
+        parent = parent.strip("/")
+        if parent:
+            where.append("path LIKE ? ESCAPE '\\'")
+            params.append(_like_escape(parent) + "/%")
+        if media_type:
+            where.append("mime_type LIKE ? ESCAPE '\\'")
+            params.append(_like_escape(media_type) + "/%")
+        if title:
+            where.append("name LIKE ? ESCAPE '\\'")
+            params.append("%" + _like_escape(title) + "%")
+        condition = " AND ".join(where)
+
+        with self._lock:
+            (total,) = self._db.execute(f"SELECT COUNT(*) FROM entries WHERE {condition}", params).fetchone()
+            rows = self._db.execute(
+                f"SELECT {_COLUMNS} FROM entries WHERE {condition} ORDER BY path LIMIT ? OFFSET ?",
+                [*params, -1 if limit is None else limit, offset],
+            ).fetchall()
+        return [_row_to_entry(row) for row in rows], total
+
+    @property
+    def indexed(self) -> bool:
+        """Whether the library has been refreshed at least once."""
+        with self._lock:
+            return self._db.execute("SELECT 1 FROM roots WHERE root = ?", (self._key,)).fetchone() is not None
+
+    @property
+    def update_id(self) -> int:
+        """Number of refreshes that changed the index."""
+        with self._lock:
+            row = self._db.execute("SELECT update_id FROM roots WHERE root = ?", (self._key,)).fetchone()
+        return row[0] if row else 0
+
+
+def _like_escape(text: str) -> str:
+    """Escape LIKE wildcards."""
+    return text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
@@ -1,15 +1,57 @@
 """DLNA media control module."""
 
 import asyncio
+import time
+from contextlib import aclosing, asynccontextmanager
 from dataclasses import dataclass
-from typing import Optional
+from typing import AsyncIterator, Callable, Optional, Sequence
 
-from async_upnp_client.aiohttp import AiohttpRequester
+from async_upnp_client.aiohttp import AiohttpSessionRequester
 from async_upnp_client.client_factory import UpnpFactory
+from async_upnp_client.exceptions import (
+    UpnpActionError,
+    UpnpCommunicationError,
+    UpnpConnectionError,
+    UpnpConnectionTimeoutError,
+)
+
+from . import trace
+from .descriptions import DEFAULT_TTL, DescriptionCache
+from .policy import (
+    ACTION_TIMEOUTS,
+    ACTION_TIMEOUT_GRACE,
+    IDEMPOTENT_ACTIONS,
+    MAX_RETRIES,
+    ActionMetric,
+    CircuitBreaker,
+    MetricsHook,
+    retry_delay,
+)
 
 # DLNA service type for AVTransport
 AVTRANSPORT_SERVICE_TYPE = "urn:schemas-upnp-org:service:AVTransport:1"
 
+# ConnectionManager lists the formats a renderer can play (GetProtocolInfo)
+CONNECTION_MANAGER_SERVICE_TYPE = "urn:schemas-upnp-org:service:ConnectionManager:1"
+
+# UPnP device type for renderers
+MEDIA_RENDERER_DEVICE_TYPE = "urn:schemas-upnp-org:device:MediaRenderer:1"
+
+# Search targets for discovery; only renderers answer these
+RENDERER_SEARCH_TARGETS = (MEDIA_RENDERER_DEVICE_TYPE, AVTRANSPORT_SERVICE_TYPE)
+
+# MX for targeted searches: few devices answer, so they need not spread replies out
+TARGETED_SEARCH_MX = 1
+
+
+def is_renderer_target(target: str) -> bool:
+    """Whether an SSDP ST or NT header announces a renderer.
+
+    Any MediaRenderer version counts (a MediaRenderer:2 device also answers
+    the :1 search), as does the AVTransport service.
+    """
+    return "MediaRenderer" in target or target == AVTRANSPORT_SERVICE_TYPE
+
 
 @dataclass
 class DLNADevice:
@@ -19,119 +61,630 @@ class DLNADevice:
     model_name: str
     location: str
     udn: str
+    boot_id: str = ""
+    config_id: str = ""
 
     def __repr__(self):
         return f"DLNADevice(name='{self.name}', model='{self.model_name}')"
 
 
-async def discover_devices(timeout: int = 5) -> list[DLNADevice]:
+class DLNAClient:
+    """Shared HTTP session and UPnP factory for talking to DLNA devices.
+
+    One client owns one aiohttp connection pool (with keep-alive), so
+    discovery, description fetches and SOAP actions against the same
+    renderers reuse connections instead of opening a new pool each time.
+    Parsed descriptions are cached (see DescriptionCache), so repeated
+    actions on a device go straight to the SOAP call.
+
+    Usage:
+        async with DLNAClient() as client:
+            device = await find_device("TV", client=client)
+            await play_url(device, url, client=client)
+    """
+
+    def __init__(
+        self,
+        timeout: int = 5,
+        limit: int = 32,
+        limit_per_host: int = 4,
+        keepalive_timeout: float = 30.0,
+        description_ttl: float = DEFAULT_TTL,
+        on_action: Optional[MetricsHook] = None,
+    ):
+        self.timeout = timeout
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.keepalive_timeout = keepalive_timeout
+        self.descriptions = DescriptionCache(ttl=description_ttl)
+        self.breaker = CircuitBreaker()
+        self.on_action = on_action
+        self._session = None
+        self._factory: UpnpFactory | None = None
+
+    async def __aenter__(self) -> "DLNAClient":
+        await self.open()
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.close()
+
+    async def open(self) -> None:
+        """Open the HTTP session."""
+        if self._session is not None:
+            return
+
+        from aiohttp import ClientSession, TCPConnector
+
+        connector = TCPConnector(
+            limit=self.limit,
+            limit_per_host=self.limit_per_host,
+            keepalive_timeout=self.keepalive_timeout,
+        )
+        self._session = ClientSession(connector=connector)
+        requester = AiohttpSessionRequester(self._session, timeout=self.timeout)
+        self._factory = UpnpFactory(requester)
+
+    async def close(self) -> None:
+        """Close the HTTP session and its pooled connections."""
+        if self._session is not None:
+            await self._session.close()
+        self._session = None
+        self._factory = None
+
+    @property
+    def factory(self) -> UpnpFactory:
+        """UPnP factory bound to the shared session."""
+        if self._factory is None:
+            raise RuntimeError("DLNAClient is not open")
+        return self._factory
+
+    async def get_upnp_device(
+        self,
+        location: str,
+        udn: str = "",
+        boot_id: str = "",
+        config_id: str = "",
+        revalidate: bool = False,
+    ):
+        """Get a parsed UpnpDevice, using the description cache."""
+        return await self.descriptions.get_device(
+            self.factory.requester,
+            location,
+            udn=udn,
+            boot_id=boot_id,
+            config_id=config_id,
+            revalidate=revalidate,
+        )
+
+    def invalidate(self, device: DLNADevice) -> None:
+        """Forget the cached descriptions of a device."""
+        self.descriptions.invalidate(device.location)
+
+    async def get_av_transport(self, device: DLNADevice):
+        """Get AVTransport service from device."""
+        with trace.span("get_av_transport", device=device.name):
+            upnp_device = await self.get_upnp_device(
+                device.location,
+                udn=device.udn,
+                boot_id=device.boot_id,
+                config_id=device.config_id,
+            )
+
+        av_transport = upnp_device.find_service(service_type=AVTRANSPORT_SERVICE_TYPE)
+        if not av_transport:
+            raise Exception("AVTransport service not found on device")
+
+        return av_transport
+
+
+@asynccontextmanager
+async def _client_scope(client: Optional[DLNAClient]) -> AsyncIterator[DLNAClient]:
+    """Use the given client, or a temporary one for a single call."""
+    if client is not None:
+        yield client
+        return
+
+    async with DLNAClient() as own_client:
+        yield own_client
+
+
+async def discover_devices(
+    timeout: int = 5,
+    match: Optional[Callable[[DLNADevice], bool]] = None,
+    client: Optional[DLNAClient] = None,
+    max_concurrency: int = 8,
+    fetch_timeout: float = 3.0,
+    search_all: bool = False,
+    target: Optional[tuple[str, int]] = None,
+) -> list[DLNADevice]:
     """Discover DLNA MediaRenderer devices on the network.
 
     Args:
         timeout: Scan timeout in seconds
+        match: Optional predicate for a targeted search. The scan stops as soon
+               as a renderer satisfying it is confirmed instead of waiting for
+               the full timeout.
+        client: Shared client to fetch descriptions with (optional)
+        max_concurrency: Maximum number of description fetches in flight
+        fetch_timeout: Timeout for a single description fetch, in seconds
+        search_all: Search with ssdp:all instead of the renderer search
+                    targets, for devices that ignore targeted M-SEARCH
+        target: Send M-SEARCH to this (host, port) instead of the SSDP
+                multicast group (unicast search)
 
     Returns:
         List of DLNA MediaRenderer devices
     """
-    from async_upnp_client.search import async_search
+    devices = []
+    stream = iter_devices(
+        timeout=timeout,
+        client=client,
+        max_concurrency=max_concurrency,
+        fetch_timeout=fetch_timeout,
+        search_all=search_all,
+        target=target,
+    )
+    with trace.span("discover", timeout=timeout, search_all=search_all) as s:
+        async with aclosing(stream):
+            async for device in stream:
+                devices.append(device)
+                print(f"Found: {device.name}")
+                if match and match(device):
+                    break
+        if s:
+            s.attrs["found"] = len(devices)
+
+    return devices
+
+
+async def iter_devices(
+    timeout: int = 5,
+    client: Optional[DLNAClient] = None,
+    max_concurrency: int = 8,
+    fetch_timeout: float = 3.0,
+    search_all: bool = False,
+    target: Optional[tuple[str, int]] = None,
+) -> AsyncIterator[DLNADevice]:
+    """Discover DLNA MediaRenderer devices, yielding each one once confirmed.
+
+    M-SEARCH is sent for the MediaRenderer device type and the AVTransport
+    service type, so other UPnP devices (routers, printers, NAS) stay quiet.
+    SSDP replies are deduplicated by USN and LOCATION before anything is
+    downloaded, and description fetches run concurrently (bounded by
+    max_concurrency), so one slow device does not hold up the others.
+    Stop iterating (inside contextlib.aclosing) to end the scan early.
+
+    Args:
+        timeout: Scan timeout in seconds
+        client: Shared client to fetch descriptions with (optional)
+        max_concurrency: Maximum number of description fetches in flight
+        fetch_timeout: Timeout for a single description fetch, in seconds
+        search_all: Search with ssdp:all instead of the renderer search
+                    targets, for devices that ignore targeted M-SEARCH
+        target: Send M-SEARCH to this (host, port) instead of the SSDP
+                multicast group (unicast search)
+
+    Yields:
+        DLNA MediaRenderer devices, in the order they are confirmed
+    """
+    from async_upnp_client.search import SsdpSearchListener
     from async_upnp_client.ssdp import SSDP_ST_ALL
 
-    devices_found = {}
+    loop = asyncio.get_running_loop()
+    confirmed: asyncio.Queue[DLNADevice] = asyncio.Queue()
+    semaphore = asyncio.Semaphore(max_concurrency)
+    seen: set[str] = set()
+    fetches: set[asyncio.Task] = set()
+
+    if search_all:
+        search_targets: tuple[str, ...] = (SSDP_ST_ALL,)
+        mx = timeout
+    else:
+        search_targets = RENDERER_SEARCH_TARGETS
+        mx = min(timeout, TARGETED_SEARCH_MX)
+
+    async def fetch(session: DLNAClient, response) -> None:
+        """Fetch one device description and queue it if it is a renderer."""
+        location = response.get("LOCATION", "")
+        usn = response.get("USN", "")
 
-    async def on_response(response):
+        async with semaphore:
+            try:
+                # Connect to device and get info
+                with trace.span("description", location=location):
+                    dlna_device = await asyncio.wait_for(
+                        _create_dlna_device(
+                            session,
+                            location,
+                            udn=usn.split("::")[0],
+                            boot_id=response.get("BOOTID.UPNP.ORG", ""),
+                            config_id=response.get("CONFIGID.UPNP.ORG", ""),
+                        ),
+                        timeout=fetch_timeout,
+                    )
+            except Exception as e:
+                print(f"Failed to connect to {location}: {e!r}")
+                return
+
+        # Verify it has AVTransport service
+        if dlna_device:
+            confirmed.put_nowait(dlna_device)
+
+    def on_response(response) -> None:
         """Handle SSDP response."""
         st = response.get("ST", "")
         location = response.get("LOCATION", "")
         usn = response.get("USN", "")
 
         # Only care about MediaRenderer devices
-        if "MediaRenderer" not in st or not location:
+        if not location:
             return
-
-        # Avoid duplicates
-        if usn in devices_found:
+        if not is_renderer_target(st):
             return
 
+        # Avoid duplicates, including replies that arrive while a fetch is running
+        if usn in seen or location in seen:
+            return
+        seen.update((usn, location))
+        if search_started is not None:
+            # Time from M-SEARCH to this device's answer
+            trace.record("ssdp.response", search_started, location=location)
+
+        task = loop.create_task(fetch(session, response))
+        fetches.add(task)
+        task.add_done_callback(fetches.discard)
+
+    search_started: Optional[float] = None
+
+    async with _client_scope(client) as session:
+        def search() -> None:
+            """Send one M-SEARCH per search target."""
+            nonlocal search_started
+            search_started = trace.now()
+            for search_target in search_targets:
+                listener.search_target = search_target
+                listener.async_search()
+
+        listener = SsdpSearchListener(
+            callback=on_response,
+            timeout=mx,
+            search_target=search_targets[0],
+            target=target,
+            connect_callback=search,
+        )
+        await listener.async_start()
+
+        # Wait for devices to respond, handing each one over as it is confirmed
+        deadline = loop.time() + timeout
         try:
-            # Connect to device and get info
-            requester = AiohttpRequester()
-            factory = UpnpFactory(requester)
-            device = await factory.async_create_device(location)
-
-            # Verify it has AVTransport service
-            if device.find_service(service_type=AVTRANSPORT_SERVICE_TYPE):
-                dlna_device = DLNADevice(
-                    name=device.name or device.friendly_name or "Unknown DLNA Device",
-                    model_name=device.model_name or "Unknown",
-                    location=location,
-                    udn=device.udn or "",
-                )
-                devices_found[usn] = dlna_device
-                print(f"Found: {dlna_device.name}")
+            while (remaining := deadline - loop.time()) > 0:
+                try:
+                    yield await asyncio.wait_for(confirmed.get(), timeout=remaining)
+                except asyncio.TimeoutError:
+                    break
+        finally:
+            listener.async_stop()
+            for task in list(fetches):
+                task.cancel()
+
+
+async def _create_dlna_device(
+    client: DLNAClient,
+    location: str,
+    udn: str = "",
+    boot_id: str = "",
+    config_id: str = "",
+    revalidate: bool = False,
+) -> Optional[DLNADevice]:
+    """Fetch a device description and wrap it if it is a usable renderer."""
+    device = await client.get_upnp_device(
+        location, udn=udn, boot_id=boot_id, config_id=config_id, revalidate=revalidate
+    )
 
-        except Exception as e:
-            print(f"Failed to connect to {location}: {e}")
+    if not device.find_service(service_type=AVTRANSPORT_SERVICE_TYPE):
+        return None
 
-    await async_search(
-        async_callback=on_response,
-        timeout=timeout,
-        search_target=SSDP_ST_ALL,
+    return DLNADevice(
+        name=device.name or device.friendly_name or "Unknown DLNA Device",
+        model_name=device.model_name or "Unknown",
+        location=location,
+        udn=device.udn or "",
+        boot_id=boot_id,
+        config_id=config_id,
     )
 
-    return list(devices_found.values())
 
+async def fetch_device(
+    location: str,
+    timeout: int = 2,
+    client: Optional[DLNAClient] = None,
+) -> Optional[DLNADevice]:
+    """Fetch a device directly from its description URL, without SSDP.
 
-async def _get_av_transport(device: DLNADevice):
-    """Get AVTransport service from device."""
-    requester = AiohttpRequester()
-    factory = UpnpFactory(requester)
-    upnp_device = await factory.async_create_device(device.location)
+    The root description is always downloaded again (proving the device is
+    reachable there); cached service descriptions are reused if it is unchanged.
 
-    av_transport = upnp_device.find_service(service_type=AVTRANSPORT_SERVICE_TYPE)
-    if not av_transport:
-        raise Exception("AVTransport service not found on device")
+    Args:
+        location: Device description URL (SSDP LOCATION)
+        timeout: Timeout in seconds
+        client: Shared client to fetch the description with (optional)
 
-    return av_transport
+    Returns:
+        DLNADevice if the device answered and has AVTransport, None otherwise
+    """
+    try:
+        async with _client_scope(client) as session:
+            return await asyncio.wait_for(
+                _create_dlna_device(session, location, revalidate=True), timeout=timeout
+            )
+    except Exception:
+        return None
 
 
-async def play_url(device: DLNADevice, url: str) -> None:
-    """Play a URL on a DLNA device.
+async def _call_action(client: DLNAClient, device: DLNADevice, av_transport, name: str, **kwargs):
+    """Call an AVTransport action with a deadline, retries and circuit breaking.
 
-    Args:
-        device: DLNA device
-        url: Media URL to play (http:// or file://)
+    Idempotent actions are retried when the device cannot be reached. A
+    device that keeps failing is refused (DeviceUnavailableError) until its
+    cooldown ends. Each call is reported to client.on_action.
+    """
+    client.breaker.check(device)
 
-    Raises:
-        Exception: If playback fails
+    timeout = ACTION_TIMEOUTS.get(name, client.timeout)
+    attempts = 1 + (MAX_RETRIES if name in IDEMPOTENT_ACTIONS else 0)
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+    error: Optional[BaseException] = None
+    succeeded = False
+    attempt = 0
+
+    with trace.span("action", action=name, device=device.name) as s:
+        try:
+            for attempt in range(1, attempts + 1):
+                try:
+                    # The request timeout carries the action budget (the requester
+                    # default is client.timeout); wait_for only guards against a hang
+                    result = await asyncio.wait_for(
+                        av_transport.action(name).async_call(request_timeout=timeout, **kwargs),
+                        timeout + ACTION_TIMEOUT_GRACE,
+                    )
+                except (asyncio.TimeoutError, UpnpConnectionTimeoutError):
+                    error = UpnpConnectionTimeoutError(f"{name} timed out after {timeout}s")
+                except UpnpConnectionError as e:
+                    error = e
+                except UpnpCommunicationError as e:
+                    # The device answered: a SOAP fault, or an HTTP error from stale control URLs
+                    error = e
+                    client.breaker.record_success(device)
+                    if not isinstance(e, UpnpActionError):
+                        client.invalidate(device)
+                    raise
+                else:
+                    succeeded = True
+                    client.breaker.record_success(device)
+                    return result
+
+                if attempt < attempts:
+                    await asyncio.sleep(retry_delay(attempt))
+
+            client.invalidate(device)
+            client.breaker.record_failure(device)
+            raise error
+        except BaseException as e:
+            error = e
+            raise
+        finally:
+            if s:
+                s.attrs["attempts"] = attempt
+            if client.on_action:
+                client.on_action(
+                    ActionMetric(
+                        device=device.name,
+                        udn=device.udn,
+                        action=name,
+                        duration=loop.time() - started,
+                        attempts=attempt,
+                        error=None if succeeded else _describe_error(error),
+                    )
+                )
+
+
+def _describe_error(error: Optional[BaseException]) -> str:
+    """Action metric text for the exception that ended an action."""
+    if error is None or isinstance(error, asyncio.CancelledError):
+        return "cancelled"
+    return str(error) or type(error).__name__
+
+
+@dataclass
+class PlaybackResult:
+    """Outcome of starting playback on one device of a group."""
+
+    device: DLNADevice
+    error: Optional[str] = None
+    rtt: float = 0.0  # GetTransportInfo round trip used to align Play, seconds
+    latency: float = 0.0  # Play round trip, seconds
+    offset: float = 0.0  # estimated Play arrival after the earliest device, seconds
+
+    @property
+    def ok(self) -> bool:
+        """Whether playback started on the device."""
+        return self.error is None
+
+
+async def _prepare(session: DLNAClient, device: DLNADevice, url: str, metadata: str):
+    """Stop, load the URL and measure the round trip to a device.
+
+    Returns:
+        (av_transport, rtt in seconds)
     """
-    av_transport = await _get_av_transport(device)
+    av_transport = await session.get_av_transport(device)
 
-    # Stop any current playback
+    # Stop any current playback; a renderer with nothing loaded may refuse
     try:
-        await av_transport.action("Stop").async_call(InstanceID=0)
-    except:
+        await _call_action(session, device, av_transport, "Stop", InstanceID=0)
+    except UpnpActionError:
         pass
 
-    await av_transport.action("SetAVTransportURI").async_call(
+    await _call_action(
+        session,
+        device,
+        av_transport,
+        "SetAVTransportURI",
         InstanceID=0,
         CurrentURI=url,
-        CurrentURIMetaData="",
+        CurrentURIMetaData=metadata,
     )
-    await av_transport.action("Play").async_call(InstanceID=0, Speed="1")
+
+    # A cheap query, once the URL is loaded, estimates the network delay of Play
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+    await _call_action(session, device, av_transport, "GetTransportInfo", InstanceID=0)
+    return av_transport, loop.time() - started
+
+
+async def play_url(
+    devices: DLNADevice | Sequence[DLNADevice],
+    url: str,
+    client: Optional[DLNAClient] = None,
+    metadata: str = "",
+) -> list[PlaybackResult]:
+    """Play a URL on a DLNA device or on a group of devices in sync.
+
+    Stop and SetAVTransportURI go to all devices concurrently. Play is then
+    sent to each device delayed by the difference between its round trip
+    and the slowest one, so that the commands arrive at about the same time.
+
+    Args:
+        devices: DLNA device, or several to play on together
+        url: Media URL to play (http:// or file://)
+        client: Shared client to send the actions with (optional)
+        metadata: DIDL-Lite CurrentURIMetaData describing the media (optional)
+
+    Returns:
+        One PlaybackResult per device, in order
+
+    Raises:
+        Exception: If playback fails on every device
+    """
+    if isinstance(devices, DLNADevice):
+        devices = [devices]
+    results = [PlaybackResult(device=device) for device in devices]
+
+    async with _client_scope(client) as session:
+        prepared = await asyncio.gather(
+            *(_prepare(session, device, url, metadata) for device in devices),
+            return_exceptions=True,
+        )
+
+        ready = []
+        for result, outcome in zip(results, prepared):
+            if isinstance(outcome, BaseException):
+                result.error = str(outcome) or type(outcome).__name__
+            else:
+                av_transport, result.rtt = outcome
+                ready.append((result, av_transport))
+        if not ready:
+            raise prepared[0]
+
+        loop = asyncio.get_running_loop()
+        slowest = max(result.rtt for result, _ in ready) / 2
+        base = loop.time()
+
+        async def send_play(result: PlaybackResult, av_transport) -> None:
+            one_way = result.rtt / 2
+            await asyncio.sleep(slowest - one_way)
+            sent = loop.time()
+            await _call_action(session, result.device, av_transport, "Play", InstanceID=0, Speed="1")
+            result.latency = loop.time() - sent
+            # Estimated arrival at the device, relative to the common start
+            result.offset = sent - base + result.latency / 2
+
+        played = await asyncio.gather(
+            *(send_play(result, av_transport) for result, av_transport in ready),
+            return_exceptions=True,
+        )
+
+    for (result, _), outcome in zip(ready, played):
+        if isinstance(outcome, BaseException):
+            result.error = str(outcome) or type(outcome).__name__
+
+    started = [result for result in results if result.ok]
+    if not started:
+        raise next(outcome for outcome in played if isinstance(outcome, BaseException))
+
+    earliest = min(result.offset for result in started)
+    for result in started:
+        result.offset -= earliest
     print(f"Playback started: {url}")
+    return results
 
 
-async def stop(device: DLNADevice) -> None:
+async def stop(device: DLNADevice, client: Optional[DLNAClient] = None) -> None:
     """Stop playback on a DLNA device.
 
     Args:
         device: DLNA device
+        client: Shared client to send the action with (optional)
     """
-    av_transport = await _get_av_transport(device)
-    await av_transport.action("Stop").async_call(InstanceID=0)
+    async with _client_scope(client) as session:
+        av_transport = await session.get_av_transport(device)
+        await _call_action(session, device, av_transport, "Stop", InstanceID=0)
     print("Playback stopped")
 
 
+async def get_sink_protocols(
+    device: DLNADevice,
+    client: Optional[DLNAClient] = None,
+    max_age: float = DEFAULT_TTL,
+) -> list[str]:
+    """Get the protocolInfo entries a renderer can play.
+
+    The list comes from ConnectionManager GetProtocolInfo and is cached per
+    UDN in the device cache, so it is fetched once per max_age.
+
+    Args:
+        device: DLNA device
+        client: Shared client to send the action with (optional)
+        max_age: Seconds a cached list stays valid
+
+    Returns:
+        Sink protocolInfo strings, e.g. "http-get:*:video/mp4:*"; empty if
+        the renderer does not say (then anything may work)
+    """
+    from .cache import DeviceCache
+
+    cache = DeviceCache.load()
+    cached = cache.devices.get(device.udn)
+    if cached and cached.protocols_fetched and time.time() - cached.protocols_fetched < max_age:
+        return cached.sink_protocols
+
+    async with _client_scope(client) as session:
+        upnp_device = await session.get_upnp_device(
+            device.location,
+            udn=device.udn,
+            boot_id=device.boot_id,
+            config_id=device.config_id,
+        )
+        connection_manager = upnp_device.find_service(service_type=CONNECTION_MANAGER_SERVICE_TYPE)
+        sink = ""
+        if connection_manager and connection_manager.has_action("GetProtocolInfo"):
+            try:
+                result = await _call_action(session, device, connection_manager, "GetProtocolInfo")
+                sink = result.get("Sink") or ""
+            except UpnpActionError:
+                pass
+
+    protocols = [entry.strip() for entry in sink.split(",") if entry.strip()]
+    if device.udn:
+        cache.update(device)
+        cache.devices[device.udn].sink_protocols = protocols
+        cache.devices[device.udn].protocols_fetched = time.time()
+        cache.save()
+    return protocols
+
+
 @dataclass
 class PlaybackStatus:
     """Playback status information."""
@@ -139,20 +692,69 @@ class PlaybackStatus:
     state: str  # PLAYING, STOPPED, PAUSED_PLAYBACK, etc.
 
 
-async def get_status(device: DLNADevice) -> PlaybackStatus:
+async def get_status(device: DLNADevice, client: Optional[DLNAClient] = None) -> PlaybackStatus:
     """Get playback status from a DLNA device.
 
     Args:
         device: DLNA device
+        client: Shared client to send the action with (optional)
 
     Returns:
         PlaybackStatus object
     """
-    av_transport = await _get_av_transport(device)
+    async with _client_scope(client) as session:
+        av_transport = await session.get_av_transport(device)
 
-    try:
-        info = await av_transport.action("GetTransportInfo").async_call(InstanceID=0)
-        state = info.get("CurrentTransportState", "UNKNOWN")
-        return PlaybackStatus(state=state)
-    except Exception as e:
-        return PlaybackStatus(state=f"ERROR: {e}")
+        try:
+            info = await _call_action(
+                session, device, av_transport, "GetTransportInfo", InstanceID=0
+            )
+            state = info.get("CurrentTransportState", "UNKNOWN")
+            return PlaybackStatus(state=state)
+        except Exception as e:
+            return PlaybackStatus(state=f"ERROR: {e}")
+
+
+# States in which a renderer is done with the current media
+_FINISHED_STATES = ("STOPPED", "NO_MEDIA_PRESENT")
+
+
+async def wait_until_stopped(
+    device: DLNADevice,
+    client: Optional[DLNAClient] = None,
+    poll_interval: float = 2.0,
+    start_timeout: float = 30.0,
+    max_errors: int = 3,
+) -> None:
+    """Wait until a device has played its media and stopped.
+
+    The renderer must first leave the stopped state (it may take a while to
+    buffer); if it has not started within start_timeout, waiting ends too.
+
+    Args:
+        device: DLNA device
+        client: Shared client to poll with (optional)
+        poll_interval: Seconds between GetTransportInfo calls
+        start_timeout: Seconds to wait for playback to start
+        max_errors: Consecutive failed polls after which the device is given up
+    """
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + start_timeout
+    started = False
+    errors = 0
+
+    async with _client_scope(client) as session:
+        while True:
+            state = (await get_status(device, client=session)).state
+            if state.startswith("ERROR"):
+                # Tolerate a flaky network, not a renderer that is gone
+                errors += 1
+                if errors >= max_errors:
+                    return
+            elif state in _FINISHED_STATES:
+                if started or loop.time() > deadline:
+                    return
+            else:
+                started = True
+                errors = 0
+            await asyncio.sleep(poll_interval)
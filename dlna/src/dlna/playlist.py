@@ -0,0 +1,154 @@
+"""Playlists with gapless advance.
+
+PlaybackQueue plays a list of items on one renderer. When the renderer
+implements SetNextAVTransportURI, the following item is preloaded so the
+renderer moves on by itself without a gap; otherwise the next item is
+loaded when the current one stops. Either way the queue uses the device
+and descriptions it already has: no discovery or description fetch per
+track, and no Stop between tracks.
+"""
+
+import asyncio
+from dataclasses import dataclass
+from typing import Callable, Optional
+
+from .player import _FINISHED_STATES, DLNAClient, DLNADevice, _call_action, play_url
+
+
+@dataclass
+class QueueItem:
+    """One entry of a playlist."""
+
+    url: str
+    title: str = ""
+    metadata: str = ""  # DIDL-Lite, see didl.build_metadata
+
+
+class PlaybackQueue:
+    """Plays items one after another on a renderer.
+
+    on_track is called with the index of each item as it starts.
+
+    Usage:
+        async with DLNAClient() as client:
+            queue = PlaybackQueue(device, items, client)
+            await queue.run()
+    """
+
+    def __init__(
+        self,
+        device: DLNADevice,
+        items: list[QueueItem],
+        client: DLNAClient,
+        on_track: Optional[Callable[[int], None]] = None,
+        poll_interval: float = 1.0,
+        start_timeout: float = 30.0,
+        max_errors: int = 3,
+    ):
+        self.device = device
+        self.items = items
+        self.client = client
+        self.on_track = on_track
+        self.poll_interval = poll_interval
+        self.start_timeout = start_timeout
+        self.max_errors = max_errors
+        self.index = -1
+        self.gapless = False
+        self._av_transport = None
+        self._preloaded: Optional[int] = None
+
+    async def run(self) -> None:
+        """Play the whole queue; returns when the last item has stopped."""
+        if not self.items:
+            return
+
+        self._av_transport = await self.client.get_av_transport(self.device)
+        self.gapless = self._av_transport.has_action("SetNextAVTransportURI")
+
+        first = self.items[0]
+        await play_url(self.device, first.url, client=self.client, metadata=first.metadata)
+        await self._started(0)
+
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.start_timeout
+        started = False
+        errors = 0
+
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            try:
+                state, track_uri = await self._poll()
+            except Exception:
+                # Tolerate a flaky network, not a renderer that is gone
+                errors += 1
+                if errors >= self.max_errors:
+                    raise
+                continue
+            errors = 0
+
+            if state not in _FINISHED_STATES:
+                started = True
+                if self._preloaded is not None and track_uri == self.items[self._preloaded].url:
+                    # The renderer moved on to the preloaded item by itself
+                    await self._started(self._preloaded)
+                continue
+
+            if not started and loop.time() < deadline:
+                continue
+
+            # Stopped: at the end of the list, or the renderer did not advance
+            if self.index + 1 >= len(self.items):
+                return
+            await self._load(self.index + 1)
+            deadline = loop.time() + self.start_timeout
+            started = False
+
+    async def _poll(self) -> tuple[str, str]:
+        """Get the transport state and, while an item is preloaded, the track URI."""
+        info = await self._call("GetTransportInfo", InstanceID=0)
+        state = info.get("CurrentTransportState", "UNKNOWN")
+
+        track_uri = ""
+        if self._preloaded is not None and state not in _FINISHED_STATES:
+            position = await self._call("GetPositionInfo", InstanceID=0)
+            track_uri = position.get("TrackURI", "")
+        return state, track_uri
+
+    async def _load(self, index: int) -> None:
+        """Load an item and start it (the renderer is already stopped)."""
+        item = self.items[index]
+        await self._call(
+            "SetAVTransportURI",
+            InstanceID=0,
+            CurrentURI=item.url,
+            CurrentURIMetaData=item.metadata,
+        )
+        await self._call("Play", InstanceID=0, Speed="1")
+        await self._started(index)
+
+    async def _started(self, index: int) -> None:
+        """Record that an item is playing and preload the one after it."""
+        self.index = index
+        self._preloaded = None
+        if self.on_track:
+            self.on_track(index)
+
+        following = index + 1
+        if not self.gapless or following >= len(self.items):
+            return
+
+        item = self.items[following]
+        try:
+            await self._call(
+                "SetNextAVTransportURI",
+                InstanceID=0,
+                NextURI=item.url,
+                NextURIMetaData=item.metadata,
+            )
+        except Exception:
+            # Advertised but refused: load the next item when this one stops
+            return
+        self._preloaded = following
+
+    async def _call(self, name: str, **kwargs):
+        return await _call_action(self.client, self.device, self._av_transport, name, **kwargs)
@@ -0,0 +1,130 @@
+"""Timeouts, retries and circuit breaking for SOAP actions.
+
+Every AVTransport action gets a deadline. Idempotent actions are retried
+a few times with jittered backoff when the renderer cannot be reached.
+Renderers that keep failing are skipped for a while (the circuit is
+"open"); their failure count is kept in the device cache, so the next
+command fails fast too instead of waiting for another timeout.
+"""
+
+import random
+import time
+from dataclasses import dataclass
+from typing import Callable, Optional
+
+from .cache import DeviceCache
+
+# Actions that take longer on some renderers (they fetch the media first)
+ACTION_TIMEOUTS = {
+    "SetAVTransportURI": 10.0,
+    "SetNextAVTransportURI": 10.0,
+}
+
+# Actions that can be sent twice without changing the outcome
+IDEMPOTENT_ACTIONS = frozenset(
+    {
+        "GetTransportInfo",
+        "GetPositionInfo",
+        "GetMediaInfo",
+        "GetProtocolInfo",
+        "Stop",
+        "SetAVTransportURI",
+        "SetNextAVTransportURI",
+    }
+)
+
+# Extra seconds before an action is abandoned when the HTTP request timeout
+# (which gets the action's full budget) has not fired
+ACTION_TIMEOUT_GRACE = 1.0
+
+# Retries after the first attempt, and the backoff before the first retry
+MAX_RETRIES = 2
+RETRY_BASE_DELAY = 0.25
+
+# Consecutive failed actions that open the circuit, and for how long (seconds)
+FAILURE_THRESHOLD = 3
+BREAKER_COOLDOWN = 60.0
+
+
+class DeviceUnavailableError(Exception):
+    """A renderer failed repeatedly and is skipped until its cooldown ends."""
+
+
+@dataclass
+class ActionMetric:
+    """Timing of one action, as passed to DLNAClient.on_action."""
+
+    device: str  # device name
+    udn: str
+    action: str
+    duration: float  # seconds, over all attempts
+    attempts: int
+    error: Optional[str] = None
+
+    @property
+    def ok(self) -> bool:
+        """Whether the action succeeded."""
+        return self.error is None
+
+
+MetricsHook = Callable[[ActionMetric], None]
+
+
+def retry_delay(attempt: int) -> float:
+    """Backoff before retry number `attempt` (1-based), with full jitter."""
+    return random.uniform(0, RETRY_BASE_DELAY * 2 ** (attempt - 1))
+
+
+class CircuitBreaker:
+    """Per-device failure counts, persisted in the device cache.
+
+    A success resets the count. After FAILURE_THRESHOLD failures in a row,
+    calls are refused until the cooldown has passed; then one call is let
+    through, and the circuit opens again right away if it fails too.
+    """
+
+    def __init__(self, threshold: int = FAILURE_THRESHOLD, cooldown: float = BREAKER_COOLDOWN):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self._state: dict[str, tuple[int, float]] = {}  # udn -> (failures, open_until)
+
+    def check(self, device) -> None:
+        """Raise DeviceUnavailableError if the circuit of a device is open."""
+        _, open_until = self._get(device)
+        remaining = open_until - time.time()
+        if remaining > 0:
+            raise DeviceUnavailableError(
+                f"{device.name} is not responding (retrying in {remaining:.0f}s)"
+            )
+
+    def record_success(self, device) -> None:
+        """Close the circuit of a device that answered."""
+        if self._get(device) != (0, 0.0):
+            self._set(device, 0, 0.0)
+
+    def record_failure(self, device) -> None:
+        """Count a failure, opening the circuit at the threshold."""
+        failures, open_until = self._get(device)
+        failures += 1
+        if failures >= self.threshold:
+            open_until = time.time() + self.cooldown
+        self._set(device, failures, open_until)
+
+    def _get(self, device) -> tuple[int, float]:
+        if device.udn not in self._state:
+            entry = DeviceCache.load().devices.get(device.udn)
+            self._state[device.udn] = (entry.failures, entry.open_until) if entry else (0, 0.0)
+        return self._state[device.udn]
+
+    def _set(self, device, failures: int, open_until: float) -> None:
+        self._state[device.udn] = (failures, open_until)
+        if not device.udn:
+            return
+
+        cache = DeviceCache.load()
+        if device.udn not in cache.devices:
+            cache.update(device)
+        entry = cache.devices[device.udn]
+        entry.failures = failures
+        entry.open_until = open_until
+        cache.save()
@@ -0,0 +1,129 @@
+"""Media file probing.
+
+MIME types come from the file name; duration, resolution and codecs come
+from ffprobe when it is installed (they are simply left empty otherwise).
+"""
+
+import functools
+import json
+import mimetypes
+import shutil
+import subprocess
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional
+
+# Types renderers care about that are missing from some mimetypes tables
+_EXTRA_TYPES = {
+    ".mkv": "video/x-matroska",
+    ".webm": "video/webm",
+    ".ts": "video/mp2t",
+    ".m2ts": "video/mp2t",
+    ".flac": "audio/flac",
+    ".m4a": "audio/mp4",
+    ".aac": "audio/aac",
+    ".ogg": "audio/ogg",
+    ".opus": "audio/ogg",
+    ".srt": "application/x-subrip",
+}
+for _ext, _type in _EXTRA_TYPES.items():
+    mimetypes.add_type(_type, _ext)
+
+# ffprobe should answer in well under a second; give slow disks some slack
+PROBE_TIMEOUT = 15
+
+
+@dataclass
+class MediaInfo:
+    """What a renderer needs to know about a media file."""
+
+    mime_type: str
+    size: int
+    duration: Optional[float] = None  # seconds
+    width: Optional[int] = None
+    height: Optional[int] = None
+    container: str = ""  # ffprobe format name, e.g. "matroska,webm"
+    video_codec: str = ""  # e.g. "h264", "hevc"
+    audio_codec: str = ""  # e.g. "aac", "ac3"
+
+    @property
+    def resolution(self) -> str:
+        """Resolution as "WIDTHxHEIGHT", or "" if unknown."""
+        if self.width and self.height:
+            return f"{self.width}x{self.height}"
+        return ""
+
+
+def guess_mime_type(path: Path) -> str:
+    """Guess the MIME type of a file from its name."""
+    mime_type, _ = mimetypes.guess_type(path.name)
+    return mime_type or "application/octet-stream"
+
+
+def is_media(mime_type: str) -> bool:
+    """Whether a MIME type is audio, video or an image."""
+    return mime_type.split("/")[0] in ("audio", "video", "image")
+
+
+@functools.lru_cache(maxsize=None)
+def has_ffprobe() -> bool:
+    """Whether ffprobe is available (looked up once per process)."""
+    return shutil.which("ffprobe") is not None
+
+
+@functools.lru_cache(maxsize=None)
+def has_ffmpeg() -> bool:
+    """Whether ffmpeg is available (looked up once per process)."""
+    return shutil.which("ffmpeg") is not None
+
+
+def probe(path: Path) -> MediaInfo:
+    """Describe a media file.
+
+    Args:
+        path: File to probe
+
+    Returns:
+        MediaInfo; fields ffprobe could not provide are left empty
+    """
+    info = MediaInfo(mime_type=guess_mime_type(path), size=path.stat().st_size)
+    if not is_media(info.mime_type) or not has_ffprobe():
+        return info
+
+    try:
+        result = subprocess.run(
+            [
+                "ffprobe",
+                "-v", "error",
+                "-print_format", "json",
+                "-show_format",
+                "-show_streams",
+                str(path),
+            ],
+            capture_output=True,
+            text=True,
+            timeout=PROBE_TIMEOUT,
+            check=True,
+        )
+        data = json.loads(result.stdout)
+    except (subprocess.SubprocessError, OSError, json.JSONDecodeError):
+        return info
+
+    fmt = data.get("format", {})
+    info.container = fmt.get("format_name", "")
+    try:
+        info.duration = float(fmt["duration"])
+    except (KeyError, ValueError):
+        pass
+
+    for stream in data.get("streams", []):
+        codec_type = stream.get("codec_type")
+        disposition = stream.get("disposition", {})
+        if codec_type == "video" and not info.video_codec and not disposition.get("attached_pic"):
+            info.video_codec = stream.get("codec_name", "")
+            info.width = stream.get("width")
+            info.height = stream.get("height")
+        elif codec_type == "audio" and not info.audio_codec:
+            info.audio_codec = stream.get("codec_name", "")
+
+    return info
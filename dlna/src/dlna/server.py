@@ -1,38 +1,579 @@
 """Standalone HTTP file server for DLNA media streaming."""
 
+import html
+import io
+import itertools
+import os
 import socket
 import threading
-from http.server import HTTPServer, SimpleHTTPRequestHandler
+import time
+from collections import OrderedDict
+from email.utils import formatdate, parsedate_to_datetime
+from http import HTTPStatus
+from http.server import ThreadingHTTPServer, SimpleHTTPRequestHandler
 from pathlib import Path
+from typing import TYPE_CHECKING, Optional
+from urllib.parse import quote, unquote, urlparse, urlsplit
+
+from .transcode import FFmpegStream, stream_features
+
+if TYPE_CHECKING:
+    from .contentdir import MediaServerDevice
+    from .library import LibraryEntry, MediaLibrary
+    from .thumbs import ThumbnailCache
+    from .transcode import StreamPlan
+
+# Chunk size for the copy fallback when os.sendfile is unavailable
+COPY_CHUNK_SIZE = 256 * 1024
+
+# Thumbnails are served at THUMBS_PREFIX + the media file's path
+THUMBS_PREFIX = "/.thumbs"
+
+# Thumbnail URLs change with the file, so renderers may keep them
+THUMB_MAX_AGE = 24 * 60 * 60
+
+# Remuxed/transcoded streams are served at STREAMS_PREFIX/<n>/<name>
+STREAMS_PREFIX = "/.stream"
+
+# Single files registered with MediaServer.add_file are served at FILES_PREFIX/<n>/<name>
+FILES_PREFIX = "/.file"
+
+# Renderers may reuse a file this long without asking; after that the ETag makes it a 304
+FILE_MAX_AGE = 60
+
+# Files up to this size (subtitles, artwork, playlists) are kept in memory
+SMALL_FILE_MAX_BYTES = 256 * 1024
+
+# Memory cap of the small file cache
+DEFAULT_FILE_CACHE_BYTES = 16 * 1024 * 1024
+
+
+class RangeNotSatisfiable(Exception):
+    """The requested byte range lies outside the file."""
+
+
+def parse_range(header: str, size: int) -> Optional[tuple[int, int]]:
+    """Parse a single-range HTTP Range header.
+
+    Args:
+        header: Range header value, e.g. "bytes=100-", "bytes=0-99", "bytes=-500"
+        size: Size of the resource in bytes
+
+    Returns:
+        (start, end) with end inclusive, or None if the header should be
+        ignored (malformed, other unit, or several ranges)
+
+    Raises:
+        RangeNotSatisfiable: If the range starts beyond the end of the file
+    """
+    unit, _, spec = header.partition("=")
+    if unit.strip().lower() != "bytes" or "," in spec:
+        return None
+
+    first, sep, last = spec.strip().partition("-")
+    if not sep:
+        return None
+
+    try:
+        if first:
+            start = int(first)
+            end = int(last) if last else size - 1
+        elif last:
+            # Suffix range: the final N bytes
+            start = max(size - int(last), 0)
+            end = size - 1
+        else:
+            return None
+    except ValueError:
+        return None
+
+    if start >= size:
+        raise RangeNotSatisfiable(header)
+    if start > end:
+        return None
+
+    return start, min(end, size - 1)
+
+
+def file_etag(st: os.stat_result) -> str:
+    """Strong ETag of one version of a file (changes with its mtime or size)."""
+    return f'"{st.st_mtime_ns:x}-{st.st_size:x}"'
+
+
+class FileCache:
+    """Size-capped in-memory cache of small files, least recently used first out.
+
+    Entries are keyed by path and checked against the file's mtime and
+    size on every use, so an edited file is read again. Safe to share
+    between the threads of MediaServer.
+
+    Args:
+        max_bytes: Memory cap of the cache
+        max_file_bytes: Larger files are never cached
+    """
+
+    def __init__(self, max_bytes: int = DEFAULT_FILE_CACHE_BYTES, max_file_bytes: int = SMALL_FILE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.max_file_bytes = max_file_bytes
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[str, tuple[int, bytes]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def read(self, path: str, f, st: os.stat_result) -> Optional[bytes]:
+        """Get a file's contents, reading and caching them on first use.
+
+        Args:
+            path: Path of the file (the cache key)
+            f: The file, open for reading
+            st: Its os.fstat result
+
+        Returns:
+            The contents, or None if the file is too large to cache
+        """
+        if st.st_size > self.max_file_bytes or st.st_size > self.max_bytes:
+            return None
+
+        with self._lock:
+            entry = self._entries.get(path)
+            if entry is not None and entry[0] == st.st_mtime_ns and len(entry[1]) == st.st_size:
+                self._entries.move_to_end(path)
+                self.hits += 1
+                return entry[1]
+
+        data = f.read()
+        if len(data) != st.st_size:
+            # Changed while reading: serve it, but do not keep it
+            return None
+
+        with self._lock:
+            self.misses += 1
+            old = self._entries.pop(path, None)
+            if old is not None:
+                self.size -= len(old[1])
+            self._entries[path] = (st.st_mtime_ns, data)
+            self.size += len(data)
+            while self.size > self.max_bytes:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self.size -= len(evicted)
+        return data
 
 
 class QuietHTTPRequestHandler(SimpleHTTPRequestHandler):
-    """Quiet HTTP request handler that doesn't log requests."""
+    """Quiet HTTP/1.1 request handler for media files.
+
+    Supports keep-alive, HEAD, byte ranges (206 Partial Content, which
+    renderers use to seek), conditional GET (ETag/Last-Modified, 304 Not
+    Modified) and zero-copy transfer with os.sendfile. Small files come
+    from a FileCache when one is given. With a
+    MediaLibrary, directory listings and MIME types come from the index
+    instead of the file system, and a MediaServerDevice answers UPnP
+    description and ContentDirectory requests. With a ThumbnailCache,
+    thumbnails are served under THUMBS_PREFIX. Streams registered with
+    MediaServer.add_stream are piped from ffmpeg under STREAMS_PREFIX, and
+    files registered with MediaServer.add_file are served under
+    FILES_PREFIX. Without a directory, nothing else is served.
+    """
+
+    protocol_version = "HTTP/1.1"
+    use_sendfile = hasattr(os, "sendfile")
 
-    def __init__(self, *args, directory=None, **kwargs):
+    def __init__(
+        self,
+        *args,
+        directory=None,
+        library: Optional["MediaLibrary"] = None,
+        upnp: Optional["MediaServerDevice"] = None,
+        thumbnails: Optional["ThumbnailCache"] = None,
+        streams: Optional[dict[str, tuple[Path, "StreamPlan"]]] = None,
+        files: Optional[dict[str, Path]] = None,
+        file_cache: Optional[FileCache] = None,
+        **kwargs,
+    ):
         self.directory = directory
+        # The base class falls back to the working directory, which must not be shared
+        self.shared = directory is not None
+        self.library = library
+        self.upnp = upnp
+        self.thumbnails = thumbnails
+        self.streams = streams if streams is not None else {}
+        self.files = files if files is not None else {}
+        self.file_cache = file_cache
+        self._byte_range: tuple[int, int] = (0, 0)
         super().__init__(*args, directory=directory, **kwargs)
 
     def log_message(self, format, *args):
         pass
 
+    def send_error(self, code, message=None, explain=None):
+        """Send an error; a 404 keeps the connection open.
+
+        Renderers look for subtitles and artwork that often do not exist,
+        and the base class closes the connection after every error.
+        """
+        if code != HTTPStatus.NOT_FOUND:
+            return super().send_error(code, message, explain)
+
+        body = f"{code} {message or 'Not Found'}\n".encode("utf-8", "replace")
+        self.send_response(code, message)
+        self.send_header("Content-Type", "text/plain; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if self.command != "HEAD":
+            self.wfile.write(body)
+
+    def _indexed(self, path: str) -> Optional["LibraryEntry"]:
+        """Index entry for a translated file system path, if indexed."""
+        if self.library is None:
+            return None
+        try:
+            relative = Path(path).resolve().relative_to(self.library.root)
+        except ValueError:
+            return None
+        return self.library.get("" if relative == Path(".") else relative.as_posix())
+
+    def guess_type(self, path):
+        """MIME type from the index (as probed), else from the file name."""
+        entry = self._indexed(path)
+        if entry and entry.mime_type:
+            return entry.mime_type
+        return super().guess_type(path)
+
+    def list_directory(self, path):
+        """List a directory from the index, with duration and resolution."""
+        entry = self._indexed(path)
+        if entry is None or not entry.is_dir:
+            return super().list_directory(path)
+
+        title = html.escape(unquote(self.path.split("?", 1)[0]), quote=False)
+        lines = [
+            "<!DOCTYPE HTML>",
+            '<html><head><meta charset="utf-8">',
+            f"<title>Directory listing for {title}</title></head>",
+            f"<body><h1>Directory listing for {title}</h1><hr><ul>",
+        ]
+        for child in self.library.children(entry.path):
+            name = child.name + ("/" if child.is_dir else "")
+            details = []
+            if not child.is_dir:
+                details.append(child.mime_type)
+                if child.duration:
+                    details.append(f"{child.duration:.0f}s")
+                if child.width and child.height:
+                    details.append(f"{child.width}x{child.height}")
+            suffix = f" <small>({html.escape(', '.join(details))})</small>" if details else ""
+            lines.append(f'<li><a href="{quote(name)}">{html.escape(name, quote=False)}</a>{suffix}</li>')
+        lines.append("</ul><hr></body></html>")
+
+        encoded = "\n".join(lines).encode("utf-8", "surrogateescape")
+        self.send_response(HTTPStatus.OK)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(encoded)))
+        self.end_headers()
+        return io.BytesIO(encoded)
+
+    def do_POST(self):
+        """SOAP control requests for the UPnP services."""
+        body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        if self.upnp is None:
+            self.send_error(HTTPStatus.NOT_IMPLEMENTED, "Unsupported method")
+            return
+
+        # The address the caller reached us on is one it can fetch media from
+        host, port = self.connection.getsockname()[:2]
+        status, response = self.upnp.control(urlsplit(self.path).path, body, f"http://{host}:{port}")
+        self.send_response(status)
+        self.send_header("Content-Type", 'text/xml; charset="utf-8"')
+        self.send_header("Content-Length", str(len(response)))
+        self.send_header("EXT", "")
+        self.end_headers()
+        self.wfile.write(response)
+
+    def send_head(self):
+        """Send headers for a file (whole or a byte range) and return it open."""
+        document = self.upnp.document(urlsplit(self.path).path) if self.upnp else None
+        if document is not None:
+            encoded = document.encode("utf-8")
+            self.send_response(HTTPStatus.OK)
+            self.send_header("Content-Type", 'text/xml; charset="utf-8"')
+            self.send_header("Content-Length", str(len(encoded)))
+            self.end_headers()
+            return io.BytesIO(encoded)
+
+        url_path = urlsplit(self.path).path
+        if self.thumbnails and url_path.startswith(THUMBS_PREFIX + "/"):
+            return self._send_thumbnail(url_path[len(THUMBS_PREFIX):])
+        if url_path.startswith(STREAMS_PREFIX + "/"):
+            return self._send_stream(url_path)
+
+        registered = self.files.get(url_path)
+        if registered is not None:
+            return self._send_file(str(registered))
+        if not self.shared:
+            self.send_error(HTTPStatus.NOT_FOUND, "File not found")
+            return None
+
+        path = self.translate_path(self.path)
+        if os.path.isdir(path):
+            return super().send_head()
+        return self._send_file(path)
+
+    def _send_file(self, path: str):
+        """Send headers for a file (whole or a byte range) and return it open."""
+        try:
+            f = open(path, "rb")
+        except OSError:
+            self.send_error(HTTPStatus.NOT_FOUND, "File not found")
+            return None
+
+        try:
+            fs = os.fstat(f.fileno())
+            size = fs.st_size
+            etag = file_etag(fs)
+
+            if self._not_modified(etag, fs.st_mtime):
+                f.close()
+                self.send_response(HTTPStatus.NOT_MODIFIED)
+                self.send_header("ETag", etag)
+                self.send_header("Cache-Control", f"max-age={FILE_MAX_AGE}")
+                self.end_headers()
+                return None
+
+            byte_range = None
+            if "Range" in self.headers:
+                byte_range = parse_range(self.headers["Range"], size)
+
+            if byte_range:
+                start, end = byte_range
+                self.send_response(HTTPStatus.PARTIAL_CONTENT)
+                self.send_header("Content-Range", f"bytes {start}-{end}/{size}")
+            else:
+                start, end = 0, size - 1
+                self.send_response(HTTPStatus.OK)
+
+            self.send_header("Content-Type", self.guess_type(path))
+            self.send_header("Content-Length", str(end - start + 1))
+            self.send_header("Accept-Ranges", "bytes")
+            self.send_header("Last-Modified", formatdate(fs.st_mtime, usegmt=True))
+            self.send_header("ETag", etag)
+            self.send_header("Cache-Control", f"max-age={FILE_MAX_AGE}")
+            self.end_headers()
+        except RangeNotSatisfiable:
+            f.close()
+            self.send_response(HTTPStatus.REQUESTED_RANGE_NOT_SATISFIABLE)
+            self.send_header("Content-Range", f"bytes */{size}")
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return None
+        except Exception:
+            f.close()
+            raise
+
+        self._byte_range = (start, end - start + 1)
+        if self.file_cache is not None and self.command != "HEAD":
+            try:
+                data = self.file_cache.read(path, f, fs)
+            except Exception:
+                f.close()
+                raise
+            if data is not None:
+                f.close()
+                return io.BytesIO(data[start:end + 1])
+            f.seek(0)
+        return f
+
+    def _not_modified(self, etag: str, mtime: float) -> bool:
+        """Whether the client's conditional headers match (so 304 applies)."""
+        if_none_match = self.headers.get("If-None-Match")
+        if if_none_match is not None:
+            tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+            return "*" in tags or etag in tags
+
+        if_modified_since = self.headers.get("If-Modified-Since")
+        if if_modified_since:
+            try:
+                return int(mtime) <= parsedate_to_datetime(if_modified_since).timestamp()
+            except (TypeError, ValueError, IndexError, OverflowError):
+                return False
+        return False
+
+    def _send_thumbnail(self, media_path: str):
+        """Send headers for the thumbnail of a media file and return it open."""
+        source = Path(self.translate_path(media_path))
+        entry = self._indexed(str(source))
+        mime_type = entry.mime_type if entry and entry.mime_type else self.guess_type(str(source))
+        thumbnail = self.thumbnails.get(source, mime_type, entry.duration if entry else None)
+        if thumbnail is None:
+            self.send_error(HTTPStatus.NOT_FOUND, "No thumbnail")
+            return None
+
+        etag = f'"{thumbnail.key}"'
+        mtime = thumbnail.modified
+        try:
+            f = open(thumbnail.path, "rb")
+            size = os.fstat(f.fileno()).st_size
+        except OSError:
+            self.send_error(HTTPStatus.NOT_FOUND, "No thumbnail")
+            return None
+
+        if self._not_modified(etag, mtime):
+            f.close()
+            self.send_response(HTTPStatus.NOT_MODIFIED)
+            self.send_header("ETag", etag)
+            self.send_header("Cache-Control", f"max-age={THUMB_MAX_AGE}")
+            self.end_headers()
+            return None
+
+        self.send_response(HTTPStatus.OK)
+        self.send_header("Content-Type", "image/jpeg")
+        self.send_header("Content-Length", str(size))
+        self.send_header("ETag", etag)
+        self.send_header("Last-Modified", formatdate(mtime, usegmt=True))
+        self.send_header("Cache-Control", f"max-age={THUMB_MAX_AGE}")
+        self.end_headers()
+        self._byte_range = (0, size)
+        return f
+
+    def _send_stream(self, url_path: str):
+        """Send headers for a registered stream and return the running ffmpeg.
+
+        The length is unknown, so the body runs until ffmpeg finishes and
+        the connection closes; byte ranges are not supported.
+        """
+        stream = self.streams.get(url_path)
+        if stream is None:
+            self.send_error(HTTPStatus.NOT_FOUND, "Stream not found")
+            return None
+        source, plan = stream
+
+        pipe = None
+        if self.command != "HEAD":
+            try:
+                pipe = FFmpegStream(source, plan)
+            except OSError as e:
+                self.send_error(HTTPStatus.INTERNAL_SERVER_ERROR, f"Cannot start ffmpeg: {e}")
+                return None
+
+        self.close_connection = True
+        self.send_response(HTTPStatus.OK)
+        self.send_header("Content-Type", plan.mime_type)
+        self.send_header("Connection", "close")
+        self.send_header("transferMode.dlna.org", "Streaming")
+        self.send_header("contentFeatures.dlna.org", stream_features(plan))
+        self.end_headers()
+        return pipe
+
+    def copyfile(self, source, outputfile):
+        """Send the selected byte range, zero-copy where possible."""
+        if isinstance(source, io.BytesIO):
+            # Directory listings are in-memory buffers
+            return super().copyfile(source, outputfile)
+        if isinstance(source, FFmpegStream):
+            try:
+                super().copyfile(source, outputfile)
+            except (BrokenPipeError, ConnectionResetError):
+                # The renderer stopped or gave up; closing the pipe stops ffmpeg
+                pass
+            return
+
+        offset, count = self._byte_range
+        try:
+            if self.use_sendfile:
+                remaining = self._sendfile(source, offset, count)
+            else:
+                remaining = self._copy(source, outputfile, offset, count)
+        except (BrokenPipeError, ConnectionResetError):
+            # Renderers drop connections when they seek or stop
+            remaining = count
+
+        if remaining:
+            # Short body (client gone or file truncated): the connection is unusable
+            self.close_connection = True
+
+    def _sendfile(self, source, offset: int, count: int) -> int:
+        """Send with os.sendfile. Returns the number of bytes not sent."""
+        out_fd = self.connection.fileno()
+        in_fd = source.fileno()
+        while count > 0:
+            sent = os.sendfile(out_fd, in_fd, offset, count)
+            if sent == 0:
+                break
+            offset += sent
+            count -= sent
+        return count
+
+    def _copy(self, source, outputfile, offset: int, count: int) -> int:
+        """Copy through Python buffers. Returns the number of bytes not sent."""
+        source.seek(offset)
+        while count > 0:
+            chunk = source.read(min(COPY_CHUNK_SIZE, count))
+            if not chunk:
+                break
+            outputfile.write(chunk)
+            count -= len(chunk)
+        return count
+
 
 class MediaServer:
-    """HTTP server for serving media files to DLNA devices."""
+    """HTTP server for serving media files to DLNA devices.
 
-    def __init__(self, directory: Path, port: int = 0):
+    Each connection is handled in its own thread, so a renderer can keep
+    several ranged requests open at once.
+
+    Args:
+        directory: Directory to serve (None: only files registered with
+            add_file, and streams)
+        port: Port to listen on (0: any free port)
+        library: Index of the directory (see library.MediaLibrary) used for
+            listings and MIME types, and browsable as a UPnP MediaServer at
+            description_url; refreshed by the caller
+        name: Friendly name of the UPnP MediaServer
+        thumbnails: Thumbnail cache; with a library, items get album art
+        cache_bytes: Memory cap of the cache of small files (subtitles,
+            artwork, playlists); 0 disables it
+
+    To cast single files, create it without a directory and register
+    them with add_file: everything else on the disk then stays private.
+    Files a renderer cannot play as is can be registered with add_stream
+    and are then converted by ffmpeg while they are sent.
+    """
+
+    def __init__(
+        self,
+        directory: Optional[Path] = None,
+        port: int = 0,
+        library: Optional["MediaLibrary"] = None,
+        name: str = "",
+        thumbnails: Optional["ThumbnailCache"] = None,
+        cache_bytes: int = DEFAULT_FILE_CACHE_BYTES,
+    ):
         self.directory = directory
         self.port = port
-        self._server: HTTPServer | None = None
+        self.library = library
+        self.thumbnails = thumbnails
+        self.file_cache = FileCache(cache_bytes) if cache_bytes > 0 else None
+        self.device: Optional["MediaServerDevice"] = None
+        if library is not None:
+            from .contentdir import MediaServerDevice
+
+            self.device = MediaServerDevice(library, name, album_art=thumbnails is not None)
+        self._streams: dict[str, tuple[Path, "StreamPlan"]] = {}
+        self._files: dict[str, Path] = {}
+        self._ids = itertools.count(1)
+        self._server: ThreadingHTTPServer | None = None
         self._thread: threading.Thread | None = None
         self._actual_port: int = 0
 
     def start(self) -> int:
         """Start the HTTP server. Returns the actual port."""
         handler = lambda *args, **kwargs: QuietHTTPRequestHandler(
-            *args, directory=str(self.directory), **kwargs
+            *args, directory=str(self.directory) if self.directory is not None else None,
+            library=self.library, upnp=self.device, thumbnails=self.thumbnails,
+            streams=self._streams, files=self._files, file_cache=self.file_cache, **kwargs
         )
-        self._server = HTTPServer(("0.0.0.0", self.port), handler)
+        self._server = ThreadingHTTPServer(("0.0.0.0", self.port), handler)
+        self._server.daemon_threads = True
         self._actual_port = self._server.server_address[1]
 
         def serve():
@@ -42,26 +583,118 @@ class MediaServer:
         self._thread.start()
         return self._actual_port
 
+    def add_stream(self, path: Path, plan: "StreamPlan") -> str:
+        """Serve a file converted by ffmpeg (see transcode.plan_stream).
+
+        Args:
+            path: Source file
+            plan: Remux or transcode plan
+
+        Returns:
+            URL path of the stream, to be appended to url or url_for
+        """
+        name = quote(Path(path).stem + plan.extension)
+        url_path = f"{STREAMS_PREFIX}/{next(self._ids)}/{name}"
+        self._streams[url_path] = (Path(path), plan)
+        return url_path
+
+    def add_file(self, path: Path) -> str:
+        """Serve a single file (and nothing next to it).
+
+        Args:
+            path: File to serve
+
+        Returns:
+            URL path of the file, to be appended to url or url_for
+        """
+        url_path = f"{FILES_PREFIX}/{next(self._ids)}/{quote(Path(path).name)}"
+        self._files[url_path] = Path(path).resolve()
+        return url_path
+
     def stop(self):
         """Stop the HTTP server."""
         if self._server:
             self._server.shutdown()
+            self._server.server_close()
             self._server = None
 
     @property
     def url(self) -> str:
-        """Get the base URL for the server."""
+        """Get the base URL for the server (prefer url_for when the renderer is known)."""
         local_ip = _get_local_ip()
         return f"http://{local_ip}:{self._actual_port}"
 
+    def url_for(self, location: str) -> str:
+        """Get the base URL as reachable from a renderer.
 
-def _get_local_ip() -> str:
-    """Get local IP address."""
+        Args:
+            location: Renderer LOCATION URL (DLNADevice.location)
+        """
+        return f"http://{local_ip_for(location)}:{self._actual_port}"
+
+    @property
+    def description_url(self) -> Optional[str]:
+        """UPnP device description URL, when serving a library."""
+        if self.device is None:
+            return None
+        from .contentdir import DESCRIPTION_PATH
+
+        return f"{self.url}{DESCRIPTION_PATH}"
+
+
+# Local addresses chosen per renderer host, with the time they were chosen
+_local_ips: dict[str, tuple[str, float]] = {}
+
+# Re-check after this many seconds, in case the host moved networks (DHCP, VPN)
+LOCAL_IP_TTL = 60.0
+
+# SSDP multicast group: routed via the LAN interface, and no internet needed
+_SSDP_GROUP = "239.255.255.250"
+
+
+def _route_source(address: str) -> Optional[str]:
+    """Local address the kernel would send from to reach an address.
+
+    Connecting a UDP socket sends no packets; it only selects the route,
+    i.e. the interface whose subnet contains the address.
+    """
     try:
-        s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-        s.connect(("8.8.8.8", 80))
-        ip = s.getsockname()[0]
-        s.close()
-        return ip
-    except:
-        return "127.0.0.1"
+        with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as s:
+            s.connect((address, 1900))
+            ip = s.getsockname()[0]
+    except OSError:
+        return None
+    return ip if ip != "0.0.0.0" else None
+
+
+def local_ip_for(target: str) -> str:
+    """Get the local IP address that a renderer can reach us on.
+
+    Args:
+        target: Renderer LOCATION URL or host name/address
+
+    Returns:
+        Address of the interface facing the renderer (cached per renderer)
+    """
+    host = urlparse(target).hostname if "://" in target else target
+    if not host:
+        return _get_local_ip()
+
+    now = time.monotonic()
+    cached = _local_ips.get(host)
+    if cached and now - cached[1] < LOCAL_IP_TTL:
+        return cached[0]
+
+    try:
+        address = socket.getaddrinfo(host, None, socket.AF_INET)[0][4][0]
+    except (OSError, IndexError):
+        return _get_local_ip()
+
+    ip = _route_source(address) or _get_local_ip()
+    _local_ips[host] = (ip, now)
+    return ip
+
+
+def _get_local_ip() -> str:
+    """Get a local IP address when no renderer is known."""
+    return _route_source(_SSDP_GROUP) or "127.0.0.1"
@@ -0,0 +1,97 @@
+"""SOAP and SCPD documents for the UPnP services dlna implements.
+
+Shared by the ContentDirectory MediaServer (contentdir) and the simulated
+renderers (testing): service descriptions built from action tables, and
+the request, response and fault envelopes of UPnP control.
+"""
+
+import xml.etree.ElementTree as ET
+from typing import Iterable
+from xml.sax.saxutils import escape
+
+SOAP_NS = "http://schemas.xmlsoap.org/soap/envelope/"
+SOAP_ENCODING = "http://schemas.xmlsoap.org/soap/encoding/"
+
+
+class ActionError(Exception):
+    """A UPnP action failed; returned to the control point as a SOAP fault."""
+
+    def __init__(self, code: int, description: str):
+        super().__init__(code, description)
+        self.code = code
+        self.description = description
+
+
+def scpd_xml(actions: dict, state_variables: dict, evented: Iterable[str] = ()) -> str:
+    """Service description for an action table.
+
+    Args:
+        actions: Action -> (in arguments, out arguments); each argument is
+            (name, state variable)
+        state_variables: State variable -> UPnP data type
+        evented: State variables sent with events
+    """
+    evented = set(evented)
+    action_xml = []
+    for name, (in_args, out_args) in actions.items():
+        arguments = "".join(
+            f"<argument><name>{arg}</name><direction>{direction}</direction>"
+            f"<relatedStateVariable>{variable}</relatedStateVariable></argument>"
+            for direction, args in (("in", in_args), ("out", out_args))
+            for arg, variable in args
+        )
+        action_xml.append(f"<action><name>{name}</name><argumentList>{arguments}</argumentList></action>")
+
+    variables = "".join(
+        f'<stateVariable sendEvents="{"yes" if name in evented else "no"}">'
+        f"<name>{name}</name><dataType>{data_type}</dataType></stateVariable>"
+        for name, data_type in state_variables.items()
+    )
+    return (
+        '<?xml version="1.0"?>'
+        '<scpd xmlns="urn:schemas-upnp-org:service-1-0">'
+        "<specVersion><major>1</major><minor>0</minor></specVersion>"
+        f"<actionList>{''.join(action_xml)}</actionList>"
+        f"<serviceStateTable>{variables}</serviceStateTable>"
+        "</scpd>"
+    )
+
+
+def parse_soap(body: bytes) -> tuple[str, dict[str, str]]:
+    """Action name and arguments of a SOAP request.
+
+    Raises:
+        ActionError: 401 if the body is not a SOAP action call
+    """
+    try:
+        envelope = ET.fromstring(body)
+    except ET.ParseError:
+        raise ActionError(401, "Invalid Action")
+    soap_body = envelope.find(f"{{{SOAP_NS}}}Body")
+    if soap_body is None or not len(soap_body):
+        raise ActionError(401, "Invalid Action")
+    call = soap_body[0]
+    return call.tag.split("}")[-1], {child.tag.split("}")[-1]: child.text or "" for child in call}
+
+
+def soap_response(service_type: str, action: str, out: dict) -> bytes:
+    """SOAP response envelope for an action."""
+    out_xml = "".join(f"<{key}>{escape(str(value))}</{key}>" for key, value in out.items())
+    return (
+        '<?xml version="1.0" encoding="utf-8"?>'
+        f'<s:Envelope xmlns:s="{SOAP_NS}" s:encodingStyle="{SOAP_ENCODING}">'
+        f'<s:Body><u:{action}Response xmlns:u="{service_type}">{out_xml}</u:{action}Response></s:Body>'
+        "</s:Envelope>"
+    ).encode("utf-8")
+
+
+def soap_fault(error: ActionError) -> bytes:
+    """SOAP fault envelope for a failed action."""
+    return (
+        '<?xml version="1.0" encoding="utf-8"?>'
+        f'<s:Envelope xmlns:s="{SOAP_NS}" s:encodingStyle="{SOAP_ENCODING}">'
+        "<s:Body><s:Fault><faultcode>s:Client</faultcode><faultstring>UPnPError</faultstring>"
+        '<detail><UPnPError xmlns="urn:schemas-upnp-org:control-1-0">'
+        f"<errorCode>{error.code}</errorCode><errorDescription>{escape(error.description)}</errorDescription>"
+        "</UPnPError></detail></s:Fault></s:Body></s:Envelope>"
+    ).encode("utf-8")
@@ -0,0 +1,571 @@
+"""Simulated MediaRenderers for tests and benchmarks.
+
+FakeRenderer serves a device description, AVTransport and ConnectionManager
+SCPDs and SOAP control on a local aiohttp server, and keeps a small
+transport state machine. AVTransport GENA subscriptions are accepted, and
+subscribers get a LastChange NOTIFY on subscribing and on every change of
+TransportState. SsdpResponder answers M-SEARCH for a set of fake renderers on a
+local UDP port, so discovery can run offline too (search it with
+`discover_devices(target=responder.address)`). Latency can be added to
+every response, per action, and to SSDP answers.
+
+Usage:
+    async with FakeRenderer(latency=0.02) as renderer:
+        async with DLNAClient() as client:
+            await play_url(renderer.device, "http://example.com/a.mp4", client=client)
+        assert renderer.state == "PLAYING"
+
+    async with FakeRenderer() as a, FakeRenderer() as b, SsdpResponder([a, b]) as ssdp:
+        devices = await discover_devices(timeout=1, target=ssdp.address)
+"""
+
+import asyncio
+import time
+import uuid
+from typing import Optional, Sequence
+from xml.sax.saxutils import escape
+
+import aiohttp
+from aiohttp import web
+
+from .player import (
+    AVTRANSPORT_SERVICE_TYPE,
+    CONNECTION_MANAGER_SERVICE_TYPE,
+    MEDIA_RENDERER_DEVICE_TYPE,
+    DLNADevice,
+)
+from .soap import ActionError, parse_soap, scpd_xml, soap_fault, soap_response
+
+# Search targets a MediaRenderer with an AVTransport service answers
+SSDP_TARGETS = ("upnp:rootdevice", MEDIA_RENDERER_DEVICE_TYPE, AVTRANSPORT_SERVICE_TYPE)
+
+AVT_EVENT_NS = "urn:schemas-upnp-org:metadata-1-0/AVT/"
+
+# State variable -> UPnP data type
+STATE_VARIABLES = {
+    "A_ARG_TYPE_InstanceID": "ui4",
+    "AVTransportURI": "string",
+    "AVTransportURIMetaData": "string",
+    "NextAVTransportURI": "string",
+    "NextAVTransportURIMetaData": "string",
+    "TransportState": "string",
+    "TransportStatus": "string",
+    "TransportPlaySpeed": "string",
+    "NumberOfTracks": "ui4",
+    "CurrentTrack": "ui4",
+    "CurrentTrackDuration": "string",
+    "CurrentMediaDuration": "string",
+    "CurrentTrackMetaData": "string",
+    "CurrentTrackURI": "string",
+    "RelativeTimePosition": "string",
+    "AbsoluteTimePosition": "string",
+    "RelativeCounterPosition": "i4",
+    "AbsoluteCounterPosition": "i4",
+    "PlaybackStorageMedium": "string",
+    "RecordStorageMedium": "string",
+    "RecordMediumWriteStatus": "string",
+    "LastChange": "string",
+}
+
+# Action -> (in arguments, out arguments); each argument is (name, state variable)
+ACTIONS = {
+    "SetAVTransportURI": (
+        [
+            ("InstanceID", "A_ARG_TYPE_InstanceID"),
+            ("CurrentURI", "AVTransportURI"),
+            ("CurrentURIMetaData", "AVTransportURIMetaData"),
+        ],
+        [],
+    ),
+    "SetNextAVTransportURI": (
+        [
+            ("InstanceID", "A_ARG_TYPE_InstanceID"),
+            ("NextURI", "NextAVTransportURI"),
+            ("NextURIMetaData", "NextAVTransportURIMetaData"),
+        ],
+        [],
+    ),
+    "Play": ([("InstanceID", "A_ARG_TYPE_InstanceID"), ("Speed", "TransportPlaySpeed")], []),
+    "Pause": ([("InstanceID", "A_ARG_TYPE_InstanceID")], []),
+    "Stop": ([("InstanceID", "A_ARG_TYPE_InstanceID")], []),
+    "GetTransportInfo": (
+        [("InstanceID", "A_ARG_TYPE_InstanceID")],
+        [
+            ("CurrentTransportState", "TransportState"),
+            ("CurrentTransportStatus", "TransportStatus"),
+            ("CurrentSpeed", "TransportPlaySpeed"),
+        ],
+    ),
+    "GetPositionInfo": (
+        [("InstanceID", "A_ARG_TYPE_InstanceID")],
+        [
+            ("Track", "CurrentTrack"),
+            ("TrackDuration", "CurrentTrackDuration"),
+            ("TrackMetaData", "CurrentTrackMetaData"),
+            ("TrackURI", "CurrentTrackURI"),
+            ("RelTime", "RelativeTimePosition"),
+            ("AbsTime", "AbsoluteTimePosition"),
+            ("RelCount", "RelativeCounterPosition"),
+            ("AbsCount", "AbsoluteCounterPosition"),
+        ],
+    ),
+    "GetMediaInfo": (
+        [("InstanceID", "A_ARG_TYPE_InstanceID")],
+        [
+            ("NrTracks", "NumberOfTracks"),
+            ("MediaDuration", "CurrentMediaDuration"),
+            ("CurrentURI", "AVTransportURI"),
+            ("CurrentURIMetaData", "AVTransportURIMetaData"),
+            ("NextURI", "NextAVTransportURI"),
+            ("NextURIMetaData", "NextAVTransportURIMetaData"),
+            ("PlayMedium", "PlaybackStorageMedium"),
+            ("RecordMedium", "RecordStorageMedium"),
+            ("WriteStatus", "RecordMediumWriteStatus"),
+        ],
+    ),
+}
+
+
+# ConnectionManager: only what players use to pick a format
+CM_STATE_VARIABLES = {
+    "SourceProtocolInfo": "string",
+    "SinkProtocolInfo": "string",
+}
+
+CM_ACTIONS = {
+    "GetProtocolInfo": ([], [("Source", "SourceProtocolInfo"), ("Sink", "SinkProtocolInfo")]),
+}
+
+# What a typical TV accepts
+DEFAULT_SINK_PROTOCOLS = (
+    "http-get:*:video/mp4:*",
+    "http-get:*:video/mp2t:*",
+    "http-get:*:audio/mpeg:*",
+    "http-get:*:image/jpeg:*",
+)
+
+
+SCPD_XML = scpd_xml(ACTIONS, STATE_VARIABLES, evented=("LastChange",))
+CM_SCPD_XML = scpd_xml(CM_ACTIONS, CM_STATE_VARIABLES)
+
+# Control path -> (service type, actions)
+_SERVICES = {
+    "/AVTransport/control": (AVTRANSPORT_SERVICE_TYPE, ACTIONS),
+    "/ConnectionManager/control": (CONNECTION_MANAGER_SERVICE_TYPE, CM_ACTIONS),
+}
+
+
+def _format_time(seconds: float) -> str:
+    seconds = int(seconds)
+    return f"{seconds // 3600}:{seconds // 60 % 60:02d}:{seconds % 60:02d}"
+
+
+class FakeRenderer:
+    """A local, scriptable UPnP MediaRenderer.
+
+    Args:
+        name: friendlyName of the device
+        latency: Seconds added before every HTTP response
+        action_latency: Extra seconds per SOAP action name, e.g. {"Play": 0.5}
+        track_duration: Seconds each URI "plays" before the renderer stops
+                        (or moves on to the NextURI); None plays forever
+        host: Address to listen on
+        sink_protocols: protocolInfo entries returned by GetProtocolInfo
+        event_timeout: Seconds granted to event subscriptions (TIMEOUT header)
+
+    Set refuse_renewals to answer subscription renewals with 412 (as a
+    renderer that rebooted and forgot its subscribers does).
+    """
+
+    def __init__(
+        self,
+        name: str = "Fake Renderer",
+        latency: float = 0.0,
+        action_latency: Optional[dict[str, float]] = None,
+        track_duration: Optional[float] = None,
+        host: str = "127.0.0.1",
+        sink_protocols: Sequence[str] = DEFAULT_SINK_PROTOCOLS,
+        event_timeout: int = 1800,
+    ):
+        self.name = name
+        self.sink_protocols = list(sink_protocols)
+        self.udn = f"uuid:{uuid.uuid4()}"
+        self.latency = latency
+        self.action_latency = dict(action_latency or {})
+        self.track_duration = track_duration
+        self.host = host
+        self.port = 0
+
+        self.state = "NO_MEDIA_PRESENT"
+        self.uri = ""
+        self.metadata = ""
+        self.next_uri = ""
+        self.next_metadata = ""
+        self.actions: list[str] = []  # names of the actions received, in order
+        self.hits: dict[str, int] = {}  # HTTP requests per path
+
+        self.event_timeout = event_timeout
+        self.refuse_renewals = False
+        self.subscriptions: dict[str, str] = {}  # SID -> callback URL
+        self.gena: list[str] = []  # SUBSCRIBE, RENEW and UNSUBSCRIBE requests received, in order
+        self._event_seq: dict[str, int] = {}
+        self._notifications: set[asyncio.Task] = set()
+        self._session: Optional[aiohttp.ClientSession] = None
+
+        self._track_started = 0.0
+        self._runner: Optional[web.AppRunner] = None
+
+    async def __aenter__(self) -> "FakeRenderer":
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.stop()
+
+    async def start(self) -> None:
+        """Start the HTTP server."""
+        app = web.Application()
+        app.router.add_get("/description.xml", self._description)
+        app.router.add_get("/AVTransport.xml", self._scpd)
+        app.router.add_post("/AVTransport/control", self._control)
+        app.router.add_get("/ConnectionManager.xml", self._cm_scpd)
+        app.router.add_post("/ConnectionManager/control", self._control)
+        app.router.add_route("SUBSCRIBE", "/AVTransport/event", self._subscribe)
+        app.router.add_route("UNSUBSCRIBE", "/AVTransport/event", self._unsubscribe)
+        # One connection per NOTIFY, like most renderers: a kept-alive one would
+        # hold up the shutdown of the subscriber's callback server
+        self._session = aiohttp.ClientSession(connector=aiohttp.TCPConnector(force_close=True))
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self.host, 0)
+        await site.start()
+        self.port = self._runner.addresses[0][1]
+
+    async def stop(self) -> None:
+        """Stop the HTTP server."""
+        if self._runner:
+            await self._runner.cleanup()
+            self._runner = None
+        for task in self._notifications:
+            task.cancel()
+        if self._session:
+            await self._session.close()
+            self._session = None
+
+    @property
+    def location(self) -> str:
+        """URL of the device description."""
+        return f"http://{self.host}:{self.port}/description.xml"
+
+    @property
+    def device(self) -> DLNADevice:
+        """The renderer as returned by discovery."""
+        return DLNADevice(name=self.name, model_name="FakeRenderer", location=self.location, udn=self.udn)
+
+    def description_xml(self) -> str:
+        """Device description document."""
+        return (
+            '<?xml version="1.0"?>'
+            '<root xmlns="urn:schemas-upnp-org:device-1-0">'
+            "<specVersion><major>1</major><minor>0</minor></specVersion>"
+            "<device>"
+            f"<deviceType>{MEDIA_RENDERER_DEVICE_TYPE}</deviceType>"
+            f"<friendlyName>{escape(self.name)}</friendlyName>"
+            "<manufacturer>dlna</manufacturer>"
+            "<modelName>FakeRenderer</modelName>"
+            f"<UDN>{self.udn}</UDN>"
+            "<serviceList><service>"
+            f"<serviceType>{AVTRANSPORT_SERVICE_TYPE}</serviceType>"
+            "<serviceId>urn:upnp-org:serviceId:AVTransport</serviceId>"
+            "<SCPDURL>/AVTransport.xml</SCPDURL>"
+            "<controlURL>/AVTransport/control</controlURL>"
+            "<eventSubURL>/AVTransport/event</eventSubURL>"
+            "</service><service>"
+            f"<serviceType>{CONNECTION_MANAGER_SERVICE_TYPE}</serviceType>"
+            "<serviceId>urn:upnp-org:serviceId:ConnectionManager</serviceId>"
+            "<SCPDURL>/ConnectionManager.xml</SCPDURL>"
+            "<controlURL>/ConnectionManager/control</controlURL>"
+            "<eventSubURL>/ConnectionManager/event</eventSubURL>"
+            "</service></serviceList>"
+            "</device>"
+            "</root>"
+        )
+
+    async def _delay(self, request: web.Request) -> None:
+        self.hits[request.path] = self.hits.get(request.path, 0) + 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+    async def _description(self, request: web.Request) -> web.Response:
+        await self._delay(request)
+        return web.Response(text=self.description_xml(), content_type="text/xml")
+
+    async def _scpd(self, request: web.Request) -> web.Response:
+        await self._delay(request)
+        return web.Response(text=SCPD_XML, content_type="text/xml")
+
+    async def _cm_scpd(self, request: web.Request) -> web.Response:
+        await self._delay(request)
+        return web.Response(text=CM_SCPD_XML, content_type="text/xml")
+
+    async def _control(self, request: web.Request) -> web.Response:
+        await self._delay(request)
+        service_type, actions = _SERVICES[request.path]
+        try:
+            name, args = parse_soap(await request.read())
+            if name not in actions:
+                raise ActionError(401, "Invalid Action")
+        except ActionError as e:
+            return self._fault(e)
+
+        self.actions.append(name)
+        if self.action_latency.get(name):
+            await asyncio.sleep(self.action_latency[name])
+        self._advance()
+        state = self.state
+        try:
+            out = self._handle(name, args)
+        except ActionError as e:
+            return self._fault(e)
+        if self.state != state:
+            for sid in self.subscriptions:
+                self._notify(sid)
+
+        return web.Response(body=soap_response(service_type, name, out), content_type="text/xml", charset="utf-8")
+
+    async def _subscribe(self, request: web.Request) -> web.Response:
+        """GENA SUBSCRIBE: a new subscription (CALLBACK) or a renewal (SID)."""
+        await self._delay(request)
+        sid = request.headers.get("SID")
+        if sid:
+            self.gena.append("RENEW")
+            if self.refuse_renewals or sid not in self.subscriptions:
+                return web.Response(status=412)
+        else:
+            self.gena.append("SUBSCRIBE")
+            # CALLBACK: one or more <url>s; the first one is used
+            callback = request.headers.get("CALLBACK", "").split(">")[0].lstrip("<")
+            if not callback:
+                return web.Response(status=412)
+            sid = f"uuid:{uuid.uuid4()}"
+            self.subscriptions[sid] = callback
+            self._event_seq[sid] = 0
+            # Initial event with the current state
+            self._notify(sid)
+        return web.Response(headers={"SID": sid, "TIMEOUT": f"Second-{self.event_timeout}"})
+
+    async def _unsubscribe(self, request: web.Request) -> web.Response:
+        await self._delay(request)
+        self.gena.append("UNSUBSCRIBE")
+        if self.subscriptions.pop(request.headers.get("SID", ""), None) is None:
+            return web.Response(status=412)
+        return web.Response()
+
+    def _notify(self, sid: str) -> None:
+        """Send a LastChange event with the TransportState to a subscriber, in the background."""
+        last_change = (
+            f'<Event xmlns="{AVT_EVENT_NS}"><InstanceID val="0">'
+            f'<TransportState val="{self.state}"/></InstanceID></Event>'
+        )
+        body = (
+            '<?xml version="1.0"?>'
+            '<e:propertyset xmlns:e="urn:schemas-upnp-org:event-1-0">'
+            f"<e:property><LastChange>{escape(last_change)}</LastChange></e:property>"
+            "</e:propertyset>"
+        )
+        headers = {
+            "CONTENT-TYPE": 'text/xml; charset="utf-8"',
+            "NT": "upnp:event",
+            "NTS": "upnp:propchange",
+            "SID": sid,
+            "SEQ": str(self._event_seq[sid]),
+        }
+        self._event_seq[sid] += 1
+
+        async def send():
+            try:
+                async with self._session.request("NOTIFY", self.subscriptions[sid], headers=headers, data=body):
+                    pass
+            except (aiohttp.ClientError, KeyError):
+                # Subscriber gone
+                pass
+
+        task = asyncio.create_task(send())
+        self._notifications.add(task)
+        task.add_done_callback(self._notifications.discard)
+
+    def _fault(self, error: ActionError) -> web.Response:
+        return web.Response(status=500, body=soap_fault(error), content_type="text/xml", charset="utf-8")
+
+    def _position(self) -> float:
+        return time.monotonic() - self._track_started if self.state == "PLAYING" else 0.0
+
+    def _advance(self) -> None:
+        """Let simulated time pass: end the track, or move on to the next URI."""
+        if self.state != "PLAYING" or self.track_duration is None:
+            return
+        if self._position() < self.track_duration:
+            return
+        if self.next_uri:
+            self.uri, self.metadata = self.next_uri, self.next_metadata
+            self.next_uri, self.next_metadata = "", ""
+            self._track_started = time.monotonic()
+        else:
+            self.state = "STOPPED"
+
+    def _handle(self, name: str, args: dict[str, str]) -> dict:
+        """Apply an action to the transport state. Raises ActionError."""
+        if name == "SetAVTransportURI":
+            self.uri, self.metadata = args.get("CurrentURI", ""), args.get("CurrentURIMetaData", "")
+            self.next_uri, self.next_metadata = "", ""
+            self.state = "STOPPED"
+        elif name == "SetNextAVTransportURI":
+            self.next_uri, self.next_metadata = args.get("NextURI", ""), args.get("NextURIMetaData", "")
+        elif name == "Play":
+            if not self.uri:
+                raise ActionError(701, "Transition not available")
+            if self.state != "PLAYING":
+                self._track_started = time.monotonic()
+            self.state = "PLAYING"
+        elif name == "Pause":
+            if self.state != "PLAYING":
+                raise ActionError(701, "Transition not available")
+            self.state = "PAUSED_PLAYBACK"
+        elif name == "Stop":
+            if self.state == "NO_MEDIA_PRESENT":
+                raise ActionError(701, "Transition not available")
+            self.state = "STOPPED"
+        elif name == "GetTransportInfo":
+            return {
+                "CurrentTransportState": self.state,
+                "CurrentTransportStatus": "OK",
+                "CurrentSpeed": "1",
+            }
+        elif name == "GetPositionInfo":
+            position = _format_time(self._position())
+            duration = _format_time(self.track_duration) if self.track_duration else "0:00:00"
+            return {
+                "Track": 1 if self.uri else 0,
+                "TrackDuration": duration,
+                "TrackMetaData": self.metadata,
+                "TrackURI": self.uri,
+                "RelTime": position,
+                "AbsTime": position,
+                "RelCount": 2147483647,
+                "AbsCount": 2147483647,
+            }
+        elif name == "GetProtocolInfo":
+            return {"Source": "", "Sink": ",".join(self.sink_protocols)}
+        elif name == "GetMediaInfo":
+            return {
+                "NrTracks": 1 if self.uri else 0,
+                "MediaDuration": "0:00:00",
+                "CurrentURI": self.uri,
+                "CurrentURIMetaData": self.metadata,
+                "NextURI": self.next_uri,
+                "NextURIMetaData": self.next_metadata,
+                "PlayMedium": "NETWORK",
+                "RecordMedium": "NOT_IMPLEMENTED",
+                "WriteStatus": "NOT_IMPLEMENTED",
+            }
+        return {}
+
+
+class SsdpResponder:
+    """Answers unicast M-SEARCH requests on behalf of fake renderers.
+
+    Args:
+        renderers: Renderers to announce (started, so their ports are known)
+        host: Address to listen on
+        delay: Seconds to wait before answering each search
+    """
+
+    def __init__(self, renderers: list[FakeRenderer], host: str = "127.0.0.1", delay: float = 0.0):
+        self.renderers = list(renderers)
+        self.host = host
+        self.delay = delay
+        self.searches = 0  # M-SEARCH requests received
+        self.search_targets: list[str] = []  # ST of each M-SEARCH, in arrival order
+        self._transport: Optional[asyncio.DatagramTransport] = None
+
+    async def __aenter__(self) -> "SsdpResponder":
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.stop()
+
+    async def start(self) -> None:
+        """Start listening."""
+        loop = asyncio.get_running_loop()
+        self._transport, _ = await loop.create_datagram_endpoint(
+            lambda: _SsdpProtocol(self), local_addr=(self.host, 0)
+        )
+
+    async def stop(self) -> None:
+        """Stop listening."""
+        if self._transport:
+            self._transport.close()
+            self._transport = None
+
+    @property
+    def address(self) -> tuple[str, int]:
+        """(host, port) to send M-SEARCH to."""
+        return self._transport.get_extra_info("sockname")[:2]
+
+    def responses(self, search_target: str) -> list[bytes]:
+        """Search responses for a search target, one per matching renderer and target."""
+        if search_target == "ssdp:all":
+            targets = SSDP_TARGETS
+        elif search_target in SSDP_TARGETS:
+            targets = (search_target,)
+        else:
+            targets = ()
+
+        packets = []
+        for renderer in self.renderers:
+            for st in targets:
+                packets.append(
+                    (
+                        "HTTP/1.1 200 OK\r\n"
+                        "CACHE-CONTROL: max-age=1800\r\n"
+                        "EXT:\r\n"
+                        f"LOCATION: {renderer.location}\r\n"
+                        "SERVER: dlna-testing/1.0 UPnP/1.0 FakeRenderer/1.0\r\n"
+                        f"ST: {st}\r\n"
+                        f"USN: {renderer.udn}::{st}\r\n"
+                        "BOOTID.UPNP.ORG: 1\r\n"
+                        "\r\n"
+                    ).encode()
+                )
+        return packets
+
+    async def _answer(self, search_target: str, addr) -> None:
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        if self._transport is None:
+            return
+        for packet in self.responses(search_target):
+            self._transport.sendto(packet, addr)
+
+
+class _SsdpProtocol(asyncio.DatagramProtocol):
+    def __init__(self, responder: SsdpResponder):
+        self.responder = responder
+
+    def datagram_received(self, data: bytes, addr) -> None:
+        lines = data.decode("utf-8", "replace").split("\r\n")
+        if not lines[0].startswith("M-SEARCH"):
+            return
+
+        headers = {}
+        for line in lines[1:]:
+            key, sep, value = line.partition(":")
+            if sep:
+                headers[key.strip().upper()] = value.strip()
+        if headers.get("MAN", "").strip('"') != "ssdp:discover":
+            return
+
+        self.responder.searches += 1
+        self.responder.search_targets.append(headers.get("ST", ""))
+        asyncio.get_running_loop().create_task(self.responder._answer(headers.get("ST", ""), addr))
@@ -0,0 +1,288 @@
+"""Thumbnail and album-art cache for served media.
+
+A thumbnail is made once per file version: a JPEG_TN-sized (160x160)
+picture from a cover image next to the file (cover.jpg, folder.jpg, ...)
+or, with ffmpeg, from the embedded art or a frame of the video. Without
+ffmpeg a cover is only used if it already is a JPEG within 160x160. It is
+stored under .dlna/thumbs/ named by a hash of the file's path, size and
+mtime (and those of its cover), so an edited file or a new cover gets a
+new thumbnail and unchanged ones are a single file read. The cache has a
+size cap and evicts the least recently used thumbnails.
+"""
+
+import hashlib
+import os
+import subprocess
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional
+
+from .config import _get_config_dir
+from .probe import has_ffmpeg
+
+# JPEG_TN: the DLNA thumbnail profile every renderer accepts
+THUMB_SIZE = 160
+
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+# Generous: ffmpeg may have to seek far into a large file on a slow disk
+EXTRACT_TIMEOUT = 30
+
+# Cover images next to media files, in order of preference ({stem} is the file name without extension)
+SIDECAR_NAMES = ("{stem}.jpg", "cover.jpg", "folder.jpg", "front.jpg", "albumart.jpg")
+
+# Without ffmpeg, larger covers are not even read (a 160x160 JPEG is far smaller)
+MAX_SIDECAR_BYTES = 256 * 1024
+
+# Files found to have no picture are retried after this many seconds
+MISSING_TTL = 600
+
+# At most this many files are remembered as having no picture
+MAX_MISSING = 4096
+
+# JPEG start-of-frame markers (they carry the picture size); C4, C8 and CC are other segments
+_JPEG_SOF_MARKERS = frozenset(range(0xC0, 0xD0)) - {0xC4, 0xC8, 0xCC}
+
+
+def _get_thumbs_dir() -> Path:
+    """Get the thumbnail cache directory."""
+    thumbs_dir = _get_config_dir() / "thumbs"
+    thumbs_dir.mkdir(parents=True, exist_ok=True)
+    return thumbs_dir
+
+
+def thumbnail_key(path: Path, size: int, mtime: float, cover: Optional[Path] = None, cover_mtime: float = 0.0) -> str:
+    """Cache key of one version of a file and its cover image."""
+    return hashlib.sha256(f"{path}\0{size}\0{mtime}\0{cover or ''}\0{cover_mtime}".encode()).hexdigest()[:32]
+
+
+@dataclass
+class Thumbnail:
+    """A cached thumbnail."""
+
+    path: Path
+    key: str
+    modified: float  # newest mtime of the media file and its cover
+
+
+def _sidecar(path: Path) -> Optional[Path]:
+    """Cover image stored next to a media file."""
+    for name in SIDECAR_NAMES:
+        candidate = path.with_name(name.format(stem=path.stem))
+        if candidate != path and candidate.is_file():
+            return candidate
+    return None
+
+
+def jpeg_size(data: bytes) -> Optional[tuple[int, int]]:
+    """(width, height) of JPEG data, or None if it is not a JPEG."""
+    if not data.startswith(b"\xff\xd8"):
+        return None
+    i = 2
+    while i + 4 <= len(data):
+        if data[i] != 0xFF:
+            return None
+        marker = data[i + 1]
+        if marker == 0xFF:
+            # Fill byte
+            i += 1
+            continue
+        if marker == 0x01 or 0xD0 <= marker <= 0xD8:
+            # Markers without a length
+            i += 2
+            continue
+        if marker in _JPEG_SOF_MARKERS and i + 9 <= len(data):
+            height = int.from_bytes(data[i + 5:i + 7], "big")
+            width = int.from_bytes(data[i + 7:i + 9], "big")
+            return width, height
+        i += 2 + int.from_bytes(data[i + 2:i + 4], "big")
+    return None
+
+
+def _small_jpeg(path: Path) -> Optional[bytes]:
+    """An image file's data if it can be served as JPEG_TN unchanged."""
+    try:
+        if path.stat().st_size > MAX_SIDECAR_BYTES:
+            return None
+        data = path.read_bytes()
+    except OSError:
+        return None
+    size = jpeg_size(data)
+    if size is None or max(size) > THUMB_SIZE:
+        return None
+    return data
+
+
+def _ffmpeg_thumbnail(source: Path, seek: float = 0.0) -> Optional[bytes]:
+    """First picture of a file (embedded art, video frame or image), scaled down as JPEG."""
+    scale = (
+        f"scale='min({THUMB_SIZE},iw)':'min({THUMB_SIZE},ih)'"
+        ":force_original_aspect_ratio=decrease"
+    )
+    args = ["ffmpeg", "-v", "error", "-nostdin"]
+    if seek:
+        args += ["-ss", f"{seek:.3f}"]
+    args += ["-i", str(source), "-map", "0:v:0", "-frames:v", "1", "-vf", scale, "-f", "mjpeg", "-"]
+    try:
+        result = subprocess.run(args, capture_output=True, timeout=EXTRACT_TIMEOUT, check=True)
+    except (subprocess.SubprocessError, OSError):
+        return None
+    return result.stdout or None
+
+
+def extract_thumbnail(path: Path, mime_type: str, duration: Optional[float] = None) -> Optional[bytes]:
+    """Make a thumbnail for a media file.
+
+    Args:
+        path: Media file
+        mime_type: Its MIME type
+        duration: Its duration in seconds, if known (videos are captured at 10%)
+
+    Returns:
+        JPEG data, or None if the file has no picture (or ffmpeg is missing)
+    """
+    kind = mime_type.split("/")[0]
+    sidecar = _sidecar(path) if kind in ("audio", "video") else None
+    if sidecar is not None and not has_ffmpeg():
+        return _small_jpeg(sidecar)
+    if not has_ffmpeg():
+        return None
+    if sidecar is not None:
+        # Scaled and converted to JPEG even when small: JPEG_TN is at most 160x160
+        data = _ffmpeg_thumbnail(sidecar)
+        if data:
+            return data
+
+    if kind == "video":
+        # Skip black intro frames; embedded cover art comes first anyway when present
+        data = _ffmpeg_thumbnail(path, seek=(duration or 0) * 0.1)
+        return data or _ffmpeg_thumbnail(path)
+    if kind in ("audio", "image"):
+        return _ffmpeg_thumbnail(path)
+    return None
+
+
+class ThumbnailCache:
+    """Content-addressed, size-capped thumbnail store with LRU eviction.
+
+    Safe to share between the threads of MediaServer: a file being
+    extracted only holds up requests for the same thumbnail.
+
+    Args:
+        directory: Where thumbnails are kept (default .dlna/thumbs)
+        max_bytes: Size cap of the cache
+    """
+
+    def __init__(self, directory: Optional[Path] = None, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.directory = directory or _get_thumbs_dir()
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        # Guards _locks, _missing and eviction
+        self._lock = threading.Lock()
+        # One lock per thumbnail being made
+        self._locks: dict[str, threading.Lock] = {}
+        # Keys of files without a picture -> when that was found, so they are not extracted again soon
+        self._missing: OrderedDict[str, float] = OrderedDict()
+
+    def get(self, path: Path, mime_type: str, duration: Optional[float] = None) -> Optional[Thumbnail]:
+        """Get the thumbnail of a file, making it on first use.
+
+        Args:
+            path: Media file
+            mime_type: Its MIME type
+            duration: Its duration in seconds, if known
+
+        Returns:
+            The thumbnail, or None if the file has no picture
+        """
+        try:
+            st = path.stat()
+        except OSError:
+            return None
+        cover = _sidecar(path) if mime_type.split("/")[0] in ("audio", "video") else None
+        cover_mtime = 0.0
+        if cover is not None:
+            try:
+                cover_mtime = cover.stat().st_mtime
+            except OSError:
+                cover = None
+        key = thumbnail_key(path.resolve(), st.st_size, st.st_mtime, cover, cover_mtime)
+        thumb = self.directory / f"{key}.jpg"
+        thumbnail = Thumbnail(thumb, key, max(st.st_mtime, cover_mtime))
+
+        if self._touch(thumb):
+            return thumbnail
+        if self._known_missing(key):
+            return None
+
+        with self._lock:
+            lock = self._locks.setdefault(key, threading.Lock())
+        try:
+            with lock:
+                # Another thread may have made it while we waited
+                if self._touch(thumb):
+                    return thumbnail
+                if self._known_missing(key):
+                    return None
+                data = extract_thumbnail(path, mime_type, duration)
+                if not data:
+                    with self._lock:
+                        self._missing[key] = time.monotonic()
+                        while len(self._missing) > MAX_MISSING:
+                            self._missing.popitem(last=False)
+                    return None
+                partial = thumb.with_suffix(f".{threading.get_ident()}.tmp")
+                partial.write_bytes(data)
+                os.replace(partial, thumb)
+        finally:
+            with self._lock:
+                self._locks.pop(key, None)
+
+        with self._lock:
+            self._evict(keep=thumb)
+        return thumbnail
+
+    def _known_missing(self, key: str) -> bool:
+        """Whether a file was recently found to have no picture."""
+        with self._lock:
+            found = self._missing.get(key)
+            if found is None:
+                return False
+            if time.monotonic() - found < MISSING_TTL:
+                return True
+            del self._missing[key]
+            return False
+
+    @staticmethod
+    def _touch(thumb: Path) -> bool:
+        """Mark a thumbnail as recently used. Returns whether it exists."""
+        try:
+            os.utime(thumb)
+        except OSError:
+            return False
+        return True
+
+    def _evict(self, keep: Path) -> None:
+        """Delete least recently used thumbnails until the cache fits its cap."""
+        entries = []
+        total = 0
+        with os.scandir(self.directory) as it:
+            for entry in it:
+                if entry.name.endswith(".jpg"):
+                    st = entry.stat()
+                    entries.append((st.st_mtime, st.st_size, entry.path))
+                    total += st.st_size
+
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            if path == str(keep):
+                continue
+            try:
+                os.unlink(path)
+            except OSError:
+                continue
+            total -= size
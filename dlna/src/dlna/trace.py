@@ -0,0 +1,155 @@
+"""Opt-in timing spans for discovery and control.
+
+Enable with `dlna --trace` or DLNA_TRACE=1. While a Tracer is active,
+`span(name, **attrs)` records how long a block took and which span it ran
+inside (the parent follows asyncio tasks through a ContextVar). When no
+tracer is active, span() costs one global lookup.
+
+Usage:
+    tracer = start_tracing()
+    ...
+    stop_tracing()
+    print(tracer.to_json())
+"""
+
+import json
+import os
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import asdict, dataclass, field
+from typing import Iterator, Optional
+
+# Set to 1 to trace every command; DLNA_TRACE_FILE writes the spans to a file
+TRACE_ENV = "DLNA_TRACE"
+TRACE_FILE_ENV = "DLNA_TRACE_FILE"
+
+
+@dataclass
+class Span:
+    """A timed block. Times are in seconds since the tracer started."""
+
+    id: int
+    name: str
+    start: float
+    duration: float = 0.0
+    parent: Optional[int] = None
+    attrs: dict = field(default_factory=dict)
+    error: Optional[str] = None
+
+
+class Tracer:
+    """Collects spans."""
+
+    def __init__(self):
+        self.spans: list[Span] = []
+        self._origin = time.perf_counter()
+
+    def now(self) -> float:
+        """Seconds since the tracer started."""
+        return time.perf_counter() - self._origin
+
+    def totals(self) -> dict[str, tuple[int, float]]:
+        """Number of spans and total duration per span name."""
+        totals: dict[str, tuple[int, float]] = {}
+        for s in self.spans:
+            count, total = totals.get(s.name, (0, 0.0))
+            totals[s.name] = (count + 1, total + s.duration)
+        return totals
+
+    def to_json(self) -> str:
+        """All spans, in start order, as a JSON array."""
+        spans = sorted(self.spans, key=lambda s: s.start)
+        return json.dumps([asdict(s) for s in spans], indent=2, ensure_ascii=False)
+
+    def format_tree(self) -> str:
+        """Spans as an indented tree with durations in milliseconds."""
+        children: dict[Optional[int], list[Span]] = {}
+        for s in sorted(self.spans, key=lambda s: s.start):
+            children.setdefault(s.parent, []).append(s)
+
+        lines = []
+
+        def walk(parent: Optional[int], depth: int) -> None:
+            for s in children.get(parent, []):
+                attrs = " ".join(f"{k}={v}" for k, v in s.attrs.items())
+                error = f" ERROR: {s.error}" if s.error else ""
+                lines.append(
+                    f"{s.start * 1000:8.1f} {s.duration * 1000:8.1f} ms  "
+                    f"{'  ' * depth}{s.name} {attrs}{error}".rstrip()
+                )
+                walk(s.id, depth + 1)
+
+        walk(None, 0)
+        return "\n".join(lines)
+
+
+_tracer: Optional[Tracer] = None
+_current: ContextVar[Optional[int]] = ContextVar("dlna_trace_span", default=None)
+
+
+def start_tracing() -> Tracer:
+    """Start collecting spans (replacing any active tracer)."""
+    global _tracer
+    _tracer = Tracer()
+    return _tracer
+
+
+def stop_tracing() -> Optional[Tracer]:
+    """Stop collecting spans. Returns the tracer that was active."""
+    global _tracer
+    tracer, _tracer = _tracer, None
+    return tracer
+
+
+def tracing_from_env() -> bool:
+    """Whether DLNA_TRACE or DLNA_TRACE_FILE asks for tracing."""
+    return os.environ.get(TRACE_ENV, "") not in ("", "0") or bool(os.environ.get(TRACE_FILE_ENV))
+
+
+@contextmanager
+def span(name: str, **attrs) -> Iterator[Optional[Span]]:
+    """Time a block as a span (a no-op unless tracing is active).
+
+    Yields the Span, or None when not tracing, so callers can add
+    attributes found inside the block.
+    """
+    tracer = _tracer
+    if tracer is None:
+        yield None
+        return
+
+    s = Span(id=len(tracer.spans), name=name, start=tracer.now(), parent=_current.get(), attrs=attrs)
+    tracer.spans.append(s)
+    token = _current.set(s.id)
+    try:
+        yield s
+    except BaseException as e:
+        s.error = str(e) or type(e).__name__
+        raise
+    finally:
+        s.duration = tracer.now() - s.start
+        _current.reset(token)
+
+
+def record(name: str, start: float, **attrs) -> None:
+    """Record a span that has already ended (start from Tracer.now())."""
+    tracer = _tracer
+    if tracer is None:
+        return
+    tracer.spans.append(
+        Span(
+            id=len(tracer.spans),
+            name=name,
+            start=start,
+            duration=tracer.now() - start,
+            parent=_current.get(),
+            attrs=attrs,
+        )
+    )
+
+
+def now() -> Optional[float]:
+    """Current tracer time, or None when not tracing."""
+    tracer = _tracer
+    return tracer.now() if tracer else None
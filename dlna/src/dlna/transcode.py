@@ -0,0 +1,206 @@
+"""Stream format selection for renderers that cannot play a file as is.
+
+A renderer lists what it plays in its ConnectionManager sink protocols
+(player.get_sink_protocols). plan_stream compares a probed file with that
+list and picks the cheapest way to play it:
+
+- direct: serve the file unchanged
+- remux: copy the streams into a container the renderer takes (e.g. MKV
+  with H.264/AAC -> MPEG-TS); costs almost no CPU
+- transcode: re-encode what the renderer cannot decode (e.g. HEVC video or
+  DTS audio), copying the rest
+
+Remuxed and transcoded streams come from an ffmpeg pipe (MediaServer
+serves them under STREAMS_PREFIX). They have no known length, so they are
+offered without byte seeking.
+"""
+
+import subprocess
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from .didl import DLNA_FEATURES, DLNA_STREAM_FEATURES
+from .probe import MediaInfo, has_ffmpeg
+
+# Codecs nearly every renderer decodes in any container it accepts
+COMMON_VIDEO_CODECS = frozenset({"h264", "mpeg2video", "mpeg1video", "mpeg4"})
+COMMON_AUDIO_CODECS = frozenset({"aac", "mp3", "ac3", "mp2"})
+
+# Sink protocol fragments that mean HEVC decoding (MIME types or DLNA profiles)
+_HEVC_MARKERS = ("hevc", "h265", "video/h265")
+
+# Containers to stream video in, by preference: (MIME types that mean it, ffmpeg args, MIME type, extension)
+_VIDEO_CONTAINERS = (
+    (("video/mp2t", "video/vnd.dlna.mpeg-tts", "video/mpeg"), ["-f", "mpegts"], "video/mp2t", ".ts"),
+    (("video/mp4",), ["-f", "mp4", "-movflags", "frag_keyframe+empty_moov"], "video/mp4", ".mp4"),
+    (("video/x-matroska", "video/x-mkv"), ["-f", "matroska"], "video/x-matroska", ".mkv"),
+)
+
+# Audio formats, by preference: (MIME types, codec that can be copied, encoder args, MIME type, extension)
+_AUDIO_FORMATS = (
+    (("audio/mpeg", "audio/mp3"), "mp3", ["-c:a", "libmp3lame", "-b:a", "320k", "-f", "mp3"], "audio/mpeg", ".mp3"),
+    (("audio/aac", "audio/x-aac", "audio/vnd.dlna.adts"), "aac", ["-c:a", "aac", "-b:a", "256k", "-f", "adts"], "audio/aac", ".aac"),
+    (("audio/wav", "audio/x-wav", "audio/wave"), None, ["-c:a", "pcm_s16le", "-f", "wav"], "audio/wav", ".wav"),
+)
+
+# How long ffmpeg may take to exit after the client went away
+STOP_TIMEOUT = 5
+
+
+@dataclass
+class StreamPlan:
+    """How to get a file to a renderer."""
+
+    mode: str  # "direct", "remux" or "transcode"
+    mime_type: str
+    extension: str = ""
+    args: list[str] = field(default_factory=list)  # ffmpeg output arguments
+    reason: str = ""
+
+    @property
+    def direct(self) -> bool:
+        return self.mode == "direct"
+
+
+def sink_mime_types(sink: list[str]) -> set[str]:
+    """MIME types in http-get sink protocolInfo entries (lowercase)."""
+    types = set()
+    for entry in sink:
+        parts = entry.split(":", 3)
+        if len(parts) >= 3 and parts[0] in ("http-get", "*"):
+            types.add(parts[2].strip().lower())
+    return types
+
+
+def accepts(sink: list[str], mime_type: str) -> bool:
+    """Whether a renderer takes a MIME type. An empty sink list accepts anything."""
+    if not sink:
+        return True
+    types = sink_mime_types(sink)
+    return "*" in types or f"{mime_type.split('/')[0]}/*" in types or mime_type.lower() in types
+
+
+def _video_codec_ok(codec: str, sink: list[str]) -> bool:
+    if not codec or codec in COMMON_VIDEO_CODECS:
+        return True
+    if codec == "hevc":
+        return any(marker in entry.lower() for entry in sink for marker in _HEVC_MARKERS)
+    return False
+
+
+def _audio_codec_ok(codec: str) -> bool:
+    return not codec or codec in COMMON_AUDIO_CODECS
+
+
+def plan_stream(info: MediaInfo, sink: list[str]) -> StreamPlan:
+    """Pick the cheapest way to play a file on a renderer.
+
+    Codecs only count when ffprobe reported them; without them the file is
+    judged by its MIME type.
+
+    Args:
+        info: Probed file (probe.probe)
+        sink: Renderer sink protocols (player.get_sink_protocols)
+
+    Returns:
+        A direct plan if the file plays as is, or cannot be helped (no
+        ffmpeg, no format the renderer takes); otherwise a remux or
+        transcode plan
+    """
+    kind = info.mime_type.split("/")[0]
+    direct = StreamPlan("direct", info.mime_type)
+    if kind not in ("video", "audio") or not sink:
+        return direct
+
+    if kind == "video":
+        video_ok = _video_codec_ok(info.video_codec, sink)
+        audio_ok = _audio_codec_ok(info.audio_codec)
+        if accepts(sink, info.mime_type) and video_ok and audio_ok:
+            return direct
+        if not has_ffmpeg():
+            direct.reason = "ffmpeg not installed"
+            return direct
+
+        for mime_types, container_args, mime_type, extension in _VIDEO_CONTAINERS:
+            if any(accepts(sink, t) for t in mime_types):
+                break
+        else:
+            direct.reason = "the renderer lists no video container ffmpeg can stream"
+            return direct
+
+        video_args = ["-c:v", "copy"] if video_ok else [
+            "-c:v", "libx264", "-preset", "veryfast", "-crf", "21", "-pix_fmt", "yuv420p",
+        ]
+        audio_args = ["-c:a", "copy"] if audio_ok else ["-c:a", "aac", "-b:a", "192k", "-ac", "2"]
+        mode = "remux" if video_ok and audio_ok else "transcode"
+        if video_ok and audio_ok:
+            reason = f"{info.mime_type} is not accepted"
+        else:
+            codecs = [c for c, ok in ((info.video_codec, video_ok), (info.audio_codec, audio_ok)) if not ok]
+            reason = f"{'/'.join(codecs)} is not decoded"
+        args = ["-map", "0:v:0", "-map", "0:a:0?", *video_args, *audio_args, *container_args]
+        return StreamPlan(mode, mime_type, extension, args, reason)
+
+    if accepts(sink, info.mime_type):
+        return direct
+    if not has_ffmpeg():
+        direct.reason = "ffmpeg not installed"
+        return direct
+
+    for mime_types, copy_codec, encode_args, mime_type, extension in _AUDIO_FORMATS:
+        if not any(accepts(sink, t) for t in mime_types):
+            continue
+        if copy_codec and info.audio_codec == copy_codec:
+            args = ["-map", "0:a:0", "-c:a", "copy", *encode_args[-2:]]
+            return StreamPlan("remux", mime_type, extension, args, f"{info.mime_type} is not accepted")
+        args = ["-map", "0:a:0", *encode_args]
+        return StreamPlan("transcode", mime_type, extension, args, f"{info.mime_type} is not accepted")
+
+    direct.reason = "the renderer lists no audio format ffmpeg can stream"
+    return direct
+
+
+class FFmpegStream:
+    """A running ffmpeg writing a converted file to a pipe.
+
+    Has the read()/close() interface of a file, so MediaServer can copy it
+    to the client; closing (or the client going away) stops ffmpeg.
+    """
+
+    def __init__(self, source: Path, plan: StreamPlan):
+        self.process = subprocess.Popen(
+            ["ffmpeg", "-v", "error", "-nostdin", "-i", str(source), *plan.args, "pipe:1"],
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+        )
+
+    def read(self, size: int = -1) -> bytes:
+        return self.process.stdout.read(size)
+
+    def close(self) -> None:
+        if self.process.poll() is None:
+            self.process.kill()
+        self.process.stdout.close()
+        try:
+            self.process.wait(timeout=STOP_TIMEOUT)
+        except subprocess.TimeoutExpired:
+            pass
+
+
+def stream_info(info: MediaInfo, plan: StreamPlan) -> MediaInfo:
+    """MediaInfo describing a planned stream (for its DIDL-Lite metadata)."""
+    if plan.direct:
+        return info
+    return MediaInfo(
+        mime_type=plan.mime_type,
+        size=0,
+        duration=info.duration,
+        width=info.width,
+        height=info.height,
+    )
+
+
+def stream_features(plan: StreamPlan) -> str:
+    """protocolInfo features for a planned stream."""
+    return DLNA_FEATURES if plan.direct else DLNA_STREAM_FEATURES
@@ -0,0 +1,206 @@
+"""Passive renderer tracking from SSDP advertisements.
+
+`dlna watch` listens for ssdp:alive / ssdp:update / ssdp:byebye NOTIFY
+messages, keeps a table of live renderers (expiring entries after their
+announced max-age) and serves it on .dlna/watch.sock, so find_device can
+answer without any network traffic.
+"""
+
+import asyncio
+import re
+import time
+from contextlib import aclosing
+from dataclasses import asdict
+from typing import Callable, Optional
+
+from . import ipc
+from .cache import match_device
+from .player import (
+    DLNAClient,
+    DLNADevice,
+    _create_dlna_device,
+    is_renderer_target,
+    iter_devices,
+)
+
+# Used when an advertisement has no usable CACHE-CONTROL, and for search results
+DEFAULT_MAX_AGE = 1800
+
+_MAX_AGE_RE = re.compile(r"max-age\s*=\s*(\d+)", re.IGNORECASE)
+
+
+def parse_max_age(cache_control: str) -> int:
+    """Extract max-age from a CACHE-CONTROL header."""
+    match = _MAX_AGE_RE.search(cache_control or "")
+    return int(match.group(1)) if match else DEFAULT_MAX_AGE
+
+
+class RendererTable:
+    """Live renderers keyed by UDN, each expiring after its max-age."""
+
+    def __init__(self):
+        self._entries: dict[str, tuple[DLNADevice, float]] = {}
+
+    def update(self, device: DLNADevice, max_age: int = DEFAULT_MAX_AGE) -> None:
+        """Add a renderer or extend its lifetime."""
+        self._entries[device.udn] = (device, time.monotonic() + max_age)
+
+    def refresh(self, udn: str, max_age: int = DEFAULT_MAX_AGE) -> None:
+        """Extend the lifetime of a known renderer."""
+        if udn in self._entries:
+            self.update(self._entries[udn][0], max_age)
+
+    def remove(self, udn: str) -> Optional[DLNADevice]:
+        """Drop a renderer, returning it if it was known."""
+        entry = self._entries.pop(udn, None)
+        return entry[0] if entry else None
+
+    def get(self, udn: str) -> Optional[DLNADevice]:
+        """Get a live renderer by UDN."""
+        self._expire()
+        entry = self._entries.get(udn)
+        return entry[0] if entry else None
+
+    def devices(self) -> list[DLNADevice]:
+        """All live renderers."""
+        self._expire()
+        return [device for device, _ in self._entries.values()]
+
+    def find(self, name: str) -> Optional[DLNADevice]:
+        """Find a live renderer by name (exact, then partial match)."""
+        return match_device(self.devices(), name)
+
+    def _expire(self) -> None:
+        now = time.monotonic()
+        for udn in [udn for udn, (_, expires) in self._entries.items() if expires < now]:
+            del self._entries[udn]
+
+
+class Watcher:
+    """Keeps a RendererTable current from SSDP advertisements.
+
+    on_change, if given, is called with ("alive" | "byebye", device) whenever
+    a renderer appears or leaves.
+    """
+
+    def __init__(
+        self,
+        client: DLNAClient,
+        on_change: Optional[Callable[[str, DLNADevice], None]] = None,
+    ):
+        self.client = client
+        self.table = RendererTable()
+        self.on_change = on_change
+        self._listener = None
+        self._fetching: set[str] = set()
+
+    async def start(self, sweep_timeout: int = 3) -> None:
+        """Start listening, then fill the table with one active search.
+
+        Renderers re-announce themselves only every few minutes, so the
+        initial search covers devices that are already up.
+        """
+        from async_upnp_client.advertisement import SsdpAdvertisementListener
+
+        self._listener = SsdpAdvertisementListener(
+            async_on_alive=self._on_alive,
+            async_on_update=self._on_alive,
+            async_on_byebye=self._on_byebye,
+        )
+        await self._listener.async_start()
+
+        stream = iter_devices(timeout=sweep_timeout, client=self.client)
+        async with aclosing(stream):
+            async for device in stream:
+                self._add(device, DEFAULT_MAX_AGE)
+
+    async def stop(self) -> None:
+        """Stop listening."""
+        if self._listener:
+            await self._listener.async_stop()
+            self._listener = None
+
+    async def handle(self, message: dict) -> dict:
+        """Answer an IPC request."""
+        op = message.get("op")
+        if op == "devices":
+            return {"ok": True, "devices": [asdict(d) for d in self.table.devices()]}
+        if op == "find":
+            device = self.table.find(message.get("name", ""))
+            return {"ok": True, "device": asdict(device) if device else None}
+        return {"ok": False, "error": f"Unknown op: {op}"}
+
+    def _add(self, device: DLNADevice, max_age: int) -> None:
+        is_new = self.table.get(device.udn) is None
+        self.table.update(device, max_age)
+        if is_new and self.on_change:
+            self.on_change("alive", device)
+
+    async def _on_alive(self, headers) -> None:
+        """Handle ssdp:alive and ssdp:update."""
+        if not is_renderer_target(headers.get("NT", "")):
+            return
+
+        location = headers.get("LOCATION", "")
+        udn = headers.get("USN", "").split("::")[0]
+        boot_id = headers.get("BOOTID.UPNP.ORG", "")
+        max_age = parse_max_age(headers.get("CACHE-CONTROL", ""))
+
+        known = self.table.get(udn)
+        if known and known.location == location and known.boot_id == boot_id:
+            self.table.refresh(udn, max_age)
+            return
+
+        # New, moved or rebooted renderer: (re)read its description once
+        if not location or location in self._fetching:
+            return
+        self._fetching.add(location)
+        try:
+            device = await _create_dlna_device(
+                self.client,
+                location,
+                udn=udn,
+                boot_id=boot_id,
+                config_id=headers.get("CONFIGID.UPNP.ORG", ""),
+            )
+        except Exception:
+            return
+        finally:
+            self._fetching.discard(location)
+
+        if device:
+            self._add(device, max_age)
+
+    async def _on_byebye(self, headers) -> None:
+        """Handle ssdp:byebye."""
+        udn = headers.get("USN", "").split("::")[0]
+        device = self.table.remove(udn)
+        if device and self.on_change:
+            self.on_change("byebye", device)
+
+
+async def run_watcher(on_change: Optional[Callable[[str, DLNADevice], None]] = None) -> None:
+    """Run the watcher and its socket until cancelled."""
+    socket_path = ipc._get_watch_socket_path()
+    async with DLNAClient() as client:
+        watcher = Watcher(client, on_change=on_change)
+        server = await ipc.serve(socket_path, watcher.handle)
+        try:
+            await watcher.start()
+            await asyncio.Event().wait()
+        finally:
+            server.close()
+            await watcher.stop()
+            socket_path.unlink(missing_ok=True)
+
+
+async def query_watcher(name: str) -> Optional[DLNADevice]:
+    """Ask a running watcher for a renderer by name.
+
+    Returns:
+        DLNADevice if a watcher is running and knows the device, None otherwise
+    """
+    response = await ipc.request(ipc._get_watch_socket_path(), {"op": "find", "name": name}, timeout=0.5)
+    if not response or not response.get("device"):
+        return None
+    return DLNADevice(**response["device"])
@@ -0,0 +1,12 @@
+"""Shared pytest fixtures for dlna tests."""
+
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def config_dir(tmp_path, monkeypatch):
+    """Keep .dlna state out of the skill directory during tests."""
+    import dlna.config
+
+    monkeypatch.setattr(dlna.config, "_get_skill_dir", lambda: tmp_path)
+    return tmp_path / ".dlna"
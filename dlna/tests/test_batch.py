@@ -0,0 +1,46 @@
+"""Tests for batch mode."""
+
+import pytest
+
+from dlna.batch import parse_operations, run_batch
+from dlna.cache import remember_devices
+from dlna.player import DLNAClient
+from dlna.testing import FakeRenderer
+
+
+def test_parse_operations():
+    lines = '{"action": "stop", "device": "A"}\n\n{"action": "status"}\n'
+    assert parse_operations(lines) == [{"action": "stop", "device": "A"}, {"action": "status"}]
+    assert parse_operations('[{"action": "status"}]') == [{"action": "status"}]
+    assert parse_operations("  ") == []
+
+    with pytest.raises(ValueError):
+        parse_operations('["status"]')
+    with pytest.raises(ValueError):
+        parse_operations("{not json")
+
+
+@pytest.mark.asyncio
+async def test_run_batch():
+    async with FakeRenderer("Kitchen") as a, FakeRenderer("Bedroom") as b:
+        # Known devices are confirmed at their cached location, without a scan
+        remember_devices([a.device, b.device])
+        operations = [
+            {"action": "play", "device": "Kitchen", "url": "http://10.0.0.2/a.mp3"},
+            {"action": "status", "device": "Kitchen"},
+            {"action": "status", "device": "Bedroom"},
+            {"action": "stop", "device": "Bedroom"},
+            {"action": "pause", "device": "Kitchen"},
+            {"action": "play", "device": "Kitchen"},
+        ]
+
+        async with DLNAClient() as client:
+            results = await run_batch(operations, client)
+
+        assert [result["ok"] for result in results] == [True, True, True, False, False, False]
+        # Operations on one device run in input order
+        assert results[1]["state"] == "PLAYING"
+        assert results[2] == {"action": "status", "device": "Bedroom", "ok": True, "state": "NO_MEDIA_PRESENT"}
+        assert "Unknown action" in results[4]["error"]
+        assert results[5]["error"] == "play needs a url"
+        assert a.uri == "http://10.0.0.2/a.mp3"
@@ -0,0 +1,105 @@
+"""Tests for the persistent device cache."""
+
+import threading
+
+import pytest
+
+from dlna import discover
+from dlna.cache import DeviceCache, _get_cache_file, match_device
+from dlna.player import DLNADevice
+
+
+def _device(name="Living Room TV", udn="uuid:tv", location="http://10.0.0.5:1400/desc.xml"):
+    return DLNADevice(name=name, model_name="Model", location=location, udn=udn)
+
+
+def test_cache_round_trip():
+    cache = DeviceCache()
+    cache.update(_device())
+    cache.save()
+
+    loaded = DeviceCache.load()
+    entry = loaded.devices["uuid:tv"]
+    assert entry.location == "http://10.0.0.5:1400/desc.xml"
+    assert entry.last_seen > 0
+
+
+
+def test_save_never_exposes_a_partial_file():
+    cache = DeviceCache()
+    for n in range(200):
+        cache.update(_device(f"TV {n}", f"uuid:{n}"))
+    cache.save()
+
+    done = threading.Event()
+
+    def writer():
+        while not done.is_set():
+            cache.save()
+
+    thread = threading.Thread(target=writer)
+    thread.start()
+    try:
+        for _ in range(100):
+            assert len(DeviceCache.load().devices) == 200
+    finally:
+        done.set()
+        thread.join()
+
+
+def test_failed_save_keeps_the_previous_file():
+    cache = DeviceCache()
+    cache.update(_device())
+    cache.save()
+
+    cache.devices["uuid:tv"].sink_protocols = [object()]
+    with pytest.raises(TypeError):
+        cache.save()
+    assert DeviceCache.load().devices["uuid:tv"].sink_protocols == []
+    assert [p.name for p in _get_cache_file().parent.iterdir() if p.suffix == ".tmp"] == []
+
+def test_match_device_prefers_exact_name():
+    devices = [_device("TV Kitchen", "uuid:a"), _device("TV", "uuid:b")]
+    assert match_device(devices, "tv").udn == "uuid:b"
+    assert match_device(devices, "kitchen").udn == "uuid:a"
+    assert match_device(devices, "bedroom") is None
+
+
+@pytest.mark.asyncio
+async def test_find_device_uses_cached_location(monkeypatch):
+    cache = DeviceCache()
+    cache.update(_device())
+    cache.save()
+
+    async def fake_fetch(location, **kwargs):
+        return _device(location=location)
+
+    async def fail_discover(**kwargs):
+        raise AssertionError("discovery should be skipped")
+
+    monkeypatch.setattr(discover, "fetch_device", fake_fetch)
+    monkeypatch.setattr(discover, "discover_devices", fail_discover)
+
+    device = await discover.find_device("living room")
+    assert device.udn == "uuid:tv"
+
+
+@pytest.mark.asyncio
+async def test_find_device_rescans_when_cached_location_fails(monkeypatch):
+    cache = DeviceCache()
+    cache.update(_device())
+    cache.save()
+    moved = _device(location="http://10.0.0.9:1400/desc.xml")
+
+    async def fake_fetch(location, **kwargs):
+        return None
+
+    async def fake_discover(**kwargs):
+        return [moved]
+
+    monkeypatch.setattr(discover, "fetch_device", fake_fetch)
+    monkeypatch.setattr(discover, "discover_devices", fake_discover)
+
+    device = await discover.find_device("Living Room TV")
+    assert device is moved
+    assert DeviceCache.load().devices["uuid:tv"].location == moved.location
@@ -0,0 +1,114 @@
+"""Tests for the UPnP MediaServer (ContentDirectory over the media index)."""
+
+import xml.etree.ElementTree as ET
+
+import pytest
+
+from dlna.contentdir import (
+    CONTENT_DIRECTORY_SERVICE_TYPE,
+    DESCRIPTION_PATH,
+    ActionError,
+    SsdpAdvertiser,
+    parse_search_criteria,
+)
+from dlna.library import MediaLibrary
+from dlna.probe import MediaInfo, guess_mime_type
+from dlna.server import MediaServer
+
+DIDL_NS = "{urn:schemas-upnp-org:metadata-1-0/DIDL-Lite/}"
+DC_NS = "{http://purl.org/dc/elements/1.1/}"
+
+
+def test_parse_search_criteria():
+    assert parse_search_criteria("*").media_type is None
+
+    query = parse_search_criteria('(upnp:class derivedfrom "object.item.audioItem" and dc:title contains "Live")')
+    assert (query.media_type, query.title, query.match_nothing) == ("audio", "Live", False)
+
+    assert parse_search_criteria('upnp:class = "object.container.album.musicAlbum"').match_nothing
+    assert parse_search_criteria('upnp:artist contains "x" and @refID exists false').match_nothing
+
+    with pytest.raises(ActionError):
+        parse_search_criteria('dc:title contains "a" or dc:title contains "b"')
+
+
+def _titles(result: str) -> list[str]:
+    root = ET.fromstring(result)
+    return [element.find(f"{DC_NS}title").text for element in root]
+
+
+@pytest.fixture
+def library_server(tmp_path):
+    media = tmp_path / "media"
+    (media / "Music").mkdir(parents=True)
+    for n in range(5):
+        (media / "Music" / f"song {n}.mp3").write_bytes(b"x" * n)
+    (media / "movie.mkv").write_bytes(b"movie")
+
+    library = MediaLibrary(media)
+    library.refresh(lambda path: MediaInfo(mime_type=guess_mime_type(path), size=path.stat().st_size, duration=3.0))
+    server = MediaServer(media, library=library, name="Test Library")
+    port = server.start()
+    yield f"http://127.0.0.1:{port}"
+    server.stop()
+    library.close()
+
+
+@pytest.mark.asyncio
+async def test_browse_and_search(library_server):
+    from async_upnp_client.aiohttp import AiohttpRequester
+    from async_upnp_client.client_factory import UpnpFactory
+    from async_upnp_client.exceptions import UpnpActionResponseError
+
+    device = await UpnpFactory(AiohttpRequester()).async_create_device(library_server + DESCRIPTION_PATH)
+    assert device.friendly_name == "Test Library"
+    browse = device.service(CONTENT_DIRECTORY_SERVICE_TYPE).action("Browse")
+    search = device.service(CONTENT_DIRECTORY_SERVICE_TYPE).action("Search")
+
+    result = await browse.async_call(
+        ObjectID="0", BrowseFlag="BrowseDirectChildren", Filter="*", StartingIndex=0, RequestedCount=0, SortCriteria=""
+    )
+    assert _titles(result["Result"]) == ["Music", "movie"]
+    assert ET.fromstring(result["Result"])[0].get("childCount") == "5"
+
+    # Paged
+    result = await browse.async_call(
+        ObjectID="Music", BrowseFlag="BrowseDirectChildren", Filter="*", StartingIndex=3, RequestedCount=10, SortCriteria=""
+    )
+    assert (result["NumberReturned"], result["TotalMatches"]) == (2, 5)
+    assert _titles(result["Result"]) == ["song 3", "song 4"]
+    res = ET.fromstring(result["Result"])[0].find(f"{DIDL_NS}res")
+    assert res.text == f"{library_server}/Music/song%203.mp3"
+    assert res.get("protocolInfo").startswith("http-get:*:audio/mpeg:")
+    assert res.get("duration") == "0:00:03.000"
+
+    result = await browse.async_call(
+        ObjectID="movie.mkv", BrowseFlag="BrowseMetadata", Filter="*", StartingIndex=0, RequestedCount=0, SortCriteria=""
+    )
+    assert _titles(result["Result"]) == ["movie"]
+
+    result = await search.async_call(
+        ContainerID="0",
+        SearchCriteria='upnp:class derivedfrom "object.item.audioItem" and dc:title contains "4"',
+        Filter="*",
+        StartingIndex=0,
+        RequestedCount=0,
+        SortCriteria="",
+    )
+    assert (_titles(result["Result"]), result["TotalMatches"]) == (["song 4"], 1)
+
+    with pytest.raises(UpnpActionResponseError) as excinfo:
+        await browse.async_call(
+            ObjectID="missing", BrowseFlag="BrowseMetadata", Filter="*", StartingIndex=0, RequestedCount=0, SortCriteria=""
+        )
+    assert excinfo.value.error_code == 701
+
+
+def test_ssdp_responses(tmp_path):
+    with MediaLibrary(tmp_path) as library:
+        server = MediaServer(tmp_path, library=library)
+        advertiser = SsdpAdvertiser(server.device, 8200)
+        (response,) = advertiser.responses("urn:schemas-upnp-org:device:MediaServer:1", "192.168.1.5")
+        assert b"LOCATION: http://192.168.1.5:8200/.upnp/description.xml\r\n" in response
+        assert len(advertiser.responses("ssdp:all", "192.168.1.5")) == 5
+        assert advertiser.responses("urn:schemas-upnp-org:device:MediaRenderer:1", "192.168.1.5") == []
@@ -0,0 +1,92 @@
+"""Tests for the control daemon."""
+
+import asyncio
+
+import pytest
+
+from dlna import daemon, discover, ipc
+from dlna.cache import DeviceCache
+from dlna.player import DLNADevice, PlaybackStatus
+
+
+@pytest.mark.asyncio
+async def test_forward_status_to_daemon(monkeypatch):
+    device = DLNADevice(name="TV", model_name="Model", location="http://10.0.0.5/d.xml", udn="uuid:tv")
+
+    async def fake_status(target, client=None):
+        assert target is device
+        return PlaybackStatus(state="PLAYING")
+
+    monkeypatch.setattr(daemon, "get_status", fake_status)
+
+    control = daemon.ControlDaemon(client=None)
+    control.watcher.table.update(device)
+    server = await ipc.serve(ipc._get_control_socket_path(), control.handle)
+    try:
+        response = await ipc.forward({"op": "status", "device": "tv"})
+        assert response == {"ok": True, "device": "TV", "state": "PLAYING"}
+
+        response = await ipc.forward({"op": "stop", "device": None})
+        assert response["ok"] is False
+        assert "default device" in response["error"]
+    finally:
+        server.close()
+        await server.wait_closed()
+
+
+@pytest.mark.asyncio
+async def test_forward_without_daemon():
+    assert await ipc.forward({"op": "status", "device": "tv"}) is None
+
+
+@pytest.mark.asyncio
+async def test_resolve_does_not_query_its_own_watcher(monkeypatch):
+    device = DLNADevice(name="TV", model_name="Model", location="http://10.0.0.5/d.xml", udn="uuid:tv")
+    cache = DeviceCache()
+    cache.update(device)
+    cache.save()
+
+    async def fail_query(name):
+        raise AssertionError("the daemon answers watch.sock itself")
+
+    async def fake_fetch(location, **kwargs):
+        return device
+
+    monkeypatch.setattr(discover, "query_watcher", fail_query)
+    monkeypatch.setattr(discover, "fetch_device", fake_fetch)
+
+    control = daemon.ControlDaemon(client=None)
+    assert await control.resolve("tv") is device
+    assert control.watcher.table.find("tv") is device
+
+
+@pytest.mark.asyncio
+async def test_daemon_leaves_a_running_watcher_alone(monkeypatch):
+    async def no_ssdp(self):
+        pass
+
+    async def watcher(message):
+        return {"ok": True, "device": None}
+
+    monkeypatch.setattr(daemon.Watcher, "start", no_ssdp)
+    control_path = ipc._get_control_socket_path()
+    watch_path = ipc._get_watch_socket_path()
+    watch_server = await ipc.serve(watch_path, watcher)
+    task = asyncio.create_task(daemon.run_daemon())
+    try:
+        for _ in range(100):
+            if await ipc.request(control_path, {"op": "ping"}) is not None:
+                break
+            await asyncio.sleep(0.01)
+        response = await ipc.forward({"op": "stop", "device": None})
+        assert "default device" in response["error"]
+    finally:
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        watch_server.close()
+        await watch_server.wait_closed()
+
+    # control.sock is removed; watch.sock still belongs to the watcher
+    assert not control_path.exists()
+    assert watch_path.exists()
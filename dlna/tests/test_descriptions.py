@@ -0,0 +1,100 @@
+"""Tests for the device description cache."""
+
+import pytest
+import pytest_asyncio
+from aiohttp import web
+
+from dlna.player import DLNAClient, fetch_device
+
+DEVICE_XML = """<?xml version="1.0"?>
+<root xmlns="urn:schemas-upnp-org:device-1-0">
+  <specVersion><major>1</major><minor>0</minor></specVersion>
+  <device>
+    <deviceType>urn:schemas-upnp-org:device:MediaRenderer:1</deviceType>
+    <friendlyName>Test Renderer</friendlyName>
+    <manufacturer>dlna</manufacturer>
+    <modelName>Fake</modelName>
+    <UDN>uuid:test-renderer</UDN>
+    <serviceList>
+      <service>
+        <serviceType>urn:schemas-upnp-org:service:AVTransport:1</serviceType>
+        <serviceId>urn:upnp-org:serviceId:AVTransport</serviceId>
+        <SCPDURL>/AVTransport.xml</SCPDURL>
+        <controlURL>/AVTransport/control</controlURL>
+        <eventSubURL>/AVTransport/event</eventSubURL>
+      </service>
+    </serviceList>
+  </device>
+</root>"""
+
+SCPD_XML = """<?xml version="1.0"?>
+<scpd xmlns="urn:schemas-upnp-org:service-1-0">
+  <specVersion><major>1</major><minor>0</minor></specVersion>
+  <actionList>
+    <action>
+      <name>Stop</name>
+      <argumentList>
+        <argument><name>InstanceID</name><direction>in</direction>
+          <relatedStateVariable>A_ARG_TYPE_InstanceID</relatedStateVariable></argument>
+      </argumentList>
+    </action>
+  </actionList>
+  <serviceStateTable>
+    <stateVariable sendEvents="no">
+      <name>A_ARG_TYPE_InstanceID</name><dataType>ui4</dataType>
+    </stateVariable>
+  </serviceStateTable>
+</scpd>"""
+
+
+@pytest_asyncio.fixture
+async def renderer():
+    hits = {"/description.xml": 0, "/AVTransport.xml": 0}
+
+    async def serve(request):
+        hits[request.path] += 1
+        body = DEVICE_XML if request.path == "/description.xml" else SCPD_XML
+        return web.Response(text=body, content_type="text/xml")
+
+    app = web.Application()
+    app.router.add_get("/description.xml", serve)
+    app.router.add_get("/AVTransport.xml", serve)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = runner.addresses[0][1]
+    yield f"http://127.0.0.1:{port}/description.xml", hits
+    await runner.cleanup()
+
+
+@pytest.mark.asyncio
+async def test_descriptions_are_reused_across_clients(renderer):
+    location, hits = renderer
+
+    async with DLNAClient() as client:
+        device = await fetch_device(location, client=client)
+        await client.get_av_transport(device)
+    assert device.udn == "uuid:test-renderer"
+    assert hits == {"/description.xml": 1, "/AVTransport.xml": 1}
+
+    # A new process rebuilds the device from disk without any request
+    async with DLNAClient() as client:
+        await client.get_av_transport(device)
+    assert hits == {"/description.xml": 1, "/AVTransport.xml": 1}
+
+    # fetch_device revalidates the root description only
+    async with DLNAClient() as client:
+        await fetch_device(location, client=client)
+    assert hits == {"/description.xml": 2, "/AVTransport.xml": 1}
+
+
+@pytest.mark.asyncio
+async def test_invalidate_forces_refetch(renderer):
+    location, hits = renderer
+
+    async with DLNAClient() as client:
+        device = await fetch_device(location, client=client)
+        client.invalidate(device)
+        await client.get_av_transport(device)
+    assert hits["/AVTransport.xml"] == 2
@@ -0,0 +1,67 @@
+"""Tests for DIDL-Lite metadata, media probing and local-file playback."""
+
+import xml.etree.ElementTree as ET
+
+import pytest
+
+from dlna import player
+from dlna.didl import build_metadata, format_duration
+from dlna.player import DLNADevice, PlaybackStatus
+from dlna.probe import MediaInfo, probe
+
+NS = {
+    "didl": "urn:schemas-upnp-org:metadata-1-0/DIDL-Lite/",
+    "dc": "http://purl.org/dc/elements/1.1/",
+    "upnp": "urn:schemas-upnp-org:metadata-1-0/upnp/",
+}
+
+
+def test_format_duration():
+    assert format_duration(0) == "0:00:00.000"
+    assert format_duration(5423.5) == "1:30:23.500"
+
+
+def test_build_metadata():
+    info = MediaInfo(mime_type="video/x-matroska", size=1234, duration=61.25, width=1920, height=1080)
+    xml = build_metadata("Tom & Jerry", "http://10.0.0.2:8000/Tom%20%26%20Jerry.mkv", info)
+
+    item = ET.fromstring(xml).find("didl:item", NS)
+    assert item.find("dc:title", NS).text == "Tom & Jerry"
+    assert item.find("upnp:class", NS).text == "object.item.videoItem"
+
+    res = item.find("didl:res", NS)
+    assert res.text == "http://10.0.0.2:8000/Tom%20%26%20Jerry.mkv"
+    assert res.get("protocolInfo").startswith("http-get:*:video/x-matroska:DLNA.ORG_OP=01")
+    assert res.get("duration") == "0:01:01.250"
+    assert res.get("size") == "1234"
+    assert res.get("resolution") == "1920x1080"
+
+
+def test_probe_without_ffprobe(tmp_path, monkeypatch):
+    monkeypatch.setattr("dlna.probe.has_ffprobe", lambda: False)
+    path = tmp_path / "movie.mkv"
+    path.write_bytes(b"x" * 10)
+
+    info = probe(path)
+    assert info.mime_type == "video/x-matroska"
+    assert info.size == 10
+    assert info.duration is None
+
+
+@pytest.mark.asyncio
+async def test_wait_until_stopped(monkeypatch):
+    device = DLNADevice(name="TV", model_name="Model", location="http://10.0.0.5/d.xml", udn="uuid:tv")
+    states = iter(["STOPPED", "TRANSITIONING", "PLAYING", "ERROR: timeout", "PLAYING", "STOPPED"])
+    polls = []
+
+    async def fake_status(target, client=None):
+        state = next(states)
+        polls.append(state)
+        return PlaybackStatus(state=state)
+
+    monkeypatch.setattr(player, "get_status", fake_status)
+
+    # A client must be given so no session is opened
+    await player.wait_until_stopped(device, client=object(), poll_interval=0)
+    assert polls[-1] == "STOPPED"
+    assert len(polls) == 6
@@ -0,0 +1,79 @@
+"""Tests for AVTransport event handling."""
+
+import asyncio
+from datetime import timedelta
+
+import pytest
+
+from dlna.events import EventSubscriber, parse_last_change
+from dlna.player import DLNAClient, play_url
+from dlna.testing import FakeRenderer
+
+LAST_CHANGE = """<Event xmlns="urn:schemas-upnp-org:metadata-1-0/AVT/">
+  <InstanceID val="0">
+    <TransportState val="PLAYING"/>
+    <CurrentTrackURI val="http://10.0.0.2/a.mp4"/>
+  </InstanceID>
+  <InstanceID val="1"><TransportState val="STOPPED"/></InstanceID>
+</Event>"""
+
+
+def test_parse_last_change_instance_zero():
+    assert parse_last_change(LAST_CHANGE) == {
+        "TransportState": "PLAYING",
+        "CurrentTrackURI": "http://10.0.0.2/a.mp4",
+    }
+
+
+def test_parse_last_change_invalid_xml():
+    assert parse_last_change("<Event") == {}
+
+
+async def _wait_for(predicate, timeout: float = 5.0) -> None:
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not predicate():
+        assert asyncio.get_running_loop().time() < deadline, "timed out"
+        await asyncio.sleep(0.02)
+
+
+@pytest.mark.asyncio
+async def test_subscribe_renew_unsubscribe():
+    events = []
+    # A 2 s lifetime is renewed after 1 s
+    async with FakeRenderer(event_timeout=2) as renderer:
+        async with DLNAClient() as client:
+            async with EventSubscriber(client, events.append, timeout=timedelta(seconds=2)) as subscriber:
+                await subscriber.subscribe(renderer.device)
+                assert renderer.gena == ["SUBSCRIBE"]
+
+                # Initial event, then one per state change
+                await _wait_for(lambda: events)
+                assert events[0].state == "NO_MEDIA_PRESENT"
+                await play_url(renderer.device, "http://10.0.0.2/a.mp4", client=client)
+                await _wait_for(lambda: subscriber.state(renderer.device) == "PLAYING")
+                assert events[-1].changes == {"TransportState": "PLAYING"}
+
+                await _wait_for(lambda: "RENEW" in renderer.gena)
+                assert len(renderer.subscriptions) == 1
+
+            assert renderer.gena[-1] == "UNSUBSCRIBE"
+            assert renderer.subscriptions == {}
+
+
+@pytest.mark.asyncio
+async def test_resubscribe_after_failed_renewal():
+    async with FakeRenderer(event_timeout=2) as renderer:
+        async with DLNAClient() as client:
+            async with EventSubscriber(client, lambda event: None, timeout=timedelta(seconds=2)) as subscriber:
+                await subscriber.subscribe(renderer.device)
+                (first,) = renderer.subscriptions
+                renderer.refuse_renewals = True
+
+                await _wait_for(lambda: renderer.gena.count("SUBSCRIBE") == 2)
+                assert renderer.gena == ["SUBSCRIBE", "RENEW", "SUBSCRIBE"]
+                (second,) = set(renderer.subscriptions) - {first}
+                renderer.refuse_renewals = False
+
+            # Only the live subscription is cancelled
+            assert renderer.gena[-1] == "UNSUBSCRIBE"
+            assert second not in renderer.subscriptions
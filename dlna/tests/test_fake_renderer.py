@@ -0,0 +1,138 @@
+"""End-to-end tests against the simulated renderers in dlna.testing."""
+
+import functools
+
+import pytest
+
+from dlna import discover
+from dlna.player import RENDERER_SEARCH_TARGETS, DLNAClient, discover_devices, get_status, play_url
+from dlna.playlist import PlaybackQueue, QueueItem
+from dlna.testing import FakeRenderer, SsdpResponder
+
+
+@pytest.mark.asyncio
+async def test_discovery_over_unicast_ssdp():
+    async with FakeRenderer("Kitchen") as a, FakeRenderer("Living Room") as b:
+        async with SsdpResponder([a, b]) as ssdp:
+            devices = await discover_devices(timeout=1, target=ssdp.address)
+            assert sorted(device.name for device in devices) == ["Kitchen", "Living Room"]
+            # Each renderer answers for two search targets but is fetched once
+            assert a.hits["/description.xml"] == 1
+
+            devices = await discover_devices(
+                timeout=5,
+                target=ssdp.address,
+                match=lambda device: device.name == "Kitchen",
+            )
+            assert devices[-1].name == "Kitchen"
+
+
+@pytest.mark.asyncio
+async def test_only_renderer_targets_are_searched_by_default():
+    async with FakeRenderer("Kitchen") as renderer:
+        async with SsdpResponder([renderer]) as ssdp:
+            await discover_devices(timeout=1, target=ssdp.address)
+            assert sorted(set(ssdp.search_targets)) == sorted(RENDERER_SEARCH_TARGETS)
+
+            ssdp.search_targets.clear()
+            devices = await discover_devices(timeout=1, target=ssdp.address, search_all=True)
+            assert set(ssdp.search_targets) == {"ssdp:all"}
+            assert [device.name for device in devices] == ["Kitchen"]
+
+
+@pytest.mark.asyncio
+async def test_description_fetches_are_concurrent_and_bounded(monkeypatch):
+    in_flight = peak = 0
+    get_upnp_device = DLNAClient.get_upnp_device
+
+    async def counting_get(self, *args, **kwargs):
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        try:
+            return await get_upnp_device(self, *args, **kwargs)
+        finally:
+            in_flight -= 1
+
+    monkeypatch.setattr(DLNAClient, "get_upnp_device", counting_get)
+
+    async def scan(**kwargs):
+        # New renderers each time: known descriptions would not be fetched again
+        renderers = [FakeRenderer(f"TV {n}", latency=0.1) for n in range(4)]
+        for renderer in renderers:
+            await renderer.start()
+        try:
+            async with SsdpResponder(renderers) as ssdp:
+                return await discover_devices(timeout=1, target=ssdp.address, **kwargs)
+        finally:
+            for renderer in renderers:
+                await renderer.stop()
+
+    assert len(await scan()) == 4
+    assert peak == 4
+
+    peak = 0
+    assert len(await scan(max_concurrency=2)) == 4
+    assert peak == 2
+
+
+@pytest.mark.asyncio
+async def test_slow_description_times_out_alone(capsys):
+    async with FakeRenderer("Fast") as fast, FakeRenderer("Slow", latency=1.0) as slow:
+        async with SsdpResponder([slow, fast]) as ssdp:
+            devices = await discover_devices(timeout=1, target=ssdp.address, fetch_timeout=0.3)
+            assert [device.name for device in devices] == ["Fast"]
+            assert f"Failed to connect to {slow.location}" in capsys.readouterr().out
+
+
+@pytest.mark.asyncio
+async def test_partial_match_does_not_end_the_scan(monkeypatch):
+    # The partial match answers first; the exact one is slower
+    async with FakeRenderer("TV Kitchen") as kitchen, FakeRenderer("TV", latency=0.2) as tv:
+        async with SsdpResponder([kitchen, tv]) as ssdp:
+            monkeypatch.setattr(
+                discover, "discover_devices", functools.partial(discover_devices, target=ssdp.address)
+            )
+            device = await discover.find_device("tv", timeout=1, use_cache=False)
+            assert device.udn == tv.device.udn
+
+            found = await discover.find_devices(["tv", "kitchen"], timeout=1, use_cache=False)
+            assert found["tv"].udn == tv.device.udn
+            assert found["kitchen"].udn == kitchen.device.udn
+
+
+@pytest.mark.asyncio
+async def test_group_play_with_uneven_latency():
+    renderers = [
+        FakeRenderer("A"),
+        FakeRenderer("B", action_latency={"GetTransportInfo": 0.1}),
+        FakeRenderer("C", latency=0.02),
+    ]
+    for renderer in renderers:
+        await renderer.start()
+    try:
+        async with DLNAClient() as client:
+            results = await play_url([r.device for r in renderers], "http://10.0.0.2/a.mp3", client=client)
+            assert all(result.ok for result in results)
+            assert results[1].rtt > results[0].rtt
+            assert all(r.state == "PLAYING" for r in renderers)
+            assert (await get_status(renderers[2].device, client=client)).state == "PLAYING"
+    finally:
+        for renderer in renderers:
+            await renderer.stop()
+
+
+@pytest.mark.asyncio
+async def test_gapless_queue():
+    async with FakeRenderer(track_duration=0.05) as renderer:
+        items = [QueueItem(url=f"http://10.0.0.2/{n}.mp3") for n in range(3)]
+        started = []
+        async with DLNAClient() as client:
+            queue = PlaybackQueue(renderer.device, items, client, on_track=started.append, poll_interval=0.02)
+            await queue.run()
+
+    assert queue.gapless
+    assert started == [0, 1, 2]
+    assert renderer.actions.count("SetNextAVTransportURI") == 2
+    assert renderer.actions.count("SetAVTransportURI") == 1
+    assert renderer.state == "STOPPED"
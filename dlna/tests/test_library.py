@@ -0,0 +1,102 @@
+"""Tests for the media index."""
+
+import http.client
+import os
+
+from dlna.library import MediaLibrary
+from dlna.probe import MediaInfo, guess_mime_type
+from dlna.server import MediaServer
+
+
+def _fake_probe(probed):
+    def probe_file(path):
+        probed.append(path.name)
+        return MediaInfo(mime_type=guess_mime_type(path), size=path.stat().st_size, duration=61.0)
+
+    return probe_file
+
+
+def test_refresh_probes_only_changed_files(tmp_path, config_dir):
+    media = tmp_path / "media"
+    (media / "Shows").mkdir(parents=True)
+    (media / "a.mp4").write_bytes(b"a")
+    (media / "b.mp3").write_bytes(b"bb")
+    (media / "Shows" / "c.mkv").write_bytes(b"ccc")
+    (media / ".hidden").write_bytes(b"x")
+
+    probed = []
+    with MediaLibrary(media) as library:
+        stats = library.refresh(_fake_probe(probed))
+        assert (stats.added, stats.updated, stats.removed) == (3, 0, 0)
+        assert [entry.name for entry in library.children("")] == ["Shows", "a.mp4", "b.mp3"]
+        assert library.get("Shows/c.mkv").mime_type == "video/x-matroska"
+        assert library.get("Shows/c.mkv").parent == "Shows"
+        assert library.get("a.mp4").info.duration == 61.0
+
+    (media / "b.mp3").write_bytes(b"changed")
+    os.utime(media / "a.mp4", ns=(0, 0))
+    (media / "Shows" / "c.mkv").unlink()
+
+    probed.clear()
+    # A new instance reads the index back from .dlna/media.db
+    with MediaLibrary(media) as library:
+        stats = library.refresh(_fake_probe(probed))
+        assert (stats.added, stats.updated, stats.removed, stats.unchanged) == (0, 2, 1, 0)
+        assert sorted(probed) == ["a.mp4", "b.mp3"]
+        assert library.get("Shows/c.mkv") is None
+        assert library.count("Shows") == 0
+        assert [entry.name for entry in library.children("", offset=1, limit=1)] == ["a.mp4"]
+
+    assert (config_dir / "media.db").exists()
+
+
+def test_refresh_skips_files_that_are_not_media(tmp_path, config_dir):
+    media = tmp_path / "media"
+    media.mkdir()
+    (media / "movie.mp4").write_bytes(b"movie")
+    for name in ("movie.nfo", "notes.txt", "movie.srt"):
+        (media / name).write_bytes(b"text")
+
+    with MediaLibrary(media) as library:
+        stats = library.refresh(_fake_probe([]))
+        assert (stats.added, stats.unchanged) == (1, 0)
+        assert [entry.name for entry in library.children("")] == ["movie.mp4"]
+        assert library.search()[1] == 1
+
+        # A file renamed to a non-media name leaves the index
+        (media / "movie.mp4").rename(media / "movie.bak")
+        stats = library.refresh(_fake_probe([]))
+        assert (stats.added, stats.removed) == (0, 1)
+        assert library.count("") == 0
+
+
+def test_server_lists_and_types_from_index(tmp_path, config_dir):
+    media = tmp_path / "media"
+    media.mkdir()
+    (media / "clip.bin").write_bytes(b"data")
+
+    library = MediaLibrary(media)
+    library.refresh(lambda path: MediaInfo(mime_type="video/mp4", size=4, duration=5.0, width=640, height=480))
+    # Not in the index yet: served, but not listed
+    (media / "late.mp4").write_bytes(b"late")
+
+    server = MediaServer(media, library=library)
+    port = server.start()
+    try:
+        conn = http.client.HTTPConnection("127.0.0.1", port)
+        conn.request("GET", "/")
+        listing = conn.getresponse().read().decode()
+        assert "clip.bin" in listing and "640x480" in listing
+        assert "late.mp4" not in listing
+
+        conn.request("GET", "/clip.bin")
+        response = conn.getresponse()
+        assert response.getheader("Content-Type") == "video/mp4"
+        assert response.read() == b"data"
+
+        conn.request("GET", "/late.mp4")
+        assert conn.getresponse().read() == b"late"
+        conn.close()
+    finally:
+        server.stop()
+        library.close()
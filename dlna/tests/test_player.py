@@ -0,0 +1,51 @@
+"""Tests for group playback."""
+
+import asyncio
+
+import pytest
+
+from dlna import player
+from dlna.player import DLNADevice
+
+
+def _device(name, udn):
+    return DLNADevice(name=name, model_name="Model", location=f"http://10.0.0.5/{udn}.xml", udn=udn)
+
+
+@pytest.mark.asyncio
+async def test_play_url_aligns_play_calls(monkeypatch):
+    rtts = {"uuid:fast": 0.0, "uuid:slow": 0.2, "uuid:broken": None}
+    sent = {}
+
+    async def fake_prepare(session, device, url, metadata):
+        if rtts[device.udn] is None:
+            raise ConnectionError("unreachable")
+        return device.udn, rtts[device.udn]
+
+    async def fake_call(session, device, av_transport, name, **kwargs):
+        assert name == "Play"
+        sent[device.udn] = asyncio.get_running_loop().time()
+        await asyncio.sleep(rtts[device.udn])
+
+    monkeypatch.setattr(player, "_prepare", fake_prepare)
+    monkeypatch.setattr(player, "_call_action", fake_call)
+
+    devices = [_device("Fast", "uuid:fast"), _device("Slow", "uuid:slow"), _device("Broken", "uuid:broken")]
+    results = await player.play_url(devices, "http://10.0.0.2/a.mp3", client=object())
+
+    assert [result.ok for result in results] == [True, True, False]
+    assert results[2].error == "unreachable"
+    # The fast device is held back by the difference in one-way delay
+    assert sent["uuid:fast"] - sent["uuid:slow"] == pytest.approx(0.1, abs=0.05)
+    assert max(result.offset for result in results[:2]) < 0.05
+
+
+@pytest.mark.asyncio
+async def test_play_url_raises_when_all_fail(monkeypatch):
+    async def fake_prepare(session, device, url, metadata):
+        raise ConnectionError("unreachable")
+
+    monkeypatch.setattr(player, "_prepare", fake_prepare)
+
+    with pytest.raises(ConnectionError):
+        await player.play_url(_device("TV", "uuid:tv"), "http://10.0.0.2/a.mp3", client=object())
@@ -0,0 +1,78 @@
+"""Tests for the gapless playback queue."""
+
+import pytest
+
+from dlna import playlist
+from dlna.player import DLNADevice
+from dlna.playlist import PlaybackQueue, QueueItem
+
+
+class FakeRenderer:
+    """Plays each track for a fixed number of polls, honouring SetNextAVTransportURI."""
+
+    def __init__(self, gapless: bool, polls_per_track: int = 2):
+        self.gapless = gapless
+        self.polls_per_track = polls_per_track
+        self.calls = []
+        self.uri = ""
+        self.next_uri = ""
+        self.remaining = 0
+
+    def has_action(self, name):
+        return self.gapless or name != "SetNextAVTransportURI"
+
+    async def get_av_transport(self, device):
+        return self
+
+    def start(self, uri):
+        self.uri = uri
+        self.remaining = self.polls_per_track
+
+    async def call(self, client, device, av_transport, name, **kwargs):
+        self.calls.append(name)
+        if name == "SetAVTransportURI":
+            self.uri = kwargs["CurrentURI"]
+        elif name == "Play":
+            self.start(self.uri)
+        elif name == "SetNextAVTransportURI":
+            self.next_uri = kwargs["NextURI"]
+        elif name == "GetPositionInfo":
+            return {"TrackURI": self.uri}
+        elif name == "GetTransportInfo":
+            if self.remaining == 0 and self.next_uri:
+                self.start(self.next_uri)
+                self.next_uri = ""
+            if self.remaining == 0:
+                return {"CurrentTransportState": "STOPPED"}
+            self.remaining -= 1
+            return {"CurrentTransportState": "PLAYING"}
+        return {}
+
+
+@pytest.mark.parametrize("gapless", [True, False])
+@pytest.mark.asyncio
+async def test_queue_plays_all_items(monkeypatch, gapless):
+    renderer = FakeRenderer(gapless)
+
+    async def fake_play_url(device, url, client=None, metadata=""):
+        await renderer.call(client, device, None, "Stop")
+        await renderer.call(client, device, None, "SetAVTransportURI", CurrentURI=url)
+        await renderer.call(client, device, None, "Play")
+
+    monkeypatch.setattr(playlist, "_call_action", renderer.call)
+    monkeypatch.setattr(playlist, "play_url", fake_play_url)
+
+    device = DLNADevice(name="TV", model_name="Model", location="http://10.0.0.5/d.xml", udn="uuid:tv")
+    items = [QueueItem(url=f"http://10.0.0.2/{n}.mp3") for n in range(3)]
+    started = []
+
+    queue = PlaybackQueue(device, items, renderer, on_track=started.append, poll_interval=0)
+    await queue.run()
+
+    assert started == [0, 1, 2]
+    assert renderer.calls.count("Stop") == 1
+    if gapless:
+        assert renderer.calls.count("SetNextAVTransportURI") == 2
+        assert renderer.calls.count("SetAVTransportURI") == 1
+    else:
+        assert renderer.calls.count("SetAVTransportURI") == 3
@@ -0,0 +1,200 @@
+"""Tests for action timeouts, retries and the circuit breaker."""
+
+import asyncio
+import time
+
+import pytest
+from async_upnp_client.exceptions import UpnpConnectionError, UpnpConnectionTimeoutError
+
+from dlna import discover, player, policy
+from dlna.cache import DeviceCache
+from dlna.player import DLNAClient, DLNADevice, _call_action
+from dlna.policy import CircuitBreaker, DeviceUnavailableError
+from dlna.testing import FakeRenderer
+
+
+class FakeService:
+    """AVTransport stand-in whose actions run a given coroutine function."""
+
+    def __init__(self, behaviour):
+        self.behaviour = behaviour
+        self.calls = 0
+
+    def action(self, name):
+        service = self
+
+        class Action:
+            async def async_call(self, **kwargs):
+                service.calls += 1
+                return await service.behaviour(service.calls)
+
+        return Action()
+
+
+def _device():
+    return DLNADevice(name="TV", model_name="Model", location="http://10.0.0.5/d.xml", udn="uuid:tv")
+
+
+@pytest.fixture(autouse=True)
+def no_backoff(monkeypatch):
+    monkeypatch.setattr(player, "retry_delay", lambda attempt: 0)
+
+
+@pytest.mark.asyncio
+async def test_idempotent_action_is_retried():
+    async def flaky(call):
+        if call == 1:
+            raise UpnpConnectionError("reset")
+        return {"CurrentTransportState": "PLAYING"}
+
+    metrics = []
+    client = DLNAClient(on_action=metrics.append)
+    service = FakeService(flaky)
+
+    result = await _call_action(client, _device(), service, "GetTransportInfo", InstanceID=0)
+    assert result["CurrentTransportState"] == "PLAYING"
+    assert service.calls == 2
+    assert metrics[0].action == "GetTransportInfo"
+    assert metrics[0].attempts == 2
+    assert metrics[0].ok
+
+
+@pytest.mark.asyncio
+async def test_play_is_not_retried_and_times_out():
+    async def hang(call):
+        await asyncio.sleep(10)
+
+    metrics = []
+    client = DLNAClient(timeout=0.05, on_action=metrics.append)
+    service = FakeService(hang)
+
+    with pytest.raises(UpnpConnectionTimeoutError):
+        await _call_action(client, _device(), service, "Play", InstanceID=0, Speed="1")
+    assert service.calls == 1
+    assert not metrics[0].ok
+
+
+
+@pytest.mark.asyncio
+async def test_action_budget_outlasts_the_client_timeout(monkeypatch):
+    # Slower than client.timeout, but within the action's own budget
+    monkeypatch.setitem(policy.ACTION_TIMEOUTS, "SetAVTransportURI", 3.0)
+    async with FakeRenderer(action_latency={"SetAVTransportURI": 1.5}) as renderer:
+        metrics = []
+        async with DLNAClient(timeout=1, on_action=metrics.append) as client:
+            av_transport = await client.get_av_transport(renderer.device)
+            await _call_action(
+                client, renderer.device, av_transport, "SetAVTransportURI",
+                InstanceID=0, CurrentURI="http://10.0.0.2/a.mp3", CurrentURIMetaData="",
+            )
+
+    assert renderer.actions == ["SetAVTransportURI"]
+    assert metrics[0].ok
+    assert metrics[0].attempts == 1
+
+
+@pytest.mark.asyncio
+async def test_metric_records_the_real_error():
+    async def broken(call):
+        raise ValueError("bad argument")
+
+    async def hang(call):
+        await asyncio.sleep(10)
+
+    metrics = []
+    client = DLNAClient(on_action=metrics.append)
+
+    with pytest.raises(ValueError):
+        await _call_action(client, _device(), FakeService(broken), "Play", InstanceID=0, Speed="1")
+    assert metrics[-1].error == "bad argument"
+
+    task = asyncio.create_task(_call_action(client, _device(), FakeService(hang), "Play", InstanceID=0, Speed="1"))
+    await asyncio.sleep(0.01)
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+    assert metrics[-1].error == "cancelled"
+
+@pytest.mark.asyncio
+async def test_breaker_opens_and_persists():
+    async def down(call):
+        raise UpnpConnectionError("unreachable")
+
+    client = DLNAClient()
+    service = FakeService(down)
+    device = _device()
+
+    for _ in range(3):
+        with pytest.raises(UpnpConnectionError):
+            await _call_action(client, device, service, "Play", InstanceID=0, Speed="1")
+
+    with pytest.raises(DeviceUnavailableError):
+        await _call_action(client, device, service, "Play", InstanceID=0, Speed="1")
+    assert service.calls == 3
+
+    # A later command (new process) fails fast too
+    assert DeviceCache.load().devices["uuid:tv"].failures == 3
+    with pytest.raises(DeviceUnavailableError):
+        CircuitBreaker().check(device)
+
+    # Once the device answers again, the circuit closes
+    breaker = CircuitBreaker()
+    breaker.record_success(device)
+    assert DeviceCache.load().devices["uuid:tv"].failures == 0
+
+
+def test_breaker_state_survives_rediscovery():
+    device = _device()
+    CircuitBreaker(threshold=1).record_failure(device)
+    open_until = DeviceCache.load().devices["uuid:tv"].open_until
+
+    # Rediscovery (SSDP answer or moved LOCATION) keeps the failure state
+    cache = DeviceCache.load()
+    cache.update(DLNADevice(name="TV", model_name="Model", location="http://10.0.0.9/d.xml", udn="uuid:tv"))
+    cache.save()
+
+    entry = DeviceCache.load().devices["uuid:tv"]
+    assert (entry.failures, entry.open_until) == (1, open_until)
+    assert entry.location == "http://10.0.0.9/d.xml"
+    with pytest.raises(DeviceUnavailableError):
+        CircuitBreaker().check(device)
+
+
+def test_breaker_lets_one_call_through_after_cooldown():
+    device = _device()
+    cache = DeviceCache()
+    cache.update(device)
+    cache.devices["uuid:tv"].failures = 3
+    cache.devices["uuid:tv"].open_until = time.time() - 1
+    cache.save()
+
+    breaker = CircuitBreaker()
+    breaker.check(device)
+
+    # The trial call failed: open again at once, without another THRESHOLD failures
+    breaker.record_failure(device)
+    entry = DeviceCache.load().devices["uuid:tv"]
+    assert entry.failures == 4
+    assert entry.open_until > time.time()
+    with pytest.raises(DeviceUnavailableError):
+        CircuitBreaker().check(device)
+
+
+@pytest.mark.asyncio
+async def test_open_circuit_skips_the_cached_location_probe(monkeypatch):
+    device = _device()
+    CircuitBreaker(threshold=1).record_failure(device)
+
+    async def fail_fetch(location, **kwargs):
+        raise AssertionError("an open circuit should not be probed")
+
+    async def no_watcher(name):
+        return None
+
+    monkeypatch.setattr(discover, "fetch_device", fail_fetch)
+    monkeypatch.setattr(discover, "query_watcher", no_watcher)
+
+    found = await discover.find_device("tv")
+    assert found.udn == "uuid:tv"
+    with pytest.raises(DeviceUnavailableError):
+        await _call_action(DLNAClient(), found, FakeService(None), "Stop", InstanceID=0)
@@ -0,0 +1,206 @@
+"""Tests for the media file server."""
+
+import http.client
+
+import pytest
+
+from dlna import server as media_server_module
+from dlna.server import FileCache, MediaServer, RangeNotSatisfiable, parse_range
+
+
+def test_parse_range():
+    assert parse_range("bytes=0-99", 1000) == (0, 99)
+    assert parse_range("bytes=900-", 1000) == (900, 999)
+    assert parse_range("bytes=-100", 1000) == (900, 999)
+    assert parse_range("bytes=500-5000", 1000) == (500, 999)
+    assert parse_range("bytes=0-1,5-6", 1000) is None
+    assert parse_range("items=0-1", 1000) is None
+    assert parse_range("bytes=abc", 1000) is None
+    with pytest.raises(RangeNotSatisfiable):
+        parse_range("bytes=1000-", 1000)
+
+
+@pytest.fixture
+def media_server(tmp_path):
+    (tmp_path / "video.mp4").write_bytes(bytes(range(256)) * 64)
+    # Without the small file cache, so the file goes through sendfile/copy
+    server = MediaServer(tmp_path, cache_bytes=0)
+    port = server.start()
+    yield port
+    server.stop()
+
+
+@pytest.mark.parametrize("use_sendfile", [True, False])
+def test_range_requests_over_keep_alive(media_server, monkeypatch, use_sendfile):
+    from dlna.server import QuietHTTPRequestHandler
+
+    monkeypatch.setattr(QuietHTTPRequestHandler, "use_sendfile", use_sendfile)
+    data = bytes(range(256)) * 64
+    conn = http.client.HTTPConnection("127.0.0.1", media_server)
+
+    conn.request("GET", "/video.mp4", headers={"Range": "bytes=100-199"})
+    response = conn.getresponse()
+    assert response.status == 206
+    assert response.getheader("Content-Range") == f"bytes 100-199/{len(data)}"
+    assert response.read() == data[100:200]
+
+    # Same connection: keep-alive
+    conn.request("GET", "/video.mp4")
+    response = conn.getresponse()
+    assert response.status == 200
+    assert response.getheader("Accept-Ranges") == "bytes"
+    assert response.read() == data
+
+    conn.request("HEAD", "/video.mp4")
+    response = conn.getresponse()
+    assert response.getheader("Content-Length") == str(len(data))
+    assert response.read() == b""
+
+    conn.request("GET", "/video.mp4", headers={"Range": f"bytes={len(data)}-"})
+    response = conn.getresponse()
+    assert response.status == 416
+    response.read()
+    conn.close()
+
+
+def test_registered_file_only(tmp_path):
+    (tmp_path / "movie.mp4").write_bytes(b"movie")
+    (tmp_path / "secret.txt").write_bytes(b"secret")
+    server = MediaServer()
+    port = server.start()
+    try:
+        url_path = server.add_file(tmp_path / "movie.mp4")
+        assert url_path.endswith("/movie.mp4")
+
+        conn = http.client.HTTPConnection("127.0.0.1", port)
+        conn.request("GET", url_path)
+        response = conn.getresponse()
+        assert response.status == 200
+        assert response.read() == b"movie"
+
+        # Neither the sibling nor any listing is reachable
+        for other in ("/secret.txt", "/", "/.file/", f"{url_path[:-len('movie.mp4')]}secret.txt"):
+            conn.request("GET", other)
+            response = conn.getresponse()
+            assert response.status == 404, other
+            response.read()
+        conn.close()
+    finally:
+        server.stop()
+
+
+def test_conditional_get_and_small_file_cache(tmp_path):
+    subtitles = tmp_path / "movie.srt"
+    subtitles.write_bytes(b"1\n00:00:01,000 --> 00:00:02,000\nHello\n")
+    server = MediaServer(tmp_path)
+    port = server.start()
+    try:
+        conn = http.client.HTTPConnection("127.0.0.1", port)
+        conn.request("GET", "/movie.srt")
+        response = conn.getresponse()
+        etag = response.getheader("ETag")
+        assert response.getheader("Cache-Control") == "max-age=60"
+        assert response.read() == subtitles.read_bytes()
+
+        # Polling with the ETag costs a header-only 304 on the same connection
+        conn.request("GET", "/movie.srt", headers={"If-None-Match": etag})
+        response = conn.getresponse()
+        assert response.status == 304
+        assert response.read() == b""
+
+        conn.request("GET", "/movie.srt", headers={"Range": "bytes=0-1"})
+        response = conn.getresponse()
+        assert response.status == 206
+        assert response.read() == b"1\n"
+        assert (server.file_cache.misses, server.file_cache.hits) == (1, 1)
+
+        # An edited file gets a new ETag and is read again
+        subtitles.write_bytes(b"changed")
+        conn.request("GET", "/movie.srt", headers={"If-None-Match": etag})
+        response = conn.getresponse()
+        assert response.status == 200
+        assert response.getheader("ETag") != etag
+        assert response.read() == b"changed"
+
+        # Missing sidecar files do not cost a new connection
+        conn.request("GET", "/movie.ass")
+        response = conn.getresponse()
+        assert response.status == 404
+        assert response.getheader("Connection") != "close"
+        response.read()
+        conn.request("HEAD", "/movie.srt")
+        response = conn.getresponse()
+        assert response.status == 200
+        response.read()
+        conn.close()
+    finally:
+        server.stop()
+
+
+def test_file_cache_evicts_least_recently_used(tmp_path):
+    cache = FileCache(max_bytes=250, max_file_bytes=100)
+    for name in ("a", "b", "c", "big"):
+        (tmp_path / name).write_bytes(name.encode() * (200 if name == "big" else 100))
+
+    def read(name):
+        path = tmp_path / name
+        with open(path, "rb") as f:
+            return cache.read(str(path), f, path.stat())
+
+    assert read("a") == b"a" * 100
+    assert read("b") == b"b" * 100
+    assert read("a") == b"a" * 100
+    assert read("c") == b"c" * 100
+    assert read("big") is None
+    # "b" was the least recently used when "c" went over the cap
+    assert cache.size == 200
+    assert (cache.hits, cache.misses) == (1, 3)
+    read("b")
+    assert cache.misses == 4
+
+
+@pytest.mark.asyncio
+async def test_async_server_ranges_and_counters(tmp_path):
+    import aiohttp
+
+    from dlna.aioserver import AsyncMediaServer
+
+    data = bytes(range(256)) * 64
+    (tmp_path / "song.mp3").write_bytes(data)
+
+    async with AsyncMediaServer(tmp_path, chunk_size=1000) as server:
+        base = f"http://127.0.0.1:{server._actual_port}"
+        async with aiohttp.ClientSession() as session:
+            async with session.get(f"{base}/song.mp3", headers={"Range": "bytes=-10"}) as response:
+                assert response.status == 206
+                assert await response.read() == data[-10:]
+            async with session.get(f"{base}/song.mp3") as response:
+                assert response.headers["Content-Type"] == "audio/mpeg"
+                assert await response.read() == data
+            async with session.get(f"{base}/../etc/passwd") as response:
+                assert response.status == 404
+
+        # A new connection from the same client shares its counters
+        async with aiohttp.ClientSession() as session:
+            async with session.head(f"{base}/song.mp3") as response:
+                assert response.status == 200
+
+        assert server.bytes_sent == len(data) + 10
+        assert list(server.connections) == ["127.0.0.1"]
+        assert server.connections["127.0.0.1"].requests == 4
+
+
+def test_local_ip_for_renderer(monkeypatch):
+    monkeypatch.setattr(media_server_module, "_local_ips", {})
+    assert media_server_module.local_ip_for("http://127.0.0.1:1400/desc.xml") == "127.0.0.1"
+
+    lookups = []
+
+    def fake_route(address):
+        lookups.append(address)
+        return "192.168.2.10"
+
+    monkeypatch.setattr(media_server_module, "_route_source", fake_route)
+    assert media_server_module.local_ip_for("http://192.168.2.50:1400/desc.xml") == "192.168.2.10"
+    assert media_server_module.local_ip_for("http://192.168.2.50:49152/other.xml") == "192.168.2.10"
+    assert lookups == ["192.168.2.50"]
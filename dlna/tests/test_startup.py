@@ -0,0 +1,26 @@
+"""Tests that config-only entry points stay free of the network stack."""
+
+import subprocess
+import sys
+from pathlib import Path
+
+import dlna
+
+SRC_DIR = Path(__file__).resolve().parent.parent / "src"
+
+
+def test_cli_import_does_not_load_network_stack():
+    code = (
+        "import sys, dlna, dlna.cli; "
+        "heavy = [m for m in ('aiohttp', 'async_upnp_client') if m in sys.modules]; "
+        "assert not heavy, heavy"
+    )
+    subprocess.run([sys.executable, "-c", code], cwd=SRC_DIR, check=True)
+
+
+def test_lazy_exports_resolve():
+    from dlna.player import DLNAClient
+
+    assert dlna.DLNAClient is DLNAClient
+    assert callable(dlna.find_device)
+    assert set(dlna.__all__) <= set(dir(dlna))
@@ -0,0 +1,150 @@
+"""Tests for the thumbnail cache."""
+
+import http.client
+import os
+import threading
+import time
+
+from dlna import thumbs
+from dlna.library import MediaLibrary
+from dlna.server import MediaServer
+from dlna.thumbs import ThumbnailCache
+
+
+def _jpeg(width: int, height: int) -> bytes:
+    """Just enough of a JPEG for its size to be read: SOI, APP0, SOF0."""
+    app0 = b"\xff\xe0\x00\x10JFIF\x00\x01\x01\x00\x00\x01\x00\x01\x00\x00"
+    sof0 = b"\xff\xc0\x00\x11\x08" + height.to_bytes(2, "big") + width.to_bytes(2, "big") + b"\x03" + bytes(9)
+    return b"\xff\xd8" + app0 + sof0 + b"\xff\xd9"
+
+
+def test_cache_extracts_once_and_evicts_lru(tmp_path, monkeypatch):
+    extracted = []
+
+    def fake_extract(path, mime_type, duration=None):
+        extracted.append(path.name)
+        return b"j" * 100 if path.suffix == ".mp4" else None
+
+    monkeypatch.setattr(thumbs, "extract_thumbnail", fake_extract)
+    for name in ("a.mp4", "b.mp4", "c.mp4", "d.mp3"):
+        (tmp_path / name).write_bytes(name.encode())
+
+    cache = ThumbnailCache(tmp_path / "thumbs", max_bytes=250)
+    thumb_a = cache.get(tmp_path / "a.mp4", "video/mp4")
+    assert cache.get(tmp_path / "a.mp4", "video/mp4") == thumb_a
+    assert cache.get(tmp_path / "d.mp3", "audio/mpeg") is None
+    assert cache.get(tmp_path / "d.mp3", "audio/mpeg") is None
+    assert extracted == ["a.mp4", "d.mp3"]
+
+    thumb_b = cache.get(tmp_path / "b.mp4", "video/mp4")
+    os.utime(thumb_b.path, (1, 1))
+    # a was used more recently than b, so b goes when c does not fit
+    cache.get(tmp_path / "c.mp4", "video/mp4")
+    assert thumb_a.path.exists() and not thumb_b.path.exists()
+
+    # A changed file gets a new thumbnail
+    (tmp_path / "a.mp4").write_bytes(b"edited")
+    assert cache.get(tmp_path / "a.mp4", "video/mp4").key != thumb_a.key
+
+    # So does a file that gets a cover, and "no picture" is forgotten after a while
+    (tmp_path / "cover.jpg").write_bytes(_jpeg(100, 100))
+    key_c = cache.get(tmp_path / "c.mp4", "video/mp4").key
+    (tmp_path / "cover.jpg").write_bytes(_jpeg(160, 90))
+    os.utime(tmp_path / "cover.jpg", (1, 1))
+    assert cache.get(tmp_path / "c.mp4", "video/mp4").key != key_c
+    monkeypatch.setattr(thumbs, "MISSING_TTL", 0)
+    cache.get(tmp_path / "d.mp3", "audio/mpeg")
+    assert extracted.count("d.mp3") == 2
+
+
+def test_extractions_of_different_files_run_concurrently(tmp_path, monkeypatch):
+    running = set()
+    overlapped = threading.Event()
+
+    def slow_extract(path, mime_type, duration=None):
+        running.add(path.name)
+        if len(running) == 2:
+            overlapped.set()
+        overlapped.wait(timeout=2)
+        return b"j"
+
+    monkeypatch.setattr(thumbs, "extract_thumbnail", slow_extract)
+    for name in ("a.mp4", "b.mp4"):
+        (tmp_path / name).write_bytes(name.encode())
+
+    cache = ThumbnailCache(tmp_path / "thumbs")
+    threads = [
+        threading.Thread(target=cache.get, args=(tmp_path / name, "video/mp4")) for name in ("a.mp4", "b.mp4")
+    ]
+    start = time.monotonic()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert overlapped.is_set()
+    assert time.monotonic() - start < 1
+
+
+def test_sidecar_cover_without_ffmpeg(tmp_path, monkeypatch):
+    monkeypatch.setattr(thumbs, "has_ffmpeg", lambda: False)
+    (tmp_path / "song.mp3").write_bytes(b"audio")
+    (tmp_path / "photo.png").write_bytes(b"not really a png")
+
+    small = _jpeg(160, 120)
+    (tmp_path / "cover.jpg").write_bytes(small)
+    assert thumbs.jpeg_size(small) == (160, 120)
+    assert thumbs.extract_thumbnail(tmp_path / "song.mp3", "audio/mpeg") == small
+    # Covers belong to audio and video, not to other pictures
+    assert thumbs.extract_thumbnail(tmp_path / "photo.png", "image/png") is None
+
+    # Too large for JPEG_TN, or not a JPEG at all: cannot be used as is
+    (tmp_path / "cover.jpg").write_bytes(_jpeg(600, 600))
+    assert thumbs.extract_thumbnail(tmp_path / "song.mp3", "audio/mpeg") is None
+    (tmp_path / "cover.jpg").write_bytes(b"\x89PNG\r\n\x1a\n")
+    assert thumbs.extract_thumbnail(tmp_path / "song.mp3", "audio/mpeg") is None
+
+
+def test_thumbnail_served_with_validators(tmp_path, config_dir, monkeypatch):
+    monkeypatch.setattr(thumbs, "has_ffmpeg", lambda: False)
+    media = tmp_path / "media"
+    media.mkdir()
+    (media / "song.mp3").write_bytes(b"audio")
+    cover = _jpeg(160, 160)
+    (media / "song.jpg").write_bytes(cover)
+
+    library = MediaLibrary(media)
+    library.refresh()
+    server = MediaServer(media, library=library, thumbnails=ThumbnailCache())
+    port = server.start()
+    try:
+        conn = http.client.HTTPConnection("127.0.0.1", port)
+        conn.request("GET", "/.thumbs/song.mp3")
+        response = conn.getresponse()
+        assert response.status == 200
+        assert response.getheader("Content-Type") == "image/jpeg"
+        assert response.read() == cover
+        etag = response.getheader("ETag")
+        last_modified = response.getheader("Last-Modified")
+
+        conn.request("GET", "/.thumbs/song.mp3", headers={"If-None-Match": etag})
+        response = conn.getresponse()
+        assert response.status == 304
+        assert response.read() == b""
+
+        conn.request("GET", "/.thumbs/song.mp3", headers={"If-Modified-Since": last_modified})
+        response = conn.getresponse()
+        assert response.status == 304
+        response.read()
+
+        conn.request("GET", "/.thumbs/missing.mp3")
+        response = conn.getresponse()
+        assert response.status == 404
+        response.read()
+        conn.close()
+
+        assert len(list((config_dir / "thumbs").glob("*.jpg"))) == 1
+        didl = server.device.browse("0", "BrowseDirectChildren", 0, 0, "http://h:1")["Result"]
+        assert "<upnp:albumArtURI" in didl and "http://h:1/.thumbs/song.mp3" in didl
+    finally:
+        server.stop()
+        library.close()
@@ -0,0 +1,51 @@
+"""Tests for timing spans, against the fake renderer."""
+
+import json
+
+import pytest
+
+from dlna import trace
+from dlna.player import DLNAClient, play_url
+from dlna.testing import FakeRenderer
+
+
+@pytest.fixture
+def tracer():
+    tracer = trace.start_tracing()
+    yield tracer
+    trace.stop_tracing()
+
+
+def test_span_is_noop_without_tracer():
+    with trace.span("idle") as s:
+        assert s is None
+
+
+@pytest.mark.asyncio
+async def test_play_url_spans(tracer):
+    async with FakeRenderer() as renderer:
+        async with DLNAClient() as client:
+            await play_url(renderer.device, "http://10.0.0.2/a.mp4", client=client)
+
+    assert renderer.state == "PLAYING"
+    # A Stop with nothing loaded is refused with a SOAP fault, which play_url ignores
+    assert renderer.actions == ["Stop", "SetAVTransportURI", "GetTransportInfo", "Play"]
+
+    spans = json.loads(tracer.to_json())
+    by_id = {s["id"]: s for s in spans}
+    actions = [s for s in spans if s["name"] == "action"]
+    assert [s["attrs"]["action"] for s in actions] == renderer.actions
+    assert actions[0]["error"]
+    assert all(s["attrs"]["attempts"] == 1 for s in actions)
+
+    fetches = [s for s in spans if s["name"] == "http.get"]
+    # Device description, AVTransport and ConnectionManager SCPDs
+    assert len(fetches) == 3
+    for fetch in fetches:
+        # http.get -> description.build -> get_av_transport
+        build = by_id[fetch["parent"]]
+        assert build["name"] == "description.build"
+        assert by_id[build["parent"]]["name"] == "get_av_transport"
+
+    assert tracer.totals()["action"][0] == 4
+    assert "get_av_transport" in tracer.format_tree()
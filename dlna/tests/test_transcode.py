@@ -0,0 +1,120 @@
+"""Tests for stream format selection and converted streams."""
+
+import http.client
+import os
+
+import pytest
+
+from dlna import transcode
+from dlna.player import DLNAClient, get_sink_protocols
+from dlna.probe import MediaInfo
+from dlna.server import MediaServer
+from dlna.testing import FakeRenderer
+from dlna.transcode import StreamPlan, accepts, plan_stream
+
+TV = [
+    "http-get:*:video/mp4:DLNA.ORG_PN=AVC_MP4_MP_HD_720p_AAC",
+    "http-get:*:video/vnd.dlna.mpeg-tts:*",
+    "http-get:*:audio/mpeg:*",
+]
+
+
+@pytest.fixture
+def ffmpeg(monkeypatch):
+    monkeypatch.setattr(transcode, "has_ffmpeg", lambda: True)
+
+
+def test_accepts():
+    assert accepts([], "video/x-matroska")
+    assert accepts(TV, "video/mp4")
+    assert not accepts(TV, "video/x-matroska")
+    assert accepts(["http-get:*:video/*:*"], "video/x-matroska")
+    assert accepts(["http-get:*:*:*"], "audio/flac")
+
+
+def test_plan_stream(ffmpeg):
+    mp4 = MediaInfo("video/mp4", 1, video_codec="h264", audio_codec="aac")
+    assert plan_stream(mp4, TV).direct
+    assert plan_stream(mp4, []).direct
+
+    # MKV with codecs the TV decodes: copy them into MPEG-TS
+    mkv = MediaInfo("video/x-matroska", 1, video_codec="h264", audio_codec="ac3")
+    plan = plan_stream(mkv, TV)
+    assert (plan.mode, plan.mime_type, plan.extension) == ("remux", "video/mp2t", ".ts")
+    assert plan.args[plan.args.index("-c:v") + 1] == "copy"
+    assert plan.args[plan.args.index("-c:a") + 1] == "copy"
+
+    # HEVC in an accepted container: only the video is re-encoded
+    hevc = MediaInfo("video/mp4", 1, video_codec="hevc", audio_codec="aac")
+    plan = plan_stream(hevc, TV)
+    assert plan.mode == "transcode"
+    assert plan.args[plan.args.index("-c:v") + 1] == "libx264"
+    assert plan.args[plan.args.index("-c:a") + 1] == "copy"
+    assert plan_stream(hevc, TV + ["http-get:*:video/mp4:DLNA.ORG_PN=HEVC_MP4_MP_L51_AAC"]).direct
+
+    flac = MediaInfo("audio/flac", 1, audio_codec="flac")
+    plan = plan_stream(flac, TV)
+    assert (plan.mode, plan.mime_type) == ("transcode", "audio/mpeg")
+
+    image = MediaInfo("image/webp", 1)
+    assert plan_stream(image, TV).direct
+
+
+def test_plan_stream_without_ffmpeg(monkeypatch):
+    monkeypatch.setattr(transcode, "has_ffmpeg", lambda: False)
+    plan = plan_stream(MediaInfo("video/x-matroska", 1), TV)
+    assert plan.direct
+    assert plan.reason == "ffmpeg not installed"
+
+
+@pytest.mark.asyncio
+async def test_sink_protocols_are_cached_per_device():
+    async with FakeRenderer(sink_protocols=TV) as renderer:
+        async with DLNAClient() as client:
+            assert await get_sink_protocols(renderer.device, client=client) == TV
+            assert await get_sink_protocols(renderer.device, client=client) == TV
+            assert await get_sink_protocols(renderer.device, client=client, max_age=0) == TV
+
+    assert renderer.actions == ["GetProtocolInfo", "GetProtocolInfo"]
+
+
+def test_stream_is_piped_from_ffmpeg(tmp_path, monkeypatch):
+    # A stand-in ffmpeg that writes a known body to its pipe:1 output
+    bin_dir = tmp_path / "bin"
+    bin_dir.mkdir()
+    fake = bin_dir / "ffmpeg"
+    fake.write_text("#!/bin/sh\nprintf converted\n")
+    fake.chmod(0o755)
+    monkeypatch.setenv("PATH", f"{bin_dir}{os.pathsep}{os.environ['PATH']}")
+
+    (tmp_path / "movie.mkv").write_bytes(b"original")
+    server = MediaServer(tmp_path)
+    port = server.start()
+    try:
+        plan = StreamPlan("remux", "video/mp2t", ".ts", ["-f", "mpegts"])
+        url_path = server.add_stream(tmp_path / "movie.mkv", plan)
+        assert url_path.endswith("/movie.ts")
+
+        conn = http.client.HTTPConnection("127.0.0.1", port)
+        conn.request("HEAD", url_path)
+        response = conn.getresponse()
+        assert response.status == 200
+        assert response.getheader("Content-Type") == "video/mp2t"
+        assert response.getheader("transferMode.dlna.org") == "Streaming"
+        assert "DLNA.ORG_OP=00" in response.getheader("contentFeatures.dlna.org")
+        assert response.read() == b""
+        conn.close()
+
+        conn = http.client.HTTPConnection("127.0.0.1", port)
+        conn.request("GET", url_path)
+        response = conn.getresponse()
+        assert response.getheader("Content-Length") is None
+        assert response.read() == b"converted"
+        conn.close()
+
+        conn = http.client.HTTPConnection("127.0.0.1", port)
+        conn.request("GET", "/.stream/99/other.ts")
+        assert conn.getresponse().status == 404
+        conn.close()
+    finally:
+        server.stop()
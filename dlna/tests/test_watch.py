@@ -0,0 +1,74 @@
+"""Tests for the passive renderer watcher."""
+
+import pytest
+
+from dlna import ipc
+from dlna.player import DLNAClient, DLNADevice, is_renderer_target
+from dlna.testing import FakeRenderer
+from dlna.watch import RendererTable, Watcher, parse_max_age, query_watcher
+
+
+def _device(name="Kitchen Speaker", udn="uuid:speaker"):
+    return DLNADevice(name=name, model_name="Model", location="http://10.0.0.7/d.xml", udn=udn)
+
+
+def test_parse_max_age():
+    assert parse_max_age("max-age=120") == 120
+    assert parse_max_age("no-cache, MAX-AGE = 60") == 60
+    assert parse_max_age("") == 1800
+
+
+def test_table_expires_entries():
+    table = RendererTable()
+    table.update(_device(), max_age=-1)
+    table.update(_device("TV", "uuid:tv"), max_age=60)
+    assert [d.udn for d in table.devices()] == ["uuid:tv"]
+    assert table.find("tv").udn == "uuid:tv"
+
+
+@pytest.mark.asyncio
+async def test_byebye_removes_renderer():
+    events = []
+    watcher = Watcher(client=None, on_change=lambda event, device: events.append(event))
+    watcher._add(_device(), 60)
+    await watcher._on_byebye({"USN": "uuid:speaker::urn:schemas-upnp-org:device:MediaRenderer:1"})
+    assert watcher.table.devices() == []
+    assert events == ["alive", "byebye"]
+
+
+
+def test_is_renderer_target():
+    assert is_renderer_target("urn:schemas-upnp-org:device:MediaRenderer:1")
+    assert is_renderer_target("urn:schemas-upnp-org:device:MediaRenderer:3")
+    assert is_renderer_target("urn:schemas-upnp-org:service:AVTransport:1")
+    assert not is_renderer_target("urn:schemas-upnp-org:device:InternetGatewayDevice:1")
+    assert not is_renderer_target("")
+
+
+@pytest.mark.asyncio
+async def test_alive_from_newer_renderer_versions_is_kept():
+    async with FakeRenderer("Kitchen") as renderer, DLNAClient() as client:
+        watcher = Watcher(client)
+        headers = {"LOCATION": renderer.location, "USN": f"{renderer.udn}::x", "CACHE-CONTROL": "max-age=60"}
+
+        await watcher._on_alive({**headers, "NT": "urn:schemas-upnp-org:device:InternetGatewayDevice:1"})
+        assert watcher.table.devices() == []
+
+        await watcher._on_alive({**headers, "NT": "urn:schemas-upnp-org:device:MediaRenderer:2"})
+        assert [d.name for d in watcher.table.devices()] == ["Kitchen"]
+
+@pytest.mark.asyncio
+async def test_query_watcher_over_socket():
+    assert await query_watcher("kitchen") is None
+
+    watcher = Watcher(client=None)
+    watcher._add(_device(), 60)
+    server = await ipc.serve(ipc._get_watch_socket_path(), watcher.handle)
+    try:
+        device = await query_watcher("kitchen")
+        assert device == _device()
+        with pytest.raises(RuntimeError):
+            await ipc.serve(ipc._get_watch_socket_path(), watcher.handle)
+    finally:
+        server.close()
+        await server.wait_closed()